@@ -1,5 +1,6 @@
 from invoke import Collection
 
+from tasks.benchmark import benchmark
 from tasks.changelog_check import changelog_check
 from tasks.docs import docs
 from tasks.lint import lint
@@ -9,6 +10,7 @@ from tasks.typecheck import typecheck
 from tasks.verify import verify
 
 namespace = Collection(
+    benchmark,
     build,
     changelog_check,
     docs,
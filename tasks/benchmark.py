@@ -0,0 +1,90 @@
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict
+
+from invoke import task
+
+from tasks.helpers import print_header
+from workspace.core.models import Project, Workspace
+
+_PYPROJECT = """
+[tool.poetry]
+name = "{name}"
+version = "0.1.0"
+description = ""
+authors = ["Author <author@example.com>"]
+
+[tool.poetry.dependencies]
+python = "^3.8"
+requests = "^2.26"
+{name}-dependency = {{path = "../{name}-dependency", develop = true}}
+
+[tool.poetry.dev-dependencies]
+pytest = "^6.2"
+{name}-dev-dependency = {{path = "../{name}-dev-dependency"}}
+"""
+
+_PIPFILE = """
+[[source]]
+url = "https://pypi.org/simple"
+verify_ssl = true
+name = "pypi"
+
+[packages]
+requests = "*"
+{name}-dependency = {{path = "../{name}-dependency", editable = true}}
+
+[dev-packages]
+pytest = "*"
+{name}-dev-dependency = {{path = "../{name}-dev-dependency"}}
+
+[requires]
+python_version = "3.8"
+"""
+
+
+@task(optional=["projects"])
+def benchmark(ctx, projects=200):
+    """Compare scanning manifests for path dependencies against fully loading them."""
+    print_header("BENCHMARKING MANIFEST SCANNING")
+    with tempfile.TemporaryDirectory() as directory:
+        workspace = Workspace(path=Path(directory), projects={})
+        for type_name, filename, template in (
+            ("poetry", "pyproject.toml", _PYPROJECT),
+            ("pipenv", "Pipfile", _PIPFILE),
+        ):
+            names = [f"{type_name}-{index}" for index in range(int(projects))]
+            for name in names:
+                path = Path(directory) / name
+                path.mkdir()
+                (path / filename).write_text(template.format(name=name))
+                workspace.set_project(name, path=name, type=type_name)
+            project_list = [workspace.projects[name] for name in names]
+            full = _time(project_list, _FULL_LOADERS[type_name])
+            scan = _time(project_list, lambda project: project.adapter.path_dependencies())
+            print(f"{type_name}: full load {full * 1000:.2f}ms, scan {scan * 1000:.2f}ms per manifest")
+
+
+def _time(projects, function: Callable[[Project], object]) -> float:
+    function(projects[0])  # Exclude the time to import parsers.
+    start = time.perf_counter()
+    for project in projects:
+        function(project)
+    return (time.perf_counter() - start) / len(projects)
+
+
+def _load_poetry(project: Project) -> object:
+    """Dependencies were previously read after fully validating the poetry configuration."""
+    from poetry.core.pyproject.toml import PyProjectTOML
+
+    project.adapter.validate()
+    return PyProjectTOML(path=project.resolved_path / "pyproject.toml").file.read()
+
+
+def _load_pipenv(project: Project) -> object:
+    """Dependencies were previously read by loading the Pipfile through pipenv."""
+    return project.adapter.pipfile.data  # type: ignore[attr-defined]
+
+
+_FULL_LOADERS: Dict[str, Callable[[Project], object]] = {"poetry": _load_poetry, "pipenv": _load_pipenv}
@@ -45,6 +45,21 @@ class TestDependencies:
         # THEN only the second two should be included in the result
         assert set(result.text.splitlines()) == {"library-one", "library-two"}
 
+    @staticmethod
+    def should_only_include_dev_dependencies_when_specified():
+        # GIVEN I have two projects
+        paths = {"libs/library-one", "libs/library-two"}
+        for path in paths:
+            run(["workspace", "new", "--type", "poetry", path])
+        # AND one of them has a development dependency on the other
+        run(["poetry", "add", "--dev", "../library-one"], cwd="libs/library-two")
+        # WHEN I run workspace dependencies with and without the --dev flag
+        result = run(["workspace", "dependencies", "library-two"])
+        dev_result = run(["workspace", "dependencies", "--dev", "library-two"])
+        # THEN the development dependency is only included with the --dev flag
+        assert set(result.text.splitlines()) == {"library-two"}
+        assert set(dev_result.text.splitlines()) == {"library-one", "library-two"}
+
     @staticmethod
     def should_return_csv_format_when_specified():
         # GIVEN I have two projects
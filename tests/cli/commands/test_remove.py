@@ -26,6 +26,19 @@ class TestRemove:
         # AND the project should still exist
         assert not (WORKSPACE_ROOT / path).exists()
 
+    @staticmethod
+    def should_delete_multiple_projects():
+        # GIVEN several projects are being tracked
+        paths = {"libs/library-one", "libs/library-two", "libs/library-three"}
+        for path in paths:
+            run(["workspace", "new", "--type", "poetry", path])
+        # WHEN I remove and delete them
+        run(["workspace", "remove", "library-*", "--delete"])
+        # THEN the projects should no longer be tracked
+        assert run(["workspace", "list", "--output", "names"]).stdout == ""
+        # AND the projects should not exist
+        assert not any((WORKSPACE_ROOT / path).exists() for path in paths)
+
     @staticmethod
     def should_warn_when_the_specified_workspace_does_not_match():
         # WHEN I remove a project which is not tracked
@@ -101,3 +101,86 @@ class TestRun:
         exc = exc_info.value
         # THEN the exit code is 2
         assert exc.returncode == 2
+
+    @staticmethod
+    def should_run_dependencies_first_when_topological():
+        # GIVEN I have two projects
+        paths = ["libs/library-one", "libs/library-two"]
+        for path in paths:
+            run(["workspace", "new", "--type", "poetry", path])
+        # AND the first depends on the second
+        run(["poetry", "add", "../library-two"], cwd="libs/library-one")
+        # WHEN I run a command topologically
+        result = run(["workspace", "run", "-c", "pwd", "--topological"])
+        # THEN the command runs in the dependency first
+        output = [line for line in result.stdout.strip().splitlines() if line.startswith(str(WORKSPACE_ROOT))]
+        assert output == [str(WORKSPACE_ROOT / path) for path in reversed(paths)]
+
+    @staticmethod
+    def should_only_run_projects_in_shard(tmp_path):
+        # GIVEN I have three projects
+        paths = ["libs/library-one", "libs/library-two", "libs/library-three"]
+        for path in paths:
+            run(["workspace", "new", "--type", "poetry", path])
+        # AND only one machine has run the command before
+        run([f"WORKSPACE_CACHE_DIR={tmp_path / '1-2'}", "workspace", "run", "-c", "pwd"])
+        # WHEN I run a command in each of two shards, as though on separate machines
+        outputs = []
+        for shard in ("1/2", "2/2"):
+            cache_dir = tmp_path / shard.replace("/", "-")
+            result = run([f"WORKSPACE_CACHE_DIR={cache_dir}", "workspace", "run", "-c", "pwd", "--shard", shard])
+            outputs.append(
+                {line for line in result.stdout.strip().splitlines() if line.startswith(str(WORKSPACE_ROOT))}
+            )
+        # THEN each project runs in exactly one shard
+        assert not outputs[0] & outputs[1]
+        assert outputs[0] | outputs[1] == {str(WORKSPACE_ROOT / path) for path in paths}
+
+    @staticmethod
+    def should_show_shards_in_report():
+        # GIVEN I have a project
+        run(["workspace", "new", "--type", "poetry", "libs/library-one"])
+        # WHEN I show the report of shards
+        result = run(["workspace", "run", "-c", "pwd", "--shard", "1/2", "--shard-report"])
+        # THEN every shard is shown, and nothing is run
+        assert "1/2" in result.stdout and "2/2" in result.stdout
+        assert str(WORKSPACE_ROOT / "libs/library-one") not in result.stdout
+
+    @staticmethod
+    def should_reject_invalid_jobs_setting():
+        # GIVEN I have a project
+        run(["workspace", "new", "--type", "poetry", "libs/library-one"])
+        # WHEN I run a command in parallel, with an invalid number of jobs set
+        with pytest.raises(subprocess.CalledProcessError) as exc_info:
+            run(["env", "WORKSPACE_JOBS=-1", "workspace", "run", "-c", "pwd", "-p"], assert_success=False)
+        # THEN it fails with a clear error
+        assert exc_info.value.returncode == 1
+        assert "WORKSPACE_JOBS must be a positive integer" in exc_info.value.text
+
+    @staticmethod
+    @pytest.mark.parametrize("shard", ["1", "0/2", "3/2", "a/b"])
+    def should_reject_invalid_shards(shard):
+        with pytest.raises(subprocess.CalledProcessError) as exc_info:
+            run(["workspace", "run", "-c", "pwd", "--shard", shard], assert_success=False)
+        assert exc_info.value.returncode == 2
+
+    @staticmethod
+    def should_resume_projects_which_did_not_succeed(tmp_path):
+        # GIVEN I have two projects
+        paths = ["libs/library-one", "libs/library-two"]
+        for path in paths:
+            run(["workspace", "new", "--type", "poetry", path])
+        # AND a command which fails in one of them
+        command = ["env", f"WORKSPACE_CACHE_DIR={tmp_path}", "workspace", "run", "-c", "pwd && test ! -e failing"]
+        (WORKSPACE_ROOT / "libs/library-two/failing").touch()
+        with pytest.raises(subprocess.CalledProcessError):
+            run(command, assert_success=False)
+        # WHEN I fix it, and resume the command
+        (WORKSPACE_ROOT / "libs/library-two/failing").unlink()
+        result = run([*command, "--resume"])
+        # THEN only the project which failed is run again
+        output = [line for line in result.stdout.strip().splitlines() if line.startswith(str(WORKSPACE_ROOT))]
+        assert output == [str(WORKSPACE_ROOT / "libs/library-two")]
+        # AND resuming again runs nothing
+        result = run([*command, "--resume"])
+        assert "Every selected project succeeded" in result.text
@@ -0,0 +1,93 @@
+import subprocess
+import sys
+from textwrap import dedent
+
+import click
+import pytest
+from click.shell_completion import ShellComplete
+from click.testing import CliRunner
+
+from workspace.cli import cli
+from workspace.cli.commands.plugin import plugin
+from workspace.cli.commands.template import template
+from workspace.cli.lazy import LazyGroup
+
+
+class TestLazyGroup:
+    @staticmethod
+    def should_only_import_invoked_subcommand():
+        # GIVEN the CLI has not been used yet
+        script = dedent(
+            """
+            import sys
+            from workspace.cli import cli
+
+            cli(["template", "list", "--help"], standalone_mode=False)
+            print("\\n".join(name for name in sys.modules if name.startswith("workspace.cli.commands.")))
+            """
+        )
+        # WHEN I invoke a nested subcommand
+        result = subprocess.run([sys.executable, "-c", script], check=True, capture_output=True, text=True)
+        # THEN only the modules for that subcommand are imported
+        imported = {line for line in result.stdout.splitlines() if line.startswith("workspace.cli.commands.")}
+        assert imported == {"workspace.cli.commands.template", "workspace.cli.commands.template.list"}
+
+    @staticmethod
+    @pytest.mark.parametrize(
+        "script",
+        [
+            'cli(["--help"], standalone_mode=False)',
+            'ShellComplete(cli, {}, "workspace", "_WORKSPACE_COMPLETE").get_completions([], "")',
+        ],
+    )
+    def should_not_import_subcommands_to_list_them(script):
+        # GIVEN the CLI has not been used yet
+        script = dedent(
+            f"""
+            import sys
+            from click.shell_completion import ShellComplete
+            from workspace.cli import cli
+
+            {script}
+            print("\\n".join(name for name in sys.modules if name.startswith("workspace.cli.commands")))
+            """
+        )
+        # WHEN I show its help, or complete its subcommands
+        result = subprocess.run([sys.executable, "-c", script], check=True, capture_output=True, text=True)
+        # THEN no subcommand is imported
+        assert not [line for line in result.stdout.splitlines() if line.startswith("workspace.cli.commands")]
+
+    @staticmethod
+    @pytest.mark.parametrize("group", [cli, plugin, template])
+    def should_show_short_help_of_each_subcommand(group):
+        # GIVEN the short help given for each lazy subcommand
+        ctx = click.Context(group)
+        for name, (_, short_help) in group.lazy_subcommands.items():
+            # WHEN I import the subcommand
+            command = group.get_command(ctx, name)
+            # THEN the short help matches that of the command
+            assert command is not None
+            assert command.get_short_help_str(1000) == short_help
+
+    @staticmethod
+    def should_complete_subcommands_with_short_help():
+        # GIVEN the start of a subcommand name
+        # WHEN I complete it
+        completions = ShellComplete(cli, {}, "workspace", "_WORKSPACE_COMPLETE").get_completions([], "de")
+        # THEN the matching subcommands are given, with their short help
+        assert [(item.value, item.help) for item in completions] == [
+            ("dependees", "Get the set of all projects which depend..."),
+            ("dependencies", "Get the set of all projects which are..."),
+        ]
+
+    @staticmethod
+    def should_list_lazy_and_eager_subcommands():
+        # GIVEN a lazy group with both lazy and eagerly added subcommands
+        group = LazyGroup(name="group", lazy_subcommands={"lazy": ("workspace.cli.commands.info:info", "Lazy.")})
+        group.add_command(click.Command("eager", callback=lambda: None))
+        # WHEN I show the group help
+        result = CliRunner().invoke(group, ["--help"])
+        # THEN both commands are listed
+        assert "eager" in result.output
+        assert "lazy" in result.output
+        assert "Lazy." in result.output
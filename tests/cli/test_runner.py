@@ -0,0 +1,713 @@
+import json
+import os
+import resource
+import signal
+import subprocess
+import sys
+import time
+from pathlib import Path
+from textwrap import dedent
+from typing import Dict, List, Optional, Set, Tuple
+
+import pytest
+
+from tests.utils import override_settings
+from workspace.cli import runner, theme
+from workspace.core.adapter import Adapter
+from workspace.core.exceptions import WorkspaceCycleError
+from workspace.core.graph import Graph
+from workspace.core.history import DurationHistory, RunOutcomes
+from workspace.core.models import Project, Workspace
+from workspace.core.run_cache import RunCache
+
+
+class ShellAdapter(Adapter, name="shell-test"):
+    """Runs commands directly in the project directory."""
+
+
+class VenvAdapter(Adapter, name="runner-venv-test"):
+    """Runs commands in a `.venv` directory in the project, logging when it is resolved."""
+
+    def resolve_environment(self) -> Optional[Path]:
+        with open(self._project.root.path / "log", "a") as log:
+            log.write(f"resolved {self._project.name}\n")
+        return self._project.resolved_path / ".venv"
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    return Workspace(path=tmp_path, projects={})
+
+
+def create_projects(workspace: Workspace, commands: Dict[str, str]) -> List[Tuple[Project, str]]:
+    project_commands = []
+    for name, command in commands.items():
+        project = workspace.set_project(name, path=name, type="shell-test")
+        project.resolved_path.mkdir()
+        project_commands.append((project, command))
+    return project_commands
+
+
+def log_command(log_path: Path, name: str, exit_code: int = 0) -> str:
+    return f"echo {name} >> {log_path}; exit {exit_code}"
+
+
+def read_log(log_path: Path) -> List[str]:
+    return log_path.read_text().splitlines() if log_path.exists() else []
+
+
+def allocate_command(mebibytes: int) -> str:
+    return f"{sys.executable} -c 'data = bytearray({mebibytes} * 1024 * 1024)'"
+
+
+def is_running(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    stat_path = Path(f"/proc/{pid}/stat")
+    # Orphaned processes may not be reaped promptly, but zombies are no longer running.
+    return not stat_path.exists() or stat_path.read_text().rpartition(")")[2].split()[0] != "Z"
+
+
+def wait_for_exit(pid: int, timeout: float = 2) -> bool:
+    end = time.monotonic() + timeout
+    while is_running(pid):
+        if time.monotonic() > end:
+            return False
+        time.sleep(0.05)
+    return True
+
+
+class TestOutput:
+    @staticmethod
+    def should_spill_to_disk_beyond_max_size():
+        # GIVEN captured output with a small maximum size in memory
+        output = runner.Output(max_size=100)
+        # WHEN more than that is written
+        output.write(b"x" * 50)
+        assert not output.file._rolled
+        output.write(b"x" * 100)
+        # THEN it is spilled to disk
+        assert output.file._rolled
+        assert output.tail() == ("x" * 150, False)
+
+    @staticmethod
+    def should_bound_tail_of_output():
+        # GIVEN captured output with many lines
+        output = runner.Output()
+        output.write("".join(f"line {index}\n" for index in range(1000)).encode())
+        # WHEN I get the tail of the output
+        tail, truncated = output.tail(max_lines=10, max_bytes=1000)
+        # THEN only the last lines are returned
+        assert tail.splitlines() == [f"line {index}" for index in range(990, 1000)]
+        assert truncated
+
+
+class TestScheduler:
+    @staticmethod
+    def should_start_projects_once_dependencies_succeed():
+        # GIVEN a depends on b and c, and b depends on c
+        scheduler = runner.Scheduler(["a", "b", "c"], {"a": {"b", "c"}, "b": {"c"}})
+        # WHEN I take the ready projects, completing each in turn
+        # THEN they are ready in dependency order
+        assert scheduler.take_ready() == ["c"]
+        assert scheduler.take_ready() == []
+        scheduler.complete("c", success=True)
+        assert scheduler.take_ready() == ["b"]
+        scheduler.complete("b", success=True)
+        assert scheduler.take_ready() == ["a"]
+        scheduler.complete("a", success=True)
+        assert scheduler.finished
+
+    @staticmethod
+    def should_skip_transitive_dependees_of_failed_project():
+        # GIVEN a depends on b, b depends on c, and d is independent
+        scheduler = runner.Scheduler(["a", "b", "c", "d"], {"a": {"b"}, "b": {"c"}})
+        assert scheduler.take_ready() == ["c", "d"]
+        # WHEN c fails
+        skipped = scheduler.complete("c", success=False)
+        # THEN a and b are skipped
+        assert skipped == ["a", "b"]
+        assert scheduler.skipped == {"a", "b"}
+        # AND d is still outstanding
+        assert not scheduler.finished
+        scheduler.complete("d", success=True)
+        assert scheduler.finished
+
+    @staticmethod
+    def should_ignore_dependencies_which_are_not_scheduled():
+        # GIVEN a depends on a project which is not scheduled
+        scheduler = runner.Scheduler(["a"], {"a": {"b"}})
+        # WHEN I take the ready projects
+        # THEN a is ready
+        assert scheduler.take_ready() == ["a"]
+
+    @staticmethod
+    def should_limit_number_of_ready_projects():
+        # GIVEN three independent projects
+        scheduler = runner.Scheduler(["a", "b", "c"])
+        # WHEN I take at most two ready projects
+        ready = scheduler.take_ready(limit=2)
+        # THEN the first two are taken, and the last is pending
+        assert ready == ["a", "b"]
+        assert scheduler.pending == ["c"]
+        assert scheduler.take_ready(limit=0) == []
+
+    @staticmethod
+    def should_cancel_projects_which_have_not_started():
+        # GIVEN a depends on b, and c is independent
+        scheduler = runner.Scheduler(["a", "b", "c"], {"a": {"b"}})
+        assert scheduler.take_ready(limit=1) == ["b"]
+        # WHEN I cancel the remaining projects
+        cancelled = scheduler.cancel()
+        # THEN the projects which had not started are cancelled
+        assert cancelled == ["a", "c"]
+        assert scheduler.take_ready() == []
+        # AND once b fails, a is not also skipped
+        assert scheduler.complete("b", success=False) == []
+        assert scheduler.finished
+
+    @staticmethod
+    def should_raise_given_cyclic_dependencies():
+        # GIVEN projects with cyclic dependencies
+        dependencies: Dict[str, Set[str]] = {"a": {"b"}, "b": {"a"}}
+        # WHEN I create a scheduler
+        # THEN an error is raised
+        with pytest.raises(WorkspaceCycleError):
+            runner.Scheduler(["a", "b"], dependencies)
+
+
+class TestPlan:
+    @staticmethod
+    def should_start_longest_projects_first():
+        # GIVEN projects with expected durations, of which two may run at once
+        durations = {"a": 1.0, "b": 5.0, "c": 2.0, "d": 4.0}
+        scheduler = runner.Scheduler(list(durations), durations=durations)
+        # WHEN I plan the run
+        planned = runner.plan(scheduler, durations, jobs=2)
+        # THEN the longest projects start first, and the run is as short as possible
+        assert [job.name for job in planned] == ["b", "d", "c", "a"]
+        assert max(job.end for job in planned) == 6.0
+        # AND the scheduler is unchanged
+        assert scheduler.pending == list(durations)
+
+    @staticmethod
+    def should_start_critical_path_first():
+        # GIVEN a short project which a long one depends on, and a project of medium length
+        durations = {"long": 10.0, "medium": 6.0, "short": 1.0}
+        scheduler = runner.Scheduler(list(durations), {"long": {"short"}}, durations=durations)
+        # WHEN I plan the run
+        planned = runner.plan(scheduler, durations, jobs=1)
+        # THEN the short project starts first, as the long one is waiting for it
+        assert [job.name for job in planned] == ["short", "long", "medium"]
+
+    @staticmethod
+    def should_account_for_running_projects():
+        durations = {"a": 3.0, "b": 2.0}
+        scheduler = runner.Scheduler(["a", "b"], durations=durations)
+        assert scheduler.take_ready(limit=1) == ["a"]
+        planned = runner.plan(scheduler, durations, jobs=1, running={"a": 1.0})
+        assert planned == [runner.PlannedJob("b", 0, 1.0, 3.0)]
+
+    @staticmethod
+    def should_show_expected_schedule(workspace, tmp_path, capfd):
+        # GIVEN projects, one of which has run before
+        project_commands = create_projects(workspace, {"a": "true", "b": "true"})
+        history = DurationHistory(workspace.path)
+        history.record("b", "true", 90.0)
+        # WHEN I show the plan of the run
+        runner.show_plan(project_commands, parallel=True, history=history, jobs=1)
+        # THEN the expected duration of each project and the whole run are shown
+        out = capfd.readouterr().out
+        assert "expected to take 3m 0s" in out
+        assert "1m 30s (no history)" in out
+
+
+class TestShard:
+    @staticmethod
+    def should_balance_expected_durations(workspace):
+        # GIVEN projects with expected durations
+        durations = {"a": 8.0, "b": 5.0, "c": 4.0, "d": 3.0, "e": 1.0}
+        project_commands = create_projects(workspace, {name: "true" for name in durations})
+        # WHEN I split them into two shards
+        shards = runner.shard(project_commands, 2, durations)
+        # THEN the longest projects are spread across the shards, balancing their expected durations
+        assert [[project.name for project, _ in projects] for projects in shards] == [["a", "d"], ["b", "c", "e"]]
+
+    @staticmethod
+    def should_assign_each_project_once_without_durations(workspace):
+        # GIVEN projects without expected durations
+        project_commands = create_projects(workspace, {f"project-{index}": "true" for index in range(20)})
+        # WHEN I split them into shards
+        shards = runner.shard(project_commands, 3, {})
+        # THEN each project is in exactly one shard
+        names = [project.name for projects in shards for project, _ in projects]
+        assert sorted(names) == sorted(project.name for project, _ in project_commands)
+        # AND each project is in the same shard, regardless of the other projects
+        for index, projects in enumerate(shards):
+            for project_command in projects:
+                assert runner.shard([project_command], 3, {})[index] == [project_command]
+
+
+class TestRun:
+    @staticmethod
+    @pytest.mark.parametrize("parallel", [False, True])
+    def should_run_dependencies_first(workspace, tmp_path, parallel):
+        # GIVEN three projects, where each depends on the next
+        log_path = tmp_path / "log.txt"
+        project_commands = create_projects(workspace, {name: log_command(log_path, name) for name in "abc"})
+        # WHEN I run them topologically
+        exit_code = runner.run(project_commands, parallel=parallel, dependencies={"a": {"b"}, "b": {"c"}})
+        # THEN they run in dependency order
+        assert exit_code == 0
+        assert read_log(log_path) == ["c", "b", "a"]
+
+    @staticmethod
+    @pytest.mark.parametrize("parallel", [False, True])
+    def should_skip_dependees_of_failed_projects(workspace, tmp_path, capfd, parallel):
+        # GIVEN a depends on b, which fails, and c is independent
+        log_path = tmp_path / "log.txt"
+        project_commands = create_projects(
+            workspace,
+            {
+                "a": log_command(log_path, "a"),
+                "b": log_command(log_path, "b", exit_code=3),
+                "c": log_command(log_path, "c"),
+            },
+        )
+        # WHEN I run them topologically
+        exit_code = runner.run(project_commands, parallel=parallel, dependencies={"a": {"b"}})
+        # THEN the run fails
+        assert exit_code == 3
+        # AND a is skipped
+        assert sorted(read_log(log_path)) == ["b", "c"]
+        assert "skipped" in capfd.readouterr().err
+
+    @staticmethod
+    @pytest.mark.parametrize("interactive", [False, True])
+    def should_not_busy_wait_for_parallel_commands(workspace, monkeypatch, interactive):
+        # GIVEN projects running a slow command
+        project_commands = create_projects(workspace, {name: "sleep 1" for name in "ab"})
+        monkeypatch.setattr(sys.stderr, "isatty", lambda: interactive)
+        # AND the number of times the status line is drawn is recorded
+        redraws = []
+        echo = theme.echo
+        monkeypatch.setattr(
+            theme, "echo", lambda message, *args, **kwargs: redraws.append(message) or echo(message, *args, **kwargs)
+        )
+        # WHEN I run them in parallel
+        start = resource.getrusage(resource.RUSAGE_SELF)
+        exit_code = runner.run(project_commands, parallel=True, jobs=2)
+        end = resource.getrusage(resource.RUSAGE_SELF)
+        # THEN they succeed
+        assert exit_code == 0
+        # AND little CPU time was spent waiting for them
+        assert (end.ru_utime + end.ru_stime) - (start.ru_utime + start.ru_stime) < 0.5
+        # AND the status line is only redrawn at its frame rate, if at all
+        running_lines = [message for message in redraws if "Running (" in message]
+        assert (len(running_lines) <= 15) if interactive else not running_lines
+
+    @staticmethod
+    def should_only_show_end_of_large_output_in_parallel(workspace, capfd):
+        # GIVEN a project which writes more output than fits in a pipe buffer, then fails
+        project_commands = create_projects(workspace, {"a": "seq 1 200000; echo done >&2; exit 1"})
+        # WHEN I run it in parallel
+        exit_code = runner.run(project_commands, parallel=True)
+        # THEN it fails
+        assert exit_code == 1
+        # AND only the end of its output is shown
+        captured = capfd.readouterr()
+        assert captured.out.splitlines()[-2:] == ["200000", "done"]
+        assert "1\n2\n3\n" not in captured.out
+        assert len(captured.out.splitlines()) <= 101
+        assert "showing the last" in captured.err
+
+    @staticmethod
+    def should_write_full_output_to_log_directory(workspace, tmp_path):
+        # GIVEN projects which write lots of output
+        project_commands = create_projects(workspace, {"a": "seq 1 200000", "b": "seq 1 10; exit 1"})
+        # WHEN I run them in parallel, with a log directory
+        runner.run(project_commands, parallel=True, log_dir=tmp_path / "logs")
+        # THEN the full output of each project is written to the log directory
+        assert (tmp_path / "logs/a.log").read_text().splitlines() == [str(index) for index in range(1, 200001)]
+        assert (tmp_path / "logs/b.log").read_text().splitlines() == [str(index) for index in range(1, 11)]
+
+    @staticmethod
+    @pytest.mark.parametrize("jobs,settings_jobs", [(2, None), (None, 2)])
+    def should_limit_concurrent_commands(workspace, tmp_path, jobs, settings_jobs):
+        # GIVEN projects which record how many commands are running at once
+        running_path = tmp_path / "running"
+        running_path.mkdir()
+        command = (
+            f"touch {running_path}/$$; ls {running_path} | wc -l >> {tmp_path}/counts.txt; "
+            f"sleep 0.2; rm {running_path}/$$"
+        )
+        project_commands = create_projects(workspace, {name: command for name in "abcde"})
+        # WHEN I run them in parallel with a limit of two jobs
+        with override_settings(jobs=settings_jobs):
+            exit_code = runner.run(project_commands, parallel=True, jobs=jobs)
+        # THEN every command runs
+        assert exit_code == 0
+        counts = [int(count) for count in read_log(tmp_path / "counts.txt")]
+        assert len(counts) == 5
+        # AND no more than two run at once
+        assert max(counts) <= 2
+
+    @staticmethod
+    def should_show_pending_projects_in_status_line(workspace, monkeypatch):
+        # GIVEN more projects than jobs
+        project_commands = create_projects(workspace, {name: "sleep 0.3" for name in "abc"})
+        monkeypatch.setattr(sys.stderr, "isatty", lambda: True)
+        messages = []
+        monkeypatch.setattr(theme, "echo", lambda message, *args, **kwargs: messages.append(message))
+        # WHEN I run them in parallel with a single job
+        runner.run(project_commands, parallel=True, jobs=1)
+        # THEN the status line shows the number of pending projects
+        assert any("(2 pending)" in message for message in messages)
+
+    @staticmethod
+    def should_show_expected_time_left_in_status_line(workspace, tmp_path, monkeypatch):
+        # GIVEN projects which took a minute each in an earlier run
+        project_commands = create_projects(workspace, {name: "sleep 0.3" for name in "ab"})
+        history = DurationHistory(workspace.path)
+        for name in "ab":
+            history.record(name, "sleep 0.3", 60.0)
+        monkeypatch.setattr(sys.stderr, "isatty", lambda: True)
+        messages = []
+        monkeypatch.setattr(theme, "echo", lambda message, *args, **kwargs: messages.append(message))
+        # WHEN I run them in parallel with a single job
+        runner.run(project_commands, parallel=True, jobs=1, history=history)
+        # THEN the status line shows the expected time left
+        assert any("about 2m 0s left" in message for message in messages)
+
+    @staticmethod
+    def should_stream_whole_lines_prefixed_with_project(workspace, capfd):
+        # GIVEN projects which write many lines, including partial writes
+        project_commands = create_projects(
+            workspace,
+            {
+                "a": "seq 1 20000",
+                "bb": "seq 1 20000 >&2",
+                "c": "for index in 1 2 3; do printf 'part-'; sleep 0.05; echo $index; done; printf end",
+            },
+        )
+        # WHEN I run them in parallel, streaming their output
+        exit_code = runner.run(project_commands, parallel=True, jobs=3, stream=True)
+        # THEN they succeed
+        assert exit_code == 0
+        # AND every line is whole, and prefixed with its aligned project name
+        lines: Dict[str, List[str]] = {"a ": [], "bb": [], "c ": []}
+        for line in capfd.readouterr().out.splitlines():
+            name, _, text = line.partition(" | ")
+            lines[name].append(text)
+        assert lines["a "] == lines["bb"] == [str(index) for index in range(1, 20001)]
+        assert lines["c "] == ["part-1", "part-2", "part-3", "end"]
+
+    @staticmethod
+    @pytest.mark.parametrize("parallel", [False, True])
+    def should_cancel_outstanding_projects_given_fail_fast(workspace, tmp_path, capfd, parallel):
+        # GIVEN a project which fails quickly, and others which are slow
+        log_path = tmp_path / "log.txt"
+        project_commands = create_projects(
+            workspace,
+            {
+                "a": "exit 3",
+                "b": f"sleep 10; echo b >> {log_path}",
+                "c": f"sleep 10; echo c >> {log_path}",
+            },
+        )
+        # WHEN I run them with fail-fast
+        start = time.monotonic()
+        exit_code = runner.run(project_commands, parallel=parallel, jobs=2, fail_fast=True)
+        # THEN the run fails promptly, with the exit code of the failed project
+        assert exit_code == 3
+        assert time.monotonic() - start < 5
+        # AND the other projects are cancelled
+        assert not read_log(log_path)
+        assert "cancelled" in capfd.readouterr().err
+
+    @staticmethod
+    @pytest.mark.parametrize("parallel", [False, True])
+    def should_cancel_process_group_of_commands_which_time_out(workspace, tmp_path, parallel):
+        # GIVEN a project whose command starts a slow background process
+        pid_path = tmp_path / "pid"
+        project_commands = create_projects(workspace, {"a": f"sleep 10 & echo $! > {pid_path}; wait"})
+        # WHEN I run it with a timeout
+        start = time.monotonic()
+        exit_code = runner.run(project_commands, parallel=parallel, timeout=0.5)
+        # THEN it times out promptly
+        assert exit_code == 124
+        assert time.monotonic() - start < 5
+        # AND the background process is cancelled too
+        assert wait_for_exit(int(pid_path.read_text()))
+
+    @staticmethod
+    @pytest.mark.parametrize("parallel", [False, True])
+    def should_kill_commands_which_ignore_sigterm(workspace, monkeypatch, parallel):
+        # GIVEN a project whose command ignores SIGTERM
+        project_commands = create_projects(workspace, {"a": "trap '' TERM; sleep 10"})
+        monkeypatch.setattr(runner, "_TERMINATE_GRACE", 0.5)
+        # WHEN I run it with a timeout
+        start = time.monotonic()
+        exit_code = runner.run(project_commands, parallel=parallel, timeout=0.5)
+        # THEN it is killed once the grace period is over
+        assert exit_code == 124
+        assert time.monotonic() - start < 5
+
+    @staticmethod
+    @pytest.mark.parametrize("parallel", [False, True])
+    def should_cancel_outstanding_projects_after_total_timeout(workspace, tmp_path, capfd, parallel):
+        # GIVEN slow projects
+        log_path = tmp_path / "log.txt"
+        project_commands = create_projects(workspace, {name: f"sleep 10; echo {name} >> {log_path}" for name in "abc"})
+        # WHEN I run them with a timeout for the whole run
+        start = time.monotonic()
+        exit_code = runner.run(project_commands, parallel=parallel, jobs=2, total_timeout=0.5)
+        # THEN the run times out promptly
+        assert exit_code == 124
+        assert time.monotonic() - start < 5
+        assert not read_log(log_path)
+        # AND the project which had not started is cancelled
+        assert "Some projects were cancelled" in capfd.readouterr().err
+
+    @staticmethod
+    def should_cancel_running_commands_when_interrupted(workspace, tmp_path, monkeypatch):
+        # GIVEN a project whose command starts a slow background process
+        pid_path = tmp_path / "pid"
+        project_commands = create_projects(workspace, {"a": f"sleep 10 & echo $! > {pid_path}; wait"})
+
+        # AND the run is interrupted once the background process has started
+        def interrupt(*args, **kwargs):
+            if pid_path.exists() and pid_path.read_text():
+                raise KeyboardInterrupt
+
+        monkeypatch.setattr(runner.StatusLine, "timeout", lambda self: 0.05)
+        monkeypatch.setattr(runner.StatusLine, "update", interrupt)
+        # WHEN I run it in parallel
+        start = time.monotonic()
+        with pytest.raises(KeyboardInterrupt):
+            runner.run(project_commands, parallel=True)
+        # THEN the command and its background process are cancelled promptly
+        assert time.monotonic() - start < 5
+        assert wait_for_exit(int(pid_path.read_text()))
+
+    @staticmethod
+    @pytest.mark.parametrize("parallel,timeout", [(True, None), (False, 10)])
+    @pytest.mark.parametrize("signum", [signal.SIGTERM, signal.SIGHUP])
+    def should_cancel_running_commands_when_terminated(tmp_path, parallel, timeout, signum):
+        # GIVEN a run of a command which starts a slow background process, in another process
+        pid_path = tmp_path / "pid"
+        script = dedent(
+            f"""
+            from pathlib import Path
+            from workspace.cli import runner
+            from workspace.core.adapter import Adapter
+            from workspace.core.models import Workspace
+
+            class ShellAdapter(Adapter, name="shell-test"):
+                pass
+
+            project = Workspace(path=Path({str(tmp_path)!r}), projects={{}}).set_project("a", path=".", type="shell-test")
+            runner.run([(project, "sleep 30 & echo $! > {pid_path}; wait")], parallel={parallel}, timeout={timeout})
+            """
+        )
+        process = subprocess.Popen([sys.executable, "-c", script])
+        end = time.monotonic() + 10
+        while not (pid_path.exists() and pid_path.read_text()) and time.monotonic() < end:
+            time.sleep(0.05)
+        # WHEN the runner is sent the signal
+        process.send_signal(signum)
+        # THEN it exits with the code for the signal
+        assert process.wait(timeout=10) == 128 + signum
+        # AND the background process does not survive it
+        assert wait_for_exit(int(pid_path.read_text()))
+
+    @staticmethod
+    def should_reraise_interrupt_given_finished_job(workspace, monkeypatch):
+        # GIVEN a project which finishes straight away, and one which does not
+        project_commands = create_projects(workspace, {"a": "true", "b": "sleep 10"})
+        # AND the run is interrupted as soon as the first has finished, before it is collected
+        read = runner.Job.read
+
+        def interrupting_read(self, stream, selector):
+            read(self, stream, selector)
+            if self.name == "a" and self.finished:
+                raise KeyboardInterrupt
+
+        monkeypatch.setattr(runner.Job, "read", interrupting_read)
+        # WHEN I run them in parallel
+        start = time.monotonic()
+        # THEN the interrupt is raised, once the other command is cancelled
+        with pytest.raises(KeyboardInterrupt):
+            runner.run(project_commands, parallel=True, jobs=2)
+        assert time.monotonic() - start < 5
+
+    @staticmethod
+    @pytest.mark.parametrize("parallel,stream", [(False, False), (True, False), (True, True)])
+    def should_replay_cached_results(workspace, tmp_path, capfd, parallel, stream):
+        # GIVEN projects whose commands have been run with a cache
+        log_path = tmp_path / "log.txt"
+        project_commands = create_projects(
+            workspace,
+            {
+                "a": f"echo a >> {log_path}; echo output a",
+                "b": f"echo b >> {log_path}; echo output b; exit 3",
+            },
+        )
+        graph = Graph(workspace.projects, {})
+        assert runner.run(project_commands, parallel=parallel, stream=stream, run_cache=RunCache(workspace, graph)) == 3
+        capfd.readouterr()
+        # WHEN I run them again
+        exit_code = runner.run(project_commands, parallel=parallel, stream=stream, run_cache=RunCache(workspace, graph))
+        # THEN the commands are not run again
+        assert read_log(log_path) == ["a", "b"]
+        # AND their recorded exit codes and output are replayed
+        assert exit_code == 3
+        out = capfd.readouterr().out
+        assert "output b" in out
+        if not parallel or stream:
+            assert "output a" in out
+
+    @staticmethod
+    def should_run_commands_again_given_changed_inputs(workspace, tmp_path):
+        # GIVEN a project whose command has been run with a cache
+        log_path = tmp_path / "log.txt"
+        project_commands = create_projects(workspace, {"a": f"echo a >> {log_path}"})
+        graph = Graph(workspace.projects, {})
+        runner.run(project_commands, parallel=True, run_cache=RunCache(workspace, graph))
+        # WHEN I change its inputs, and run it again
+        (workspace.path / "a/main.py").write_text("print(1)")
+        runner.run(project_commands, parallel=True, run_cache=RunCache(workspace, graph))
+        # THEN the command runs again
+        assert read_log(log_path) == ["a", "a"]
+
+    @staticmethod
+    @pytest.mark.parametrize("parallel", [False, True])
+    def should_restore_outputs_of_cached_results(workspace, tmp_path, parallel):
+        # GIVEN a project whose command has produced its outputs, and been run with a cache
+        log_path = tmp_path / "log.txt"
+        project_commands = create_projects(
+            workspace, {"a": f"echo a >> {log_path}; mkdir -p dist && echo built > dist/out.txt"}
+        )
+        project_commands[0][0].outputs = ["dist"]
+        graph = Graph(workspace.projects, {})
+        runner.run(project_commands, parallel=parallel, run_cache=RunCache(workspace, graph))
+        # WHEN I remove its outputs, and run it again
+        (workspace.path / "a/dist/out.txt").unlink()
+        exit_code = runner.run(project_commands, parallel=parallel, run_cache=RunCache(workspace, graph))
+        # THEN the command is not run again
+        assert exit_code == 0
+        assert read_log(log_path) == ["a"]
+        # AND its outputs are restored
+        assert (workspace.path / "a/dist/out.txt").read_text() == "built\n"
+
+    @staticmethod
+    @pytest.mark.parametrize("parallel", [False, True])
+    def should_write_trace_of_run(workspace, tmp_path, parallel):
+        # GIVEN a depends on b, which fails, and c and d are independent, but only one may run at once
+        project_commands = create_projects(
+            workspace, {"a": "true", "b": "sleep 0.2; exit 3", "c": "sleep 0.2", "d": "true"}
+        )
+        trace_path = tmp_path / "trace" / "run.json"
+        # WHEN I run them with a trace
+        runner.run(project_commands, parallel=parallel, jobs=1, dependencies={"a": {"b"}}, trace_path=trace_path)
+        # THEN the trace has a span for each project which ran, on the single slot
+        trace = json.loads(trace_path.read_text())
+        spans = {event["name"]: event for event in trace["traceEvents"] if event["ph"] == "X"}
+        assert set(spans) == {"b", "c", "d"}
+        assert {span["tid"] for span in spans.values()} == {1}
+        assert spans["c"]["dur"] >= 200_000
+        assert spans["d"]["ts"] >= spans["c"]["ts"] + spans["c"]["dur"]
+        # AND the time spent queueing is shown
+        queued = {event["name"] for event in trace["traceEvents"] if event.get("cat") == "queue"}
+        assert {"c", "d"} <= queued
+        # AND the summary gives the result of each project
+        projects = trace["summary"]["projects"]
+        assert trace["summary"]["exit_code"] == 3
+        assert {name: (project["status"], project["exit_code"]) for name, project in projects.items()} == {
+            "a": ("skipped", None),
+            "b": ("failed", 3),
+            "c": ("succeeded", 0),
+            "d": ("succeeded", 0),
+        }
+        assert projects["c"]["wall_time"] >= 0.2
+        assert projects["d"]["queue_time"] >= 0.4
+
+    @staticmethod
+    @pytest.mark.parametrize("parallel", [False, True])
+    def should_measure_resources_used_by_commands(workspace, tmp_path, capfd, parallel):
+        # GIVEN a project whose command starts a process which uses 256 MiB of memory
+        project_commands = create_projects(workspace, {"a": allocate_command(256), "b": "true"})
+        report_path = tmp_path / "usage.json"
+        # WHEN I run it, measuring usage
+        runner.run(project_commands, parallel=parallel, usage=True, usage_report=report_path)
+        # THEN the usage of its descendants is reported
+        projects = json.loads(report_path.read_text())["projects"]
+        assert projects["a"]["usage"]["max_rss"] >= 256 * 1024 * 1024
+        assert projects["b"]["usage"]["max_rss"] < 256 * 1024 * 1024
+        assert set(projects["a"]["usage"]) == {
+            "max_rss",
+            "user_time",
+            "system_time",
+            "voluntary_switches",
+            "involuntary_switches",
+        }
+        # AND it is shown once all projects have finished
+        assert "Peak memory" in capfd.readouterr().err
+
+    @staticmethod
+    def should_report_regressions_compared_with_baseline(workspace, tmp_path, capfd):
+        # GIVEN a baseline report of two projects
+        project_commands = create_projects(workspace, {"a": "true", "b": "true"})
+        baseline_path = tmp_path / "baseline.json"
+        runner.run(project_commands, parallel=True, usage_report=baseline_path)
+        capfd.readouterr()
+        # WHEN one of them starts using much more memory, and I compare usage with the baseline
+        project_commands[0] = (project_commands[0][0], allocate_command(256))
+        report_path = tmp_path / "usage.json"
+        runner.run(project_commands, parallel=True, usage_report=report_path, usage_baseline=baseline_path)
+        # THEN it is reported as a regression
+        regressions = json.loads(report_path.read_text())["regressions"]
+        assert [(regression["project"], regression["metric"]) for regression in regressions] == [("a", "max_rss")]
+        assert "a used" in capfd.readouterr().err
+
+    @staticmethod
+    def should_record_durations_of_successful_commands(workspace, tmp_path):
+        # GIVEN a project which succeeds, and one which fails
+        project_commands = create_projects(workspace, {"a": "sleep 0.1", "b": "exit 1"})
+        # WHEN I run them, with a history of durations
+        runner.run(project_commands, parallel=True, history=DurationHistory(workspace.path))
+        # THEN the duration of the successful command is recorded
+        history = DurationHistory(workspace.path)
+        duration = history.get("a", "sleep 0.1")
+        assert duration is not None and duration >= 0.1
+        assert history.get("b", "exit 1") is None
+
+    @staticmethod
+    def should_record_outcome_of_each_project(workspace, tmp_path):
+        # GIVEN a depends on b, which fails, and c is independent
+        project_commands = create_projects(workspace, {"a": "true", "b": "false", "c": "true"})
+        # WHEN I run them, recording their outcomes
+        runner.run(project_commands, parallel=True, dependencies={"a": {"b"}}, outcomes=RunOutcomes(workspace.path))
+        # THEN the status of each project is recorded
+        outcomes = RunOutcomes(workspace.path)
+        assert outcomes.get("false") == {"b": "failed"}
+        assert outcomes.get("true") == {"a": "skipped", "c": "succeeded"}
+
+    @staticmethod
+    def should_resolve_environments_before_running_directly(workspace, tmp_path):
+        # GIVEN projects with environments
+        project_commands = []
+        for name in ("a", "b"):
+            project = workspace.set_project(name, path=name, type="runner-venv-test")
+            (project.resolved_path / ".venv/bin").mkdir(parents=True)
+            (project.resolved_path / ".venv/bin/python").touch()
+            project_commands.append((project, f"echo ran {name} >> {tmp_path / 'log'}"))
+        # WHEN I run commands directly in them, in parallel
+        with override_settings(direct_run=True):
+            assert runner.run(project_commands, parallel=True) == 0
+        # THEN every environment is resolved once, before any command runs
+        log = read_log(tmp_path / "log")
+        assert sorted(log[:2]) == ["resolved a", "resolved b"]
+        assert sorted(log[2:]) == ["ran a", "ran b"]
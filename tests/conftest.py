@@ -0,0 +1,16 @@
+import pytest
+
+from tests.utils import override_settings
+
+
+@pytest.fixture(autouse=True)
+def _isolate_cache(tmp_path, monkeypatch):
+    """Keep cached workspace data out of the user's cache directory.
+
+    The environment variable applies to CLI calls in subprocesses, and the settings
+    override to calls within the test process.
+    """
+    cache_dir = str(tmp_path / "cache")
+    monkeypatch.setenv("WORKSPACE_CACHE_DIR", cache_dir)
+    with override_settings(cache_dir=cache_dir):
+        yield
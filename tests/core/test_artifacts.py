@@ -0,0 +1,117 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator
+
+import pytest
+
+from tests.utils import override_settings
+from workspace.core.artifacts import ArtifactStore, HttpStore, LocalStore, get_store
+from workspace.core.exceptions import WorkspaceBaseError
+
+
+class ArtifactHandler(BaseHTTPRequestHandler):
+    """A minimal artifact server, holding artifacts in memory."""
+
+    artifacts: Dict[str, bytes] = {}
+
+    def do_GET(self):
+        self._respond(send_body=True)
+
+    def do_HEAD(self):
+        self._respond(send_body=False)
+
+    def do_PUT(self):
+        self.artifacts[self.path] = self.rfile.read(int(self.headers["Content-Length"]))
+        self.send_response(201)
+        self.end_headers()
+
+    def _respond(self, send_body: bool):
+        content = self.artifacts.get(self.path)
+        if content is None:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(content)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server_url() -> Iterator[str]:
+    ArtifactHandler.artifacts = {}
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ArtifactHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}/cache"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture(params=["local", "http"])
+def store(request, tmp_path) -> ArtifactStore:
+    if request.param == "local":
+        return LocalStore(str(tmp_path / "artifacts"))
+    return HttpStore(request.getfixturevalue("server_url"))
+
+
+class TestArtifactStore:
+    @staticmethod
+    def should_get_stored_artifacts(store):
+        # GIVEN an artifact store
+        assert not store.has("blobs/abc")
+        assert store.get("blobs/abc") is None
+        # WHEN I store an artifact
+        store.put("blobs/abc", b"content")
+        # THEN it can be retrieved
+        assert store.has("blobs/abc")
+        assert store.get("blobs/abc") == b"content"
+
+    @staticmethod
+    def should_ignore_unreachable_servers():
+        # GIVEN an HTTP store whose server is not running
+        store = HttpStore("http://127.0.0.1:1/cache")
+        # WHEN I use it
+        store.put("blobs/abc", b"content")
+        # THEN it behaves as though it is empty
+        assert not store.has("blobs/abc")
+        assert store.get("blobs/abc") is None
+
+
+class TestGetStore:
+    @staticmethod
+    @pytest.mark.parametrize(
+        "location,expected",
+        [
+            ("/tmp/artifacts", LocalStore),
+            ("file:///tmp/artifacts", LocalStore),
+            ("http://localhost/cache", HttpStore),
+            ("https://localhost/cache", HttpStore),
+        ],
+    )
+    def should_choose_store_by_scheme(location, expected):
+        assert type(get_store(location)) is expected
+
+    @staticmethod
+    def should_use_configured_store():
+        with override_settings(artifact_store="http://localhost/cache"):
+            store = get_store()
+        assert isinstance(store, HttpStore)
+        assert store.location == "http://localhost/cache"
+
+    @staticmethod
+    def should_default_to_local_cache(tmp_path):
+        with override_settings(cache_dir=str(tmp_path / "cache")):
+            store = get_store()
+        assert isinstance(store, LocalStore)
+        assert store.path == tmp_path / "cache" / "artifacts"
+
+    @staticmethod
+    def should_raise_given_unknown_scheme():
+        with pytest.raises(WorkspaceBaseError):
+            get_store("s3://bucket/cache")
@@ -0,0 +1,167 @@
+import os
+import subprocess
+from pathlib import Path
+from typing import List, Optional
+
+import pytest
+
+from tests.utils import override_settings
+from workspace.core import cache
+from workspace.core.adapter import Adapter
+from workspace.core.environments import environment_run_args, get_environment, resolve_environments
+from workspace.core.models import Project, Workspace
+
+
+class VenvAdapter(Adapter, name="environments-test", command_prefix=("env", "PREFIXED=1")):
+    """Keeps its environment in a `.venv` directory, if one has been created."""
+
+    resolved: List[str] = []
+
+    def lock_paths(self) -> List[Path]:
+        return [self._project.resolved_path / "manifest.lock"]
+
+    def resolve_environment(self) -> Optional[Path]:
+        self.resolved.append(self._project.name)
+        environment = self._project.resolved_path / ".venv"
+        return environment if environment.exists() else None
+
+
+def create_project(path: Path, venv: bool = True) -> Project:
+    workspace = Workspace(path=path / "workspace", projects={})
+    project = workspace.set_project("a", path="a", type="environments-test")
+    os.makedirs(project.resolved_path)
+    (project.resolved_path / "manifest.lock").write_text("locked")
+    if venv:
+        create_venv(project.resolved_path / ".venv")
+    VenvAdapter.resolved.clear()
+    return project
+
+
+def create_venv(path: Path) -> None:
+    os.makedirs(path / "bin")
+    for name in ("python", "greet"):
+        (path / "bin" / name).write_text('#!/bin/sh\necho "$VIRTUAL_ENV" "$@" "${PREFIXED:-}"\n')
+        os.chmod(path / "bin" / name, 0o755)
+
+
+def run(project: Project, command: str) -> str:
+    args, kwargs = project.adapter.run_args(command)
+    return subprocess.run(args, stdout=subprocess.PIPE, text=True, check=True, **kwargs).stdout.strip()
+
+
+class TestGetEnvironment:
+    @staticmethod
+    def should_resolve_environment_once(tmp_path):
+        # GIVEN a project with an environment
+        project = create_project(tmp_path)
+        # WHEN I get its environment twice
+        environments = [get_environment(project), get_environment(project)]
+        # THEN it is only resolved once
+        assert environments == [project.resolved_path / ".venv"] * 2
+        assert VenvAdapter.resolved == ["a"]
+
+    @staticmethod
+    def should_resolve_environment_again_given_changed_lockfile(tmp_path):
+        # GIVEN a project whose environment has been resolved
+        project = create_project(tmp_path)
+        get_environment(project)
+        # WHEN I change its lockfile
+        (project.resolved_path / "manifest.lock").write_text("updated")
+        # THEN its environment is resolved again
+        assert get_environment(project) == project.resolved_path / ".venv"
+        assert VenvAdapter.resolved == ["a", "a"]
+
+    @staticmethod
+    def should_give_none_given_no_environment(tmp_path):
+        project = create_project(tmp_path, venv=False)
+        assert get_environment(project) is None
+
+    @staticmethod
+    def should_not_resolve_missing_environment_again(tmp_path):
+        # GIVEN a project whose environment cannot be found
+        project = create_project(tmp_path, venv=False)
+        get_environment(project)
+        # WHEN I get its environment again
+        # THEN it is not resolved again
+        assert get_environment(project) is None
+        assert VenvAdapter.resolved == ["a"]
+
+    @staticmethod
+    def should_read_and_write_cache_once_given_many_projects(tmp_path, monkeypatch):
+        # GIVEN many projects with environments
+        workspace = Workspace(path=tmp_path / "workspace", projects={})
+        projects = [
+            workspace.set_project(f"p{index}", path=f"p{index}", type="environments-test") for index in range(5)
+        ]
+        for project in projects:
+            create_venv(project.resolved_path / ".venv")
+        reads, writes = [], []
+        monkeypatch.setattr(cache, "read", lambda path, read=cache.read: reads.append(path) or read(path))
+        monkeypatch.setattr(
+            cache, "write", lambda path, value, write=cache.write: writes.append(path) or write(path, value)
+        )
+        # WHEN I resolve their environments ahead of time, then get each of them
+        resolve_environments(projects)
+        environments = [get_environment(project) for project in projects]
+        # THEN each is resolved, and the cache is only read and written once
+        assert environments == [project.resolved_path / ".venv" for project in projects]
+        assert (len(reads), len(writes)) == (1, 1)
+
+
+class TestEnvironmentRunArgs:
+    @staticmethod
+    def should_run_simple_commands_without_shell(tmp_path):
+        # GIVEN an environment
+        create_venv(tmp_path / ".venv")
+        # WHEN I get the args to run a simple command in it
+        command, kwargs = environment_run_args("greet hello", tmp_path / ".venv", cwd=tmp_path)
+        # THEN the executable in the environment is run directly
+        assert command == [str(tmp_path / ".venv/bin/greet"), "hello"]
+        assert not kwargs.get("shell")
+        assert kwargs["env"]["VIRTUAL_ENV"] == str(tmp_path / ".venv")
+
+    @staticmethod
+    @pytest.mark.parametrize("command", ["greet hello | cat", "greet $HOME", "FOO=1 greet", "cd src"])
+    def should_run_commands_in_shell_given_they_need_one(tmp_path, command):
+        create_venv(tmp_path / ".venv")
+        args, kwargs = environment_run_args(command, tmp_path / ".venv", cwd=tmp_path)
+        assert (args, kwargs["shell"]) == (command, True)
+
+    @staticmethod
+    def should_replace_active_environment(tmp_path, monkeypatch):
+        # GIVEN another environment is active
+        monkeypatch.setenv("VIRTUAL_ENV", "/other/venv")
+        monkeypatch.setenv("PATH", os.pathsep.join(["/other/venv/bin", "/usr/bin"]))
+        # WHEN I get the args to run a command in an environment
+        _, kwargs = environment_run_args("greet", tmp_path / ".venv", cwd=tmp_path)
+        # THEN only that environment is on the path
+        assert kwargs["env"]["PATH"] == os.pathsep.join([str(tmp_path / ".venv/bin"), "/usr/bin"])
+
+
+class TestDirectRun:
+    @staticmethod
+    def should_run_commands_with_prefix_by_default(tmp_path, monkeypatch):
+        monkeypatch.delenv("VIRTUAL_ENV", raising=False)
+        project = create_project(tmp_path)
+        assert run(project, ".venv/bin/greet hello") == "hello 1"
+        assert VenvAdapter.resolved == []
+
+    @staticmethod
+    def should_run_commands_directly_in_environment_given_direct_run(tmp_path):
+        # GIVEN a project with an environment
+        project = create_project(tmp_path)
+        # WHEN I run a command with direct runs enabled
+        with override_settings(direct_run=True):
+            output = run(project, "greet hello")
+        # THEN it runs in the environment, without the prefix
+        assert output == f"{project.resolved_path / '.venv'} hello"
+
+    @staticmethod
+    def should_fall_back_to_prefix_given_no_environment(tmp_path):
+        # GIVEN a project whose environment cannot be found
+        project = create_project(tmp_path, venv=False)
+        # WHEN I run a command with direct runs enabled
+        with override_settings(direct_run=True):
+            command, kwargs = project.adapter.run_args("greet hello")
+        # THEN the prefix is used
+        assert (command, kwargs) == project.adapter.prefixed_run_args("greet hello")
@@ -0,0 +1,292 @@
+import json
+import os
+import random
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import pytest
+
+from tests.utils import override_settings
+from workspace.core.adapter import Adapter, PathDependencies
+from workspace.core.exceptions import WorkspaceCycleError, WorkspaceProjectError
+from workspace.core.graph import DependencyGraph, Graph
+from workspace.core.models import Workspace
+
+PARSED: List[str] = []
+
+
+class ManifestAdapter(Adapter, name="graph-test"):
+    """Declares dependencies in a JSON manifest, recording each time it is parsed."""
+
+    @property
+    def manifest_path(self) -> Path:
+        return self._project.resolved_path / "manifest.json"
+
+    def manifest_paths(self) -> List[Path]:
+        return [self.manifest_path]
+
+    def path_dependencies(self) -> PathDependencies:
+        PARSED.append(self._project.name)
+        manifest = json.loads(self.manifest_path.read_text())
+        return PathDependencies(
+            default={(self._project.resolved_path / path).resolve() for path in manifest.get("default", [])},
+            dev={(self._project.resolved_path / path).resolve() for path in manifest.get("dev", [])},
+        )
+
+
+@pytest.fixture(autouse=True)
+def _clear_parsed():
+    PARSED.clear()
+    yield
+    PARSED.clear()
+
+
+def create_workspace(path: Path, manifests: Dict[str, dict]) -> Workspace:
+    workspace = Workspace(path=path, projects={})
+    for name, manifest in manifests.items():
+        workspace.set_project(name, path=name, type="graph-test")
+        write_manifest(workspace, name, manifest)
+    return workspace
+
+
+def write_manifest(workspace: Workspace, name: str, manifest: dict) -> None:
+    path = workspace.path / name
+    os.makedirs(path, exist_ok=True)
+    (path / "manifest.json").write_text(json.dumps(manifest))
+
+
+def load_dependencies(workspace: Workspace, include_dev: bool = False) -> Dict[str, set]:
+    graph = DependencyGraph(workspace)
+    result = {name: graph.dependencies(name, include_dev=include_dev) for name in workspace.projects}
+    graph.save()
+    return result
+
+
+class TestDependencyGraph:
+    @staticmethod
+    def should_resolve_dependencies_by_path(tmp_path):
+        # GIVEN a workspace with projects depending on one another
+        workspace = create_workspace(
+            tmp_path,
+            {"a": {"default": ["../b"], "dev": ["../c"]}, "b": {"default": ["../c"]}, "c": {}},
+        )
+        # WHEN I load the dependencies
+        dependencies = load_dependencies(workspace)
+        dev_dependencies = load_dependencies(workspace, include_dev=True)
+        # THEN the dependencies are resolved to project names
+        assert dependencies == {"a": {"b"}, "b": {"c"}, "c": set()}
+        assert dev_dependencies == {"a": {"b", "c"}, "b": {"c"}, "c": set()}
+
+    @staticmethod
+    def should_not_parse_unchanged_manifests(tmp_path):
+        # GIVEN a workspace whose dependencies have been loaded before
+        workspace = create_workspace(tmp_path, {"a": {"default": ["../b"]}, "b": {}})
+        load_dependencies(workspace)
+        PARSED.clear()
+        # WHEN I load the dependencies again
+        dependencies = load_dependencies(workspace)
+        # THEN no manifests are parsed
+        assert not PARSED
+        assert dependencies == {"a": {"b"}, "b": set()}
+
+    @staticmethod
+    def should_only_parse_changed_manifests(tmp_path):
+        # GIVEN a workspace whose dependencies have been loaded before
+        workspace = create_workspace(tmp_path, {"a": {"default": ["../b"]}, "b": {}, "c": {}})
+        load_dependencies(workspace)
+        PARSED.clear()
+        # WHEN I change one of the manifests
+        write_manifest(workspace, "b", {"default": ["../c"]})
+        dependencies = load_dependencies(workspace)
+        # THEN only that manifest is parsed
+        assert PARSED == ["b"]
+        assert dependencies == {"a": {"b"}, "b": {"c"}, "c": set()}
+
+    @staticmethod
+    def should_not_parse_touched_manifest_with_unchanged_content(tmp_path):
+        # GIVEN a workspace whose dependencies have been loaded before
+        workspace = create_workspace(tmp_path, {"a": {"default": ["../b"]}, "b": {}})
+        load_dependencies(workspace)
+        PARSED.clear()
+        # WHEN I update the modification time of a manifest without changing it
+        manifest_path = tmp_path / "a" / "manifest.json"
+        stat = os.stat(manifest_path)
+        os.utime(manifest_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        dependencies = load_dependencies(workspace)
+        # THEN the manifest is not parsed
+        assert not PARSED
+        assert dependencies == {"a": {"b"}, "b": set()}
+
+    @staticmethod
+    def should_resolve_cached_dependencies_against_current_projects(tmp_path):
+        # GIVEN a project depending on a path which is not yet a project
+        workspace = create_workspace(tmp_path, {"a": {"default": ["../b"]}})
+        assert load_dependencies(workspace) == {"a": set()}
+        PARSED.clear()
+        # WHEN I add a project at that path
+        workspace.set_project("b", path="b", type="graph-test")
+        write_manifest(workspace, "b", {})
+        dependencies = load_dependencies(workspace)
+        # THEN the dependency is found, and only the new project is parsed
+        assert dependencies == {"a": {"b"}, "b": set()}
+        assert PARSED == ["b"]
+
+    @staticmethod
+    def should_discard_removed_projects(tmp_path):
+        # GIVEN a workspace whose dependencies have been loaded before
+        workspace = create_workspace(tmp_path, {"a": {"default": ["../b"]}, "b": {}})
+        load_dependencies(workspace)
+        PARSED.clear()
+        # WHEN I remove a project
+        workspace.remove_project("b")
+        dependencies = load_dependencies(workspace)
+        # THEN it is no longer a dependency, or present in the cache
+        assert dependencies == {"a": set()}
+        assert not PARSED
+        assert set(DependencyGraph(workspace)._entries) == {"a"}
+
+    @staticmethod
+    def should_only_parse_manifests_reachable_from_roots(tmp_path):
+        # GIVEN a workspace where a -> b -> c, and d -> a
+        workspace = create_workspace(
+            tmp_path,
+            {"a": {"default": ["../b"]}, "b": {"default": ["../c"]}, "c": {}, "d": {"default": ["../a"]}},
+        )
+        # WHEN I build the graph of projects reachable from b
+        graph = DependencyGraph(workspace).graph(roots=["b"])
+        # THEN only the reachable projects are included
+        assert graph.nodes == ["b", "c"]
+        assert graph.successors("b") == ["c"]
+        # AND only their manifests are parsed
+        assert sorted(PARSED) == ["b", "c"]
+
+
+class TestDependencyGraphLoad:
+    @staticmethod
+    def should_parse_manifests_in_parallel(tmp_path):
+        # GIVEN a workspace with a chain of many projects
+        count = 20
+        workspace = create_workspace(
+            tmp_path, {f"project-{index:02}": {"default": [f"../project-{index + 1:02}"]} for index in range(count)}
+        )
+        # WHEN I load the dependencies using multiple workers
+        with override_settings(parse_workers=4):
+            graph = DependencyGraph(workspace)
+            graph.load()
+        # THEN the manifests are parsed outside of this process
+        assert not PARSED
+        # AND the dependencies are the same as when parsed serially
+        dependencies = {name: graph.dependencies(name) for name in workspace.projects}
+        assert not PARSED
+        assert dependencies == {
+            f"project-{index:02}": ({f"project-{index + 1:02}"} if index + 1 < count else set())
+            for index in range(count)
+        }
+
+    @staticmethod
+    def should_parse_manifests_serially_given_single_worker(tmp_path):
+        # GIVEN a workspace with many projects
+        workspace = create_workspace(tmp_path, {f"project-{index:02}": {} for index in range(10)})
+        # WHEN I load the dependencies using a single worker
+        with override_settings(parse_workers=1):
+            graph = DependencyGraph(workspace)
+            graph.load()
+            for name in workspace.projects:
+                graph.dependencies(name)
+        # THEN the manifests are parsed in this process
+        assert sorted(PARSED) == sorted(workspace.projects)
+
+    @staticmethod
+    def should_attribute_errors_to_first_failing_project(tmp_path):
+        # GIVEN a workspace with many projects, some of which have invalid manifests
+        workspace = create_workspace(tmp_path, {f"project-{index:02}": {} for index in range(10)})
+        for name in ("project-07", "project-03"):
+            (tmp_path / name / "manifest.json").write_text("{")
+        # WHEN I load the dependencies using multiple workers
+        with override_settings(parse_workers=4):
+            graph = DependencyGraph(workspace)
+            # THEN the error for the first failing project is raised
+            with pytest.raises(WorkspaceProjectError, match="'project-03'"):
+                graph.load()
+
+
+class TestGraph:
+    @staticmethod
+    def should_find_transitive_closure():
+        # GIVEN a graph where a -> b -> c, and d -> c
+        graph = Graph("abcd", {"a": ["b"], "b": ["c"], "d": ["c"]})
+        # WHEN I find the nodes reachable from a
+        closure = graph.closure(["a"])
+        # THEN b and c are reachable
+        assert closure.nodes == {"b", "c"}
+        # AND the size of the closure of each node is known
+        assert closure.sizes == {"a": 2, "b": 1, "c": 0}
+
+    @staticmethod
+    def should_find_reverse_closure():
+        # GIVEN a graph where a -> b -> c, and d -> c
+        graph = Graph("abcd", {"a": ["b"], "b": ["c"], "d": ["c"]})
+        # WHEN I find the nodes from which c is reachable
+        closure = graph.reverse_closure(["c"])
+        # THEN a, b and d are found
+        assert closure.nodes == {"a", "b", "d"}
+        assert closure.sizes == {"a": 0, "b": 1, "c": 3, "d": 0}
+
+    @staticmethod
+    def should_include_nodes_in_a_cycle_in_their_own_closure():
+        # GIVEN a graph where a -> b -> c -> b
+        graph = Graph("abc", {"a": ["b"], "b": ["c"], "c": ["b"]})
+        # WHEN I find the nodes reachable from a
+        closure = graph.closure(["a"])
+        # THEN the closure terminates, and includes b and c
+        assert closure.nodes == {"b", "c"}
+        assert closure.sizes == {"a": 2, "b": 2, "c": 2}
+
+    @staticmethod
+    def should_report_cycles():
+        # GIVEN a graph with two cycles, one of which is a self-loop
+        graph = Graph("abcde", {"a": ["b"], "b": ["c"], "c": ["a"], "d": ["d"], "e": ["a"]})
+        # WHEN I find the cycles
+        cycles = graph.cycles()
+        # THEN both are reported
+        assert cycles == [["a", "b", "c"], ["d"]]
+
+    @staticmethod
+    def should_sort_topologically():
+        # GIVEN a graph where a -> b -> c, and a -> d
+        graph = Graph("abcd", {"a": ["b", "d"], "b": ["c"]})
+        # WHEN I sort it topologically
+        order = graph.toposort()
+        # THEN each node comes after its successors
+        assert order == ["c", "b", "d", "a"]
+
+    @staticmethod
+    def should_raise_when_sorting_graph_with_cycle():
+        # GIVEN a graph with a cycle
+        graph = Graph("abc", {"a": ["b"], "b": ["c"], "c": ["b"]})
+        # WHEN I sort it topologically
+        # THEN the cycle is reported
+        with pytest.raises(WorkspaceCycleError, match="b -> c -> b"):
+            graph.toposort()
+
+    @staticmethod
+    def should_handle_large_graphs():
+        # GIVEN a large graph, containing a long chain
+        count = 50_000
+        rng = random.Random(0)
+        nodes = [str(index) for index in range(count)]
+        edges = {
+            str(index): [str(index + 1)] + [str(rng.randrange(index + 1, count)) for _ in range(2)]
+            for index in range(count - 1)
+        }
+        start = time.perf_counter()
+        graph = Graph(nodes, edges)
+        # WHEN I find closures and sort it topologically
+        closure = graph.closure(["0"])
+        reverse_closure = graph.reverse_closure([str(count - 1)])
+        order = graph.toposort()
+        # THEN the results are correct, and found in reasonable time
+        assert len(closure.nodes) == len(reverse_closure.nodes) == count - 1
+        assert order == list(reversed(nodes))
+        assert time.perf_counter() - start < 20
@@ -0,0 +1,67 @@
+from pathlib import Path
+
+from workspace.core.history import DurationHistory, RunOutcomes
+
+
+class TestDurationHistory:
+    @staticmethod
+    def should_remember_durations_between_runs(tmp_path):
+        # GIVEN durations recorded in one run
+        history = DurationHistory(tmp_path)
+        assert history.get("a", "pytest") is None
+        history.record("a", "pytest", 10.0)
+        history.save()
+        # WHEN I load the history again
+        history = DurationHistory(tmp_path)
+        # THEN the durations are remembered, by project and command
+        assert history.get("a", "pytest") == 10.0
+        assert history.get("a", "mypy") is None
+        assert DurationHistory(Path("/elsewhere")).get("a", "pytest") is None
+
+    @staticmethod
+    def should_weight_recent_durations():
+        # GIVEN a command which has taken 10 seconds
+        history = DurationHistory(Path("/workspace"))
+        history.record("a", "pytest", 10.0)
+        # WHEN it takes 20 seconds
+        history.record("a", "pytest", 20.0)
+        # THEN the expected duration moves towards the latest duration
+        duration = history.get("a", "pytest")
+        assert duration is not None and 10.0 < duration < 20.0
+
+    @staticmethod
+    def should_keep_durations_saved_by_other_runs(tmp_path):
+        # GIVEN two runs which have loaded the history
+        first, second = DurationHistory(tmp_path), DurationHistory(tmp_path)
+        # WHEN each records a different project, and saves
+        first.record("a", "pytest", 1.0)
+        first.save()
+        second.record("b", "pytest", 2.0)
+        second.save()
+        # THEN both durations are kept
+        history = DurationHistory(tmp_path)
+        assert (history.get("a", "pytest"), history.get("b", "pytest")) == (1.0, 2.0)
+
+
+class TestRunOutcomes:
+    @staticmethod
+    def should_remember_latest_outcome_of_each_command(tmp_path):
+        # GIVEN a run of a command, in which one project failed
+        outcomes = RunOutcomes(tmp_path)
+        outcomes.start("pytest", ["a", "b", "c"])
+        outcomes.record("pytest", "a", "succeeded")
+        outcomes.record("pytest", "b", "failed")
+        outcomes.save()
+        # WHEN I load the outcomes again
+        outcomes = RunOutcomes(tmp_path)
+        # THEN the status of each selected project is remembered
+        assert outcomes.get("pytest") == {"a": "succeeded", "b": "failed", "c": "pending"}
+        assert outcomes.get("mypy") == {}
+
+    @staticmethod
+    def should_replace_outcome_given_new_run(tmp_path):
+        outcomes = RunOutcomes(tmp_path)
+        outcomes.start("pytest", ["a", "b"])
+        outcomes.record("pytest", "a", "failed")
+        outcomes.start("pytest", ["c"])
+        assert outcomes.get("pytest") == {"c": "pending"}
@@ -1,13 +1,22 @@
 import json
 import os
 import shutil
+import subprocess
+import sys
 from pathlib import Path
+from textwrap import dedent
 from typing import Union
 
 import pytest
 
 from tests.utils import override_settings
-from workspace.core.exceptions import WorkspaceNotFoundError, WorkspacePluginError, WorkspaceValidationError
+from workspace.core import cache, models
+from workspace.core.exceptions import (
+    WorkspaceConflictError,
+    WorkspaceNotFoundError,
+    WorkspacePluginError,
+    WorkspaceValidationError,
+)
 from workspace.core.models import Workspace
 
 ROOT_PATH = Path("test-tree").resolve()
@@ -109,3 +118,233 @@ class TestWorkspace:
         with pytest.raises(WorkspacePluginError):
             Workspace.from_path(ROOT_PATH)
         # THEN the correct exception is raised
+
+    @staticmethod
+    def should_load_from_configured_root():
+        # GIVEN a path contains a workspace file
+        init_workspaces_file(ROOT_PATH)
+        # AND the workspace root is configured
+        with override_settings(root=str(ROOT_PATH)):
+            # WHEN I load the workspace without a path
+            workspace = Workspace.from_path()
+        # THEN the configured workspace is loaded
+        assert workspace.path == ROOT_PATH
+
+    @staticmethod
+    def should_raise_when_configured_root_has_no_workspace():
+        # GIVEN the workspace root is configured to a directory with no workspace file
+        with override_settings(root=str(ROOT_PATH)):
+            # WHEN I load the workspace without a path
+            with pytest.raises(WorkspaceNotFoundError):
+                Workspace.from_path()
+        # THEN the correct exception is raised
+
+    @staticmethod
+    def should_get_project_by_path():
+        # GIVEN a workspace with a project
+        init_workspaces_file(ROOT_PATH)
+        workspace = Workspace.from_path(ROOT_PATH)
+        project = workspace.set_project("library", path="libs/library", type="poetry")
+        # WHEN I get the project by an equivalent path
+        result = workspace.get_project_by_path(ROOT_PATH / "libs" / ".." / "libs/library")
+        # THEN the project is returned
+        assert result is project
+        # AND the project cannot be found once removed
+        workspace.remove_project("library")
+        assert workspace.get_project_by_path(ROOT_PATH / "libs/library") is None
+
+    @staticmethod
+    def should_get_innermost_project_containing_path():
+        # GIVEN a workspace with a project nested inside another
+        init_workspaces_file(ROOT_PATH)
+        workspace = Workspace.from_path(ROOT_PATH)
+        workspace.set_project("outer", path="libs", type="poetry")
+        workspace.set_project("inner", path="libs/inner", type="poetry")
+        # WHEN I get the project containing a file in the nested project
+        result = workspace.get_project_containing(ROOT_PATH / "libs/inner/src/module.py")
+        # THEN the innermost project is returned
+        assert result and result.name == "inner"
+        # AND paths outside any project have no project
+        assert workspace.get_project_containing(ROOT_PATH / "other/file.py") is None
+
+
+class TestWorkspaceFlush:
+    @staticmethod
+    def should_write_once_per_transaction(monkeypatch):
+        # GIVEN a workspace
+        init_workspaces_file(ROOT_PATH)
+        workspace = Workspace.from_path(ROOT_PATH)
+        writes = []
+        atomic_write = cache.atomic_write
+        monkeypatch.setattr(cache, "atomic_write", lambda *args: writes.append(args) or atomic_write(*args))
+        # WHEN I make several changes in a transaction
+        with workspace.transaction():
+            for name in ("one", "two", "three"):
+                workspace.set_project(name, path=name, type="poetry")
+                workspace.flush()
+        # THEN the workspace file is written once
+        assert [path for path, _ in writes].count(ROOT_PATH / WORKSPACE_FILENAME) == 1
+        # AND contains all the changes
+        assert set(Workspace.from_path(ROOT_PATH).projects) == {"one", "two", "three"}
+
+    @staticmethod
+    def should_not_write_when_transaction_fails():
+        # GIVEN a workspace
+        init_workspaces_file(ROOT_PATH)
+        workspace = Workspace.from_path(ROOT_PATH)
+        # WHEN a transaction fails after making changes
+        with pytest.raises(RuntimeError):
+            with workspace.transaction():
+                workspace.set_project("one", path="one", type="poetry")
+                workspace.flush()
+                raise RuntimeError
+        # THEN the workspace file is unchanged
+        assert Workspace.from_path(ROOT_PATH).projects == {}
+
+    @staticmethod
+    def should_raise_if_file_changed_since_load():
+        # GIVEN a workspace has been loaded
+        init_workspaces_file(ROOT_PATH)
+        workspace = Workspace.from_path(ROOT_PATH)
+        # AND another process has changed the workspace file
+        other = Workspace.from_path(ROOT_PATH)
+        other.set_project("other", path="other", type="poetry")
+        other.flush()
+        # WHEN I write the first workspace
+        workspace.set_project("one", path="one", type="poetry")
+        with pytest.raises(WorkspaceConflictError):
+            workspace.flush()
+        # THEN the other change is preserved
+        assert set(Workspace.from_path(ROOT_PATH).projects) == {"other"}
+
+    @staticmethod
+    def should_allow_consecutive_writes():
+        # GIVEN a workspace has been written
+        init_workspaces_file(ROOT_PATH)
+        workspace = Workspace.from_path(ROOT_PATH)
+        workspace.set_project("one", path="one", type="poetry")
+        workspace.flush()
+        # WHEN I write it again
+        workspace.set_project("two", path="two", type="poetry")
+        workspace.flush()
+        # THEN both changes are written
+        assert set(Workspace.from_path(ROOT_PATH).projects) == {"one", "two"}
+        # AND no temporary files are left behind
+        assert {path.name for path in ROOT_PATH.iterdir()} == {WORKSPACE_FILENAME}
+
+    @staticmethod
+    def should_write_project_inputs():
+        # GIVEN a project with input globs
+        init_workspaces_file(ROOT_PATH)
+        workspace = Workspace.from_path(ROOT_PATH)
+        workspace.set_project("one", path="one", type="poetry", inputs={"include": ["src"], "exclude": ["*.md"]})
+        # WHEN I write the workspace
+        workspace.flush()
+        # THEN the input globs are written, and loaded again
+        assert Workspace.from_path(ROOT_PATH).projects["one"].inputs == {"include": ["src"], "exclude": ["*.md"]}
+
+    @staticmethod
+    def should_write_project_outputs():
+        init_workspaces_file(ROOT_PATH)
+        workspace = Workspace.from_path(ROOT_PATH)
+        workspace.set_project("one", path="one", type="poetry", outputs=["dist"])
+        workspace.flush()
+        assert Workspace.from_path(ROOT_PATH).projects["one"].outputs == ["dist"]
+
+
+class TestWorkspaceCache:
+    @staticmethod
+    def should_skip_parsing_unchanged_workspace(monkeypatch):
+        # GIVEN a workspace has been loaded once
+        init_workspaces_file(ROOT_PATH)
+        Workspace.from_path(ROOT_PATH)
+        # WHEN I load it again without changes
+        monkeypatch.setattr(models, "_parse_body", _fail_parse)
+        workspace = Workspace.from_path(ROOT_PATH)
+        # THEN the cached workspace is used
+        assert workspace.path == ROOT_PATH
+
+    @staticmethod
+    def should_reparse_changed_workspace():
+        # GIVEN a workspace has been loaded once
+        init_workspaces_file(ROOT_PATH)
+        Workspace.from_path(ROOT_PATH)
+        # WHEN the workspace file is edited
+        workspace_file = ROOT_PATH / WORKSPACE_FILENAME
+        workspace_file.write_text(json.dumps({"projects": {"foo": {"path": "foo", "type": "poetry"}}}))
+        os.utime(workspace_file, ns=(0, 0))
+        workspace = Workspace.from_path(ROOT_PATH)
+        # THEN the new content is loaded
+        assert set(workspace.projects) == {"foo"}
+
+    @staticmethod
+    def should_revalidate_workspace_given_changed_schema(monkeypatch):
+        # GIVEN a workspace has been loaded once
+        init_workspaces_file(ROOT_PATH)
+        Workspace.from_path(ROOT_PATH)
+        # WHEN the schema changes, as on upgrading
+        monkeypatch.setattr(models, "_SCHEMA_DIGEST", "changed")
+        monkeypatch.setattr(models, "_parse_body", _fail_parse)
+        # THEN the workspace is validated again
+        with pytest.raises(AssertionError, match="should not be parsed"):
+            Workspace.from_path(ROOT_PATH)
+
+    @staticmethod
+    def should_not_cache_invalid_workspace():
+        # GIVEN a valid workspace has been loaded once
+        init_workspaces_file(ROOT_PATH)
+        Workspace.from_path(ROOT_PATH)
+        # WHEN the workspace file is made invalid
+        (ROOT_PATH / WORKSPACE_FILENAME).write_text("{}")
+        # THEN loading it raises
+        with pytest.raises(WorkspaceValidationError):
+            Workspace.from_path(ROOT_PATH)
+
+
+class TestWorkspacePlugins:
+    @staticmethod
+    def should_only_import_plugin_when_its_adapter_is_requested(tmp_path):
+        # GIVEN a plugin module providing an adapter
+        plugin_dir = tmp_path / "plugins"
+        os.mkdir(plugin_dir)
+        (plugin_dir / "lazy_plugin.py").write_text(
+            dedent(
+                """
+                from workspace.core.adapter import Adapter
+
+                class LazyAdapter(Adapter, name="lazy"):
+                    pass
+                """
+            )
+        )
+        # AND a workspace with the plugin enabled
+        with open(ROOT_PATH / WORKSPACE_FILENAME, "w", encoding="utf-8") as file:
+            file.write(json.dumps({"projects": {}, "plugins": ["lazy_plugin"]}))
+        # AND the workspace has been loaded before
+        script = dedent(
+            f"""
+            import sys
+            from workspace.core.adapter import get_adapter
+            from workspace.core.models import Workspace
+
+            Workspace.from_path({str(ROOT_PATH)!r})
+            print("lazy_plugin" in sys.modules)
+            print(get_adapter("lazy").__name__)
+            print("lazy_plugin" in sys.modules)
+            """
+        )
+        env = {
+            **os.environ,
+            "PYTHONPATH": os.pathsep.join([str(plugin_dir), str(Path.cwd())]),
+            "WORKSPACE_FILENAME": WORKSPACE_FILENAME,
+            "WORKSPACE_CACHE_DIR": str(tmp_path / "cache"),
+        }
+        subprocess.run([sys.executable, "-c", script], env=env, check=True)
+        # WHEN I load the workspace again
+        result = subprocess.run([sys.executable, "-c", script], env=env, check=True, capture_output=True, text=True)
+        # THEN the plugin is only imported once its adapter is requested
+        assert result.stdout.splitlines() == ["False", "LazyAdapter", "True"]
+
+
+def _fail_parse(*args, **kwargs):
+    raise AssertionError("Workspace file should not be parsed.")
@@ -0,0 +1,79 @@
+import os
+import sys
+from pathlib import Path
+from textwrap import dedent
+
+import pytest
+
+from workspace.core import artifacts
+from workspace.core.models import Workspace
+from workspace.core.plugins import _module_stamp, discover_plugin, load_plugins
+
+
+@pytest.fixture
+def plugin_path(tmp_path, monkeypatch):
+    path = tmp_path / "plugins"
+    path.mkdir()
+    monkeypatch.syspath_prepend(str(path))
+    return path
+
+
+def write_module(path: Path, content: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(dedent(content))
+
+
+ADAPTER_MODULE = """
+    from workspace.core.adapter import Adapter
+
+    class {name}Adapter(Adapter, name="{name}"):
+        pass
+"""
+
+
+class TestPlugins:
+    @staticmethod
+    def should_discover_adapters_imported_from_other_modules(tmp_path, plugin_path):
+        # GIVEN a plugin which imports its adapter from another module
+        write_module(plugin_path / "reexported_adapters.py", ADAPTER_MODULE.format(name="reexported"))
+        write_module(plugin_path / "reexporting_plugin.py", "from reexported_adapters import reexportedAdapter\n")
+        # WHEN I discover the types it provides
+        types = discover_plugin(Workspace(path=tmp_path, projects={}), "reexporting_plugin")
+        # THEN the imported adapter is included
+        assert types == ["reexported"]
+
+    @staticmethod
+    def should_change_stamp_given_changed_submodule_of_package(plugin_path):
+        # GIVEN a plugin package, whose adapter is defined in a submodule
+        write_module(plugin_path / "stamped_plugin/__init__.py", "from stamped_plugin.adapters import *\n")
+        write_module(plugin_path / "stamped_plugin/adapters.py", ADAPTER_MODULE.format(name="stamped"))
+        stamp = _module_stamp("stamped_plugin")
+        # WHEN the submodule changes
+        os.utime(plugin_path / "stamped_plugin/adapters.py", ns=(0, 0))
+        # THEN the stamp of the plugin changes
+        assert _module_stamp("stamped_plugin") != stamp
+
+    @staticmethod
+    def should_import_plugin_when_its_store_is_requested(tmp_path, plugin_path, monkeypatch):
+        # GIVEN a plugin which only provides an artifact store
+        write_module(
+            plugin_path / "store_plugin.py",
+            """
+            from workspace.core.artifacts import LocalStore
+
+            class PluginStore(LocalStore, schemes=("plugin-test",)):
+                pass
+            """,
+        )
+        workspace = Workspace(path=tmp_path, projects={}, plugins=["store_plugin"])
+        # AND it has been recorded in the manifest, but not imported since
+        load_plugins(workspace)
+        monkeypatch.delitem(sys.modules, "store_plugin")
+        monkeypatch.delitem(artifacts._STORES, "plugin-test")
+        monkeypatch.setattr(artifacts, "_LAZY_STORES", {})
+        load_plugins(workspace)
+        assert "store_plugin" not in sys.modules
+        # WHEN I get a store for its scheme
+        store = artifacts.get_store("plugin-test://" + str(tmp_path / "artifacts"))
+        # THEN the plugin is imported to provide it
+        assert type(store).__name__ == "PluginStore"
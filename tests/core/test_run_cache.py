@@ -0,0 +1,317 @@
+import io
+import os
+import shutil
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Optional, cast
+
+import pytest
+
+from workspace.core.adapter import Adapter
+from workspace.core.artifacts import LocalStore
+from workspace.core.graph import Graph
+from workspace.core.models import Workspace
+from workspace.core.run_cache import CachedResult, RunCache, compile_globs, project_inputs, project_outputs
+
+
+class LockedAdapter(Adapter, name="run-cache-test"):
+    """Declares dependencies in a manifest, and pins them in a lockfile."""
+
+    def manifest_paths(self) -> List[Path]:
+        return [self._project.resolved_path / "manifest.json"]
+
+    def lock_paths(self) -> List[Path]:
+        return [self._project.resolved_path / "manifest.lock"]
+
+    def resolve_environment(self) -> Optional[Path]:
+        return self._project.resolved_path / ".venv"
+
+
+def create_workspace(
+    path: Path,
+    files: Dict[str, Dict[str, str]],
+    inputs: Dict[str, dict] = None,
+    outputs: Dict[str, List[str]] = None,
+) -> Workspace:
+    workspace = Workspace(path=path / "workspace", projects={})
+    for name, contents in files.items():
+        workspace.set_project(
+            name,
+            path=name,
+            type="run-cache-test",
+            inputs=(inputs or {}).get(name),
+            outputs=(outputs or {}).get(name),
+        )
+        for filename, content in {"manifest.json": "{}", **contents}.items():
+            file_path = workspace.path / name / filename
+            os.makedirs(file_path.parent, exist_ok=True)
+            file_path.write_text(content)
+    return workspace
+
+
+def get_key(workspace: Workspace, name: str, command: str = "pytest", graph: Graph = None) -> str:
+    graph = graph or Graph(workspace.projects, {})
+    return RunCache(workspace, graph).key(workspace.projects[name], command)
+
+
+class TestCompileGlobs:
+    @staticmethod
+    @pytest.mark.parametrize(
+        "pattern,path,expected",
+        [
+            ("*.py", "setup.py", True),
+            ("*.py", "src/module.py", False),
+            ("**/*.py", "src/module.py", True),
+            ("**/*.py", "setup.py", True),
+            ("src", "src/package/module.py", True),
+            ("src/*", "src/package/module.py", True),
+            ("docs/**", "docs/index.md", True),
+            ("test?.txt", "test1.txt", True),
+            ("test?.txt", "test/1.txt", False),
+        ],
+    )
+    def should_match_paths_relative_to_project(pattern, path, expected):
+        # GIVEN a glob
+        # WHEN I compile it
+        regex = compile_globs([pattern])
+        # THEN it matches the expected paths
+        assert bool(regex.fullmatch(path)) is expected
+
+    @staticmethod
+    def should_match_nothing_given_no_globs():
+        assert not compile_globs([]).fullmatch("anything")
+
+
+class TestProjectInputs:
+    @staticmethod
+    def should_select_files_by_include_and_exclude_globs(tmp_path):
+        # GIVEN a project with inputs configured
+        workspace = create_workspace(
+            tmp_path,
+            {"a": {"src/module.py": "", "src/notes.md": "", "README.md": ""}},
+            inputs={"a": {"include": ["src"], "exclude": ["**/*.md"]}},
+        )
+        # WHEN I get its input files
+        inputs = project_inputs(workspace.projects["a"])
+        # THEN only the selected files are included
+        assert inputs == [workspace.path / "a/src/module.py"]
+
+    @staticmethod
+    def should_include_every_file_by_default(tmp_path):
+        # GIVEN a project without inputs configured
+        workspace = create_workspace(tmp_path, {"a": {"src/module.py": "", ".venv/lib.py": ""}})
+        # WHEN I get its input files
+        inputs = project_inputs(workspace.projects["a"])
+        # THEN every file is included, except those in hidden directories
+        assert sorted(inputs) == [workspace.path / "a/manifest.json", workspace.path / "a/src/module.py"]
+
+    @staticmethod
+    @pytest.mark.skipif(shutil.which("git") is None, reason="git is not installed")
+    def should_exclude_files_ignored_by_git(tmp_path):
+        # GIVEN a project in a git repository, which ignores some files
+        workspace = create_workspace(tmp_path, {"a": {"src/module.py": "", "build/module.py": ""}})
+        subprocess.run(["git", "init", "-q", str(workspace.path)], check=True)
+        (workspace.path / ".gitignore").write_text("build/\n")
+        # WHEN I get its input files
+        inputs = project_inputs(workspace.projects["a"])
+        # THEN ignored files are excluded
+        assert sorted(inputs) == [workspace.path / "a/manifest.json", workspace.path / "a/src/module.py"]
+
+    @staticmethod
+    def should_exclude_outputs(tmp_path):
+        # GIVEN a project with outputs configured
+        workspace = create_workspace(tmp_path, {"a": {"src/module.py": "", "dist/a.whl": ""}}, outputs={"a": ["dist"]})
+        # WHEN I get its input files
+        inputs = project_inputs(workspace.projects["a"])
+        # THEN its outputs are excluded
+        assert sorted(inputs) == [workspace.path / "a/manifest.json", workspace.path / "a/src/module.py"]
+
+
+class TestProjectOutputs:
+    @staticmethod
+    @pytest.mark.parametrize(
+        "globs,expected",
+        [
+            (["dist"], ["dist/a.whl", "dist/b.tar.gz"]),
+            (["dist/*.whl"], ["dist/a.whl"]),
+            (["**/*.whl"], ["dist/a.whl"]),
+            (["report.xml"], ["report.xml"]),
+            (["missing"], []),
+        ],
+    )
+    def should_select_files_by_globs(tmp_path, globs, expected):
+        # GIVEN a project with outputs configured
+        workspace = create_workspace(
+            tmp_path,
+            {"a": {"dist/a.whl": "", "dist/b.tar.gz": "", "report.xml": "", "src/module.py": ""}},
+            outputs={"a": globs},
+        )
+        # WHEN I get its output files
+        outputs = project_outputs(workspace.projects["a"])
+        # THEN only the selected files are included
+        assert outputs == [workspace.path / "a" / path for path in expected]
+
+
+class TestRunCache:
+    @staticmethod
+    def should_give_same_key_given_unchanged_inputs(tmp_path):
+        # GIVEN a project
+        workspace = create_workspace(tmp_path, {"a": {"main.py": "print(1)"}})
+        # WHEN I get the key of a command twice
+        # THEN the keys are the same
+        assert get_key(workspace, "a") == get_key(workspace, "a")
+
+    @staticmethod
+    @pytest.mark.parametrize(
+        "change",
+        [
+            lambda workspace: (workspace.path / "a/main.py").write_text("print(2)"),
+            lambda workspace: (workspace.path / "a/new.py").write_text(""),
+            lambda workspace: (workspace.path / "a/manifest.lock").write_text("locked"),
+        ],
+    )
+    def should_change_key_given_changed_inputs(tmp_path, change):
+        # GIVEN a project
+        workspace = create_workspace(tmp_path, {"a": {"main.py": "print(1)"}})
+        key = get_key(workspace, "a")
+        # WHEN I change its inputs or lockfile
+        change(workspace)
+        # THEN the key changes
+        assert get_key(workspace, "a") != key
+
+    @staticmethod
+    def should_change_key_given_changed_python_in_environment(tmp_path):
+        # GIVEN a project with an environment
+        workspace = create_workspace(tmp_path, {"a": {".venv/bin/python": "", ".venv/pyvenv.cfg": "version = 3.8.12"}})
+        key = get_key(workspace, "a")
+        # WHEN its environment is recreated with another version of Python
+        (workspace.path / "a/.venv/pyvenv.cfg").write_text("version = 3.9.7")
+        # THEN the key changes
+        assert get_key(workspace, "a") != key
+
+    @staticmethod
+    def should_change_key_given_different_command(tmp_path):
+        workspace = create_workspace(tmp_path, {"a": {}})
+        assert get_key(workspace, "a", command="pytest") != get_key(workspace, "a", command="mypy")
+
+    @staticmethod
+    def should_ignore_changes_to_excluded_files(tmp_path):
+        # GIVEN a project whose documentation is excluded from its inputs
+        workspace = create_workspace(tmp_path, {"a": {"README.md": "a"}}, inputs={"a": {"exclude": ["*.md"]}})
+        key = get_key(workspace, "a")
+        # WHEN I change the documentation
+        (workspace.path / "a/README.md").write_text("b")
+        # THEN the key is unchanged
+        assert get_key(workspace, "a") == key
+
+    @staticmethod
+    def should_change_key_given_changed_transitive_dependency(tmp_path):
+        # GIVEN a depends on b, which depends on c
+        workspace = create_workspace(tmp_path, {"a": {}, "b": {}, "c": {"main.py": "print(1)"}})
+        graph = Graph(workspace.projects, {"a": ["b"], "b": ["c"]})
+        key = get_key(workspace, "a", graph=graph)
+        # WHEN I change c
+        (workspace.path / "c/main.py").write_text("print(2)")
+        # THEN the key of a changes
+        assert get_key(workspace, "a", graph=graph) != key
+
+    @staticmethod
+    def should_not_read_unchanged_files_again(tmp_path, monkeypatch):
+        # GIVEN a project whose inputs have been digested before
+        workspace = create_workspace(tmp_path, {"a": {"main.py": "print(1)"}})
+        run_cache = RunCache(workspace, Graph(workspace.projects, {}))
+        key = run_cache.key(workspace.projects["a"], "pytest")
+        run_cache.save()
+        # WHEN I get the key again
+        opened = []
+        real_open = open
+        monkeypatch.setattr(
+            "builtins.open", lambda path, *args, **kwargs: opened.append(path) or real_open(path, *args, **kwargs)
+        )
+        assert get_key(workspace, "a") == key
+        # THEN no input files are read
+        assert not [path for path in opened if str(path).startswith(str(workspace.path))]
+
+    @staticmethod
+    def should_record_results(tmp_path):
+        # GIVEN a run cache
+        workspace = create_workspace(tmp_path, {"a": {}})
+        run_cache = RunCache(workspace, Graph(workspace.projects, {}))
+        key = run_cache.key(workspace.projects["a"], "pytest")
+        assert run_cache.get(key) is None
+        # WHEN I record a result
+        run_cache.put(workspace.projects["a"], key, 3, io.BytesIO(b"some output\n"))
+        # THEN it can be retrieved
+        cached = RunCache(workspace, Graph(workspace.projects, {})).get(key)
+        assert cached is not None
+        assert (cached.exit_code, cached.output) == (3, b"some output\n")
+
+    @staticmethod
+    def should_record_and_restore_outputs_of_successful_commands(tmp_path):
+        # GIVEN a project with outputs, which a command has produced
+        workspace = create_workspace(tmp_path, {"a": {"dist/a.sh": "echo a"}}, outputs={"a": ["dist"]})
+        project = workspace.projects["a"]
+        os.chmod(project.resolved_path / "dist/a.sh", 0o755)
+        run_cache = RunCache(workspace, Graph(workspace.projects, {}))
+        key = run_cache.key(project, "build")
+        # WHEN I record its result, remove the outputs, and restore them from the recorded result
+        run_cache.put(project, key, 0, io.BytesIO(b""))
+        shutil.rmtree(project.resolved_path / "dist")
+        cached = RunCache(workspace, Graph(workspace.projects, {})).get(key)
+        assert cached is not None
+        run_cache.restore(project, cached)
+        # THEN the outputs are restored, along with their modes
+        assert (project.resolved_path / "dist/a.sh").read_text() == "echo a"
+        assert os.stat(project.resolved_path / "dist/a.sh").st_mode & 0o777 == 0o755
+
+    @staticmethod
+    def should_not_record_outputs_of_failed_commands(tmp_path):
+        workspace = create_workspace(tmp_path, {"a": {"dist/a.whl": ""}}, outputs={"a": ["dist"]})
+        project = workspace.projects["a"]
+        run_cache = RunCache(workspace, Graph(workspace.projects, {}))
+        key = run_cache.key(project, "build")
+        run_cache.put(project, key, 1, io.BytesIO(b""))
+        cached = run_cache.get(key)
+        assert cached is not None
+        assert cached.files == {}
+
+    @staticmethod
+    def should_not_record_outputs_outside_project(tmp_path):
+        # GIVEN a project whose outputs include a file outside of it
+        workspace = create_workspace(tmp_path, {"a": {}, "b": {"secret.txt": ""}}, outputs={"a": ["../b/secret.txt"]})
+        project = workspace.projects["a"]
+        run_cache = RunCache(workspace, Graph(workspace.projects, {}))
+        key = run_cache.key(project, "build")
+        # WHEN I record the result of a successful command
+        run_cache.put(project, key, 0, io.BytesIO(b""))
+        # THEN the file outside the project is not recorded
+        cached = run_cache.get(key)
+        assert cached is not None
+        assert cached.files == {}
+
+    @staticmethod
+    @pytest.mark.parametrize("relative", ["../b/main.py", "/tmp/main.py", "link/main.py"])
+    def should_not_restore_outputs_outside_project(tmp_path, relative):
+        # GIVEN a recorded result, from a shared store, with a file outside the project
+        workspace = create_workspace(tmp_path, {"a": {}, "b": {"main.py": "print(1)"}})
+        project = workspace.projects["a"]
+        os.symlink(workspace.path / "b", project.resolved_path / "link")
+        target = tmp_path / "tmp/main.py" if relative.startswith("/") else workspace.path / "b/main.py"
+        relative = str(tmp_path / "tmp/main.py") if relative.startswith("/") else relative
+        cached = CachedResult(exit_code=0, output=b"", files={relative: (b"print(2)", 0o644)})
+        # WHEN I restore it
+        RunCache(workspace, Graph(workspace.projects, {})).restore(project, cached)
+        # THEN nothing is written outside the project
+        assert not target.exists() or target.read_text() == "print(1)"
+
+    @staticmethod
+    def should_ignore_results_with_missing_artifacts(tmp_path):
+        # GIVEN a recorded result
+        workspace = create_workspace(tmp_path, {"a": {}})
+        run_cache = RunCache(workspace, Graph(workspace.projects, {}))
+        key = run_cache.key(workspace.projects["a"], "pytest")
+        run_cache.put(workspace.projects["a"], key, 0, io.BytesIO(b"some output\n"))
+        # WHEN its output is removed from the store
+        shutil.rmtree(cast(LocalStore, run_cache.store).path / "blobs")
+        # THEN the result is not found
+        assert run_cache.get(key) is None
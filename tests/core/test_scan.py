@@ -0,0 +1,103 @@
+from pathlib import Path
+from textwrap import dedent
+
+import pytest
+
+from workspace.core.exceptions import WorkspaceProjectImproperlyConfigured
+from workspace.core.models import Workspace
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    return Workspace(path=tmp_path, projects={})
+
+
+def write(path: Path, content: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(dedent(content))
+
+
+class TestPoetryScan:
+    @staticmethod
+    def should_find_default_and_dev_path_dependencies(workspace, tmp_path):
+        # GIVEN a poetry project with path dependencies in each dependency section
+        project = workspace.set_project("app", path="app", type="poetry")
+        write(
+            tmp_path / "app/pyproject.toml",
+            """
+            [tool.poetry]
+            name = "app"
+
+            [tool.poetry.dependencies]
+            python = "^3.8"
+            lib-one = {path = "../lib-one", develop = true}
+            lib-two = [
+                {path = "../lib-two", markers = "sys_platform == 'linux'"},
+                {version = "^1.0", markers = "sys_platform != 'linux'"},
+            ]
+
+            [tool.poetry.dev-dependencies]
+            lib-three = {path = "../lib-three"}
+
+            [tool.poetry.group.test.dependencies]
+            lib-four = {path = "../lib-four"}
+            """,
+        )
+        # WHEN I scan it for path dependencies
+        default, dev = project.adapter.path_dependencies()
+        # THEN dependencies in the main section are default dependencies
+        assert default == {(tmp_path / "lib-one").resolve(), (tmp_path / "lib-two").resolve()}
+        # AND those in dev-dependencies and dependency groups are development dependencies
+        assert dev == {(tmp_path / "lib-three").resolve(), (tmp_path / "lib-four").resolve()}
+
+    @staticmethod
+    def should_raise_given_invalid_toml(workspace, tmp_path):
+        # GIVEN a poetry project with invalid TOML
+        project = workspace.set_project("app", path="app", type="poetry")
+        write(tmp_path / "app/pyproject.toml", "[tool.poetry")
+        # WHEN I scan it for path dependencies
+        # THEN an error naming the project is raised
+        with pytest.raises(WorkspaceProjectImproperlyConfigured, match="'app'"):
+            project.adapter.path_dependencies()
+
+    @staticmethod
+    def should_raise_given_missing_poetry_section(workspace, tmp_path):
+        # GIVEN a project whose pyproject.toml is not configured for poetry
+        project = workspace.set_project("app", path="app", type="poetry")
+        write(tmp_path / "app/pyproject.toml", "[tool.black]\n")
+        # WHEN I scan it for path dependencies
+        # THEN an error is raised
+        with pytest.raises(WorkspaceProjectImproperlyConfigured, match=r"\[tool.poetry\]"):
+            project.adapter.path_dependencies()
+
+
+class TestPipenvScan:
+    @staticmethod
+    def should_find_default_and_dev_path_dependencies(workspace, tmp_path):
+        # GIVEN a pipenv project with path dependencies in each section
+        project = workspace.set_project("app", path="app", type="pipenv")
+        write(
+            tmp_path / "app/Pipfile",
+            """
+            [packages]
+            requests = "*"
+            lib-one = {path = "../lib-one", editable = true}
+
+            [dev-packages]
+            lib-two = {path = "./../lib-two"}
+            """,
+        )
+        # WHEN I scan it for path dependencies
+        default, dev = project.adapter.path_dependencies()
+        # THEN the dependencies are found in the correct sections
+        assert default == {(tmp_path / "lib-one").resolve()}
+        assert dev == {(tmp_path / "lib-two").resolve()}
+
+    @staticmethod
+    def should_raise_given_missing_pipfile(workspace, tmp_path):
+        # GIVEN a pipenv project without a Pipfile
+        project = workspace.set_project("app", path="app", type="pipenv")
+        # WHEN I scan it for path dependencies
+        # THEN an error naming the project is raised
+        with pytest.raises(WorkspaceProjectImproperlyConfigured, match="No Pipfile found in project 'app'"):
+            project.adapter.path_dependencies()
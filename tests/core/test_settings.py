@@ -0,0 +1,27 @@
+import pytest
+
+from workspace.core.exceptions import WorkspaceSettingsError
+from workspace.core.settings import Settings
+
+
+class TestSettings:
+    @staticmethod
+    def should_read_settings_from_environment(monkeypatch):
+        # GIVEN settings are given by environment variables
+        monkeypatch.setenv("WORKSPACE_JOBS", "4")
+        monkeypatch.setenv("WORKSPACE_DIRECT_RUN", "true")
+        # WHEN I read the settings
+        settings = Settings.from_env()
+        # THEN they are parsed
+        assert (settings.jobs, settings.direct_run) == (4, True)
+
+    @staticmethod
+    @pytest.mark.parametrize("name", ["jobs", "parse_workers"])
+    @pytest.mark.parametrize("value", ["0", "-1", "x", ""])
+    def should_reject_invalid_numbers(monkeypatch, name, value):
+        # GIVEN a number of processes which is not a positive integer
+        monkeypatch.setenv(f"WORKSPACE_{name.upper()}", value)
+        # WHEN I read the settings
+        # THEN a clear error is raised
+        with pytest.raises(WorkspaceSettingsError, match=f"WORKSPACE_{name.upper()} must be a positive integer"):
+            Settings.from_env()
@@ -0,0 +1,55 @@
+import re
+import subprocess
+import sys
+from textwrap import dedent
+
+import pytest
+
+# Generous upper bound on the cumulative time to import the CLI. Importing the optional
+# dependencies of the built-in adapters alone takes several times longer than this.
+_IMPORT_BUDGET_MICROSECONDS = 300_000
+
+_HEAVY_MODULES = ("pipenv", "pipfile", "poetry.core.factory", "tomlkit", "jsonschema", "cookiecutter")
+
+
+def _imported_modules(script: str) -> set:
+    script = script + "\nimport sys; print('\\n'.join(sys.modules))"
+    result = subprocess.run([sys.executable, "-c", script], check=True, capture_output=True, text=True)
+    return set(result.stdout.splitlines())
+
+
+def test_cli_import_does_not_load_heavy_dependencies() -> None:
+    modules = _imported_modules("import workspace.cli")
+    assert not modules & set(_HEAVY_MODULES)
+
+
+@pytest.mark.parametrize("command", ["add", "dependees", "dependencies", "list", "new"])
+def test_commands_which_run_nothing_do_not_load_runner(command: str) -> None:
+    modules = _imported_modules(f"import workspace.cli.commands.{command}")
+    assert not modules & {"workspace.cli.runner", "workspace.core.run_cache", "workspace.core.artifacts"}
+
+
+@pytest.mark.parametrize("type_name", ["pipenv", "poetry"])
+def test_running_commands_does_not_load_heavy_dependencies(type_name: str) -> None:
+    script = dedent(
+        f"""
+        from pathlib import Path
+        from workspace.core.models import Workspace
+
+        workspace = Workspace(path=Path.cwd(), projects={{}})
+        project = workspace.set_project("library", path="libs/library", type={type_name!r})
+        project.adapter.run_args("pytest")
+        project.adapter.sync_command()
+        """
+    )
+    modules = _imported_modules(script)
+    assert not modules & set(_HEAVY_MODULES)
+
+
+def test_cli_import_time_within_budget() -> None:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import workspace.cli"], check=True, capture_output=True, text=True
+    )
+    match = re.search(r"^import time:\s+\d+ \|\s+(\d+) \| workspace\.cli$", result.stderr, re.MULTILINE)
+    assert match, result.stderr
+    assert int(match.group(1)) < _IMPORT_BUDGET_MICROSECONDS
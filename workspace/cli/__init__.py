@@ -3,33 +3,43 @@ import sys
 import click
 
 from workspace.cli import theme
-from workspace.cli.commands.add import add
-from workspace.cli.commands.dependees import dependees
-from workspace.cli.commands.dependencies import dependencies
-from workspace.cli.commands.info import info
-from workspace.cli.commands.init import init
-from workspace.cli.commands.list import list_
-from workspace.cli.commands.new import new
-from workspace.cli.commands.plugin import plugin
-from workspace.cli.commands.remove import remove
-from workspace.cli.commands.reverse import reverse
-from workspace.cli.commands.run import run
-from workspace.cli.commands.sync import sync
-from workspace.cli.commands.template import template
 from workspace.cli.exceptions import WorkspaceCLIError
+from workspace.cli.lazy import LazyGroup
 from workspace.core.exceptions import WorkspaceBaseError
 
 
-@click.group()
+@click.group(
+    cls=LazyGroup,
+    lazy_subcommands={
+        "add": ("workspace.cli.commands.add:add", "Track an existing project at PATH in the workspace."),
+        "dependees": (
+            "workspace.cli.commands.dependees:dependees",
+            "Get the set of all projects which depend on the specified projects.",
+        ),
+        "dependencies": (
+            "workspace.cli.commands.dependencies:dependencies",
+            "Get the set of all projects which are dependencies of the specified projects.",
+        ),
+        "info": (
+            "workspace.cli.commands.info:info",
+            "Display information about the current workspace and its projects.",
+        ),
+        "init": ("workspace.cli.commands.init:init", "Initialise a workspace."),
+        "list": ("workspace.cli.commands.list:list_", "List projects tracked in the workspace."),
+        "new": ("workspace.cli.commands.new:new", "Create a new project in the workspace."),
+        "plugin": ("workspace.cli.commands.plugin:plugin", "Commands for managing workspace plugins."),
+        "remove": ("workspace.cli.commands.remove:remove", "Remove project(s) from the workspace."),
+        "reverse": ("workspace.cli.commands.reverse:reverse", "Reverse file paths to their respective projects."),
+        "run": ("workspace.cli.commands.run:run", "Run a command in each project."),
+        "sync": ("workspace.cli.commands.sync:sync", "Sync the environments of the specified projects."),
+        "template": ("workspace.cli.commands.template:template", "Commands for managing project templates."),
+    },
+)
 def cli():
     """Manage interdependent projects in a workspace."""
     pass
 
 
-for command in (add, dependees, dependencies, info, init, list_, new, plugin, remove, reverse, run, sync, template):
-    cli.add_command(command)
-
-
 def run_cli():
     try:
         cli()
@@ -1,4 +1,4 @@
-from typing import Any
+from typing import Any, Optional, Tuple
 
 import click
 
@@ -10,3 +10,19 @@ def consume_stdin(ctx: click.core.Context, param: click.core.Parameter, value: A
         return param.type_cast_value(ctx, [line.strip() for line in stdin.readlines()])
     else:
         return value
+
+
+def parse_shard(
+    ctx: click.core.Context, param: click.core.Parameter, value: Optional[str]
+) -> Optional[Tuple[int, int]]:
+    """Callback which parses a shard of the form `K/N`, for the Kth of N shards."""
+    if value is None:
+        return None
+    index, _, count = value.partition("/")
+    try:
+        shard = int(index), int(count)
+    except ValueError:
+        raise click.BadParameter("must be of the form K/N, such as 1/4.")
+    if not 1 <= shard[0] <= shard[1]:
+        raise click.BadParameter("K must be between 1 and N.")
+    return shard
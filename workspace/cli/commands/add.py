@@ -4,7 +4,7 @@ from pathlib import Path
 import click
 
 from workspace.cli import theme, utils
-from workspace.core.adapter import get_adapters
+from workspace.core.adapter import get_adapter_names
 from workspace.core.models import Workspace
 
 
@@ -40,7 +40,7 @@ Specify a different name with:
 
     type = type or utils.detect_type(workspace, path)
     if not type:
-        valid_type_list = "\n".join([f"  - <b>{name}</b>" for name in get_adapters()])
+        valid_type_list = "\n".join([f"  - <b>{name}</b>" for name in get_adapter_names()])
         theme.echo(
             f"""<e>Could not detect type of project at path <b>{path}</b>.</e>
 
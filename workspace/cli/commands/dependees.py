@@ -1,12 +1,10 @@
 import sys
-from collections import defaultdict
-from functools import lru_cache
-from typing import Dict, Set, Tuple
+from typing import Tuple
 
 import click
 
 from workspace.cli import callbacks, theme
-from workspace.cli.utils import resolve_specifiers
+from workspace.cli.utils import get_dependency_graph, resolve_specifiers
 from workspace.core.models import Workspace
 
 
@@ -41,18 +39,19 @@ def dependees(specifiers: Tuple[str, ...], transitive: bool = True, output: str
         theme.echo("<w>No projects selected.</w>")
         sys.exit(0)
 
-    # Get a full map of dependees:
-    dependee_map = _get_dependee_map(workspace, transitive=transitive, include_dev=dev)
-
-    # Extract the relevant dependees:
-    dependees_set = {dependee for target in target_set for dependee in dependee_map[target]}
+    graph = get_dependency_graph(workspace, include_dev=dev).reversed()
+    if transitive:
+        closure = graph.closure(target_set)
+        dependees_set, sizes = closure.nodes, closure.sizes
+    else:
+        dependees_set = {dependee for target in target_set for dependee in graph.successors(target)}
+        sizes = {name: len(graph.successors(name)) for name in dependees_set | target_set}
 
     # Sort them from most depended on, to least depended on:
-    sorted_dependees = [
-        name
-        for name, _ in sorted(dependee_map.items(), key=lambda item: -len(item[1]))
-        if name in dependees_set or name in target_set
-    ]
+    sorted_dependees = sorted(
+        (name for name in workspace.projects if name in dependees_set or name in target_set),
+        key=lambda name: -sizes[name],
+    )
 
     if output == "csv":
         theme.echo(",".join(sorted_dependees), err=False)
@@ -61,27 +60,3 @@ def dependees(specifiers: Tuple[str, ...], transitive: bool = True, output: str
     for dependee in sorted_dependees:
         theme.echo(dependee, err=False)
     sys.exit(0)
-
-
-def _get_dependee_map(
-    workspace: Workspace,
-    transitive: bool = True,
-    include_dev: bool = False,
-) -> Dict[str, Set[str]]:
-    """Get a mapping of projects to their dependees."""
-
-    direct_map = defaultdict(set)
-    for name, project in workspace.projects.items():
-        for dependency in project.adapter.dependencies(include_dev=include_dev):
-            direct_map[dependency].add(name)
-    if not transitive:
-        return dict(direct_map)
-
-    @lru_cache(maxsize=None)
-    def get_dependees(name: str):
-        dependees = set(direct_map[name])
-        for dependee in set(dependees):
-            dependees |= get_dependees(dependee)
-        return dependees
-
-    return {name: get_dependees(name) for name in workspace.projects}
@@ -1,12 +1,10 @@
 import sys
-from collections import defaultdict
-from functools import lru_cache
-from typing import DefaultDict, Dict, Set, Tuple
+from typing import Tuple
 
 import click
 
 from workspace.cli import callbacks, theme
-from workspace.cli.utils import resolve_specifiers
+from workspace.cli.utils import get_dependency_graph, resolve_specifiers
 from workspace.core.models import Workspace
 
 
@@ -41,18 +39,19 @@ def dependencies(specifiers: Tuple[str, ...], transitive: bool = True, output: s
         theme.echo("<w>No projects selected.</w>")
         sys.exit(0)
 
-    # Get a full map of dependencies:
-    dependency_map = _get_dependency_map(workspace, transitive=transitive, include_dev=dev)
-
-    # Extract the relevant dependencies:
-    dependencies_set = {dependency for target in target_set for dependency in dependency_map[target]}
+    graph = get_dependency_graph(workspace, roots=target_set, include_dev=dev)
+    if transitive:
+        closure = graph.closure(target_set)
+        dependencies_set, sizes = closure.nodes, closure.sizes
+    else:
+        dependencies_set = {dependency for target in target_set for dependency in graph.successors(target)}
+        sizes = {name: len(graph.successors(name)) for name in dependencies_set | target_set}
 
     # Sort them from least dependencies, to most dependencies:
-    sorted_dependencies = [
-        name
-        for name, _ in sorted(dependency_map.items(), key=lambda item: len(item[1]))
-        if name in dependencies_set or name in target_set
-    ]
+    sorted_dependencies = sorted(
+        (name for name in workspace.projects if name in dependencies_set or name in target_set),
+        key=lambda name: sizes[name],
+    )
 
     if output == "csv":
         theme.echo(",".join(sorted_dependencies), err=False)
@@ -61,26 +60,3 @@ def dependencies(specifiers: Tuple[str, ...], transitive: bool = True, output: s
     for dependency in sorted_dependencies:
         theme.echo(dependency, err=False)
     sys.exit(0)
-
-
-def _get_dependency_map(
-    workspace: Workspace,
-    transitive: bool = True,
-    include_dev: bool = False,
-) -> Dict[str, Set[str]]:
-    """Get a mapping of projects to their dependencies."""
-
-    direct_map: DefaultDict[str, Set[str]] = defaultdict(set)
-    for name, project in workspace.projects.items():
-        direct_map[name] |= project.adapter.dependencies(include_dev=include_dev)
-    if not transitive:
-        return dict(direct_map)
-
-    @lru_cache(maxsize=None)
-    def get_dependencies(name: str):
-        dependencies = set(direct_map[name])
-        for dependency in set(dependencies):
-            dependencies |= get_dependencies(dependency)
-        return dependencies
-
-    return {name: get_dependencies(name) for name in workspace.projects}
@@ -6,6 +6,7 @@ import click
 
 from workspace.cli import callbacks, theme
 from workspace.cli.utils import resolve_specifiers
+from workspace.core.graph import DependencyGraph
 from workspace.core.models import Workspace
 
 
@@ -34,6 +35,8 @@ def list_(specifiers: Tuple[str, ...], output: str = "default"):
         theme.echo("<w>No projects selected.</w>")
         sys.exit(0)
 
+    graph = DependencyGraph(workspace)
+    graph.load(target_set)
     for name in sorted(target_set):
         project = workspace.projects[name]
         if output == "json":
@@ -43,7 +46,7 @@ def list_(specifiers: Tuple[str, ...], output: str = "default"):
                         "name": project.name,
                         "type": project.type,
                         "path": str(workspace.path / project.path),
-                        "depends_on": list(project.adapter.dependencies()),
+                        "depends_on": sorted(graph.dependencies(name, include_dev=True)),
                     }
                 ),
                 err=False,
@@ -56,6 +59,7 @@ def list_(specifiers: Tuple[str, ...], output: str = "default"):
 <h>Name</h>: <b>{project.name}</b>
 <h>Type</h>: {project.type}
 <h>Path</h>: <a>{workspace.path / project.path}</a>
-<h>Dependencies</h>: [{", ".join(project.adapter.dependencies())}]""",
+<h>Dependencies</h>: [{", ".join(sorted(graph.dependencies(name, include_dev=True)))}]""",
                 err=False,
             )
+    graph.save()
@@ -6,7 +6,7 @@ import click
 
 from workspace.cli import theme, utils
 from workspace.cli.exceptions import WorkspaceCLIError
-from workspace.core.adapter import get_adapter, get_adapters
+from workspace.core.adapter import get_adapter, get_adapter_names
 from workspace.core.models import Workspace
 
 
@@ -75,7 +75,7 @@ Available templates are:
         _initialise_template(workspace, path=path.resolve(), type=type, name=name, template=template)
         type = type or utils.detect_type(workspace, path.resolve())
         if not type:
-            valid_type_list = "\n".join([f"  - <b>{name}</b>" for name in get_adapters()])
+            valid_type_list = "\n".join([f"  - <b>{name}</b>" for name in get_adapter_names()])
             template_path = workspace.templates[template]  # type: ignore[index]
             raise WorkspaceCLIError(
                 f"""
@@ -0,0 +1,16 @@
+import click
+
+from workspace.cli.lazy import LazyGroup
+
+
+@click.group(
+    cls=LazyGroup,
+    lazy_subcommands={
+        "add": ("workspace.cli.commands.plugin.add:add", "Add a plugin by its Python module path."),
+        "list": ("workspace.cli.commands.plugin.list:list_", ""),
+        "remove": ("workspace.cli.commands.plugin.remove:remove", "Remove a plugin by its Python module path."),
+    },
+)
+def plugin():
+    """Commands for managing workspace plugins."""
+    pass
@@ -0,0 +1,39 @@
+import click
+
+from workspace.cli import theme
+from workspace.cli.exceptions import WorkspaceCLIError
+from workspace.core.exceptions import WorkspacePluginError
+from workspace.core.models import Workspace
+from workspace.core.plugins import discover_plugin
+
+
+@click.command()
+@click.argument("module_path", type=str)
+def add(module_path: str):
+    """Add a plugin by its Python module path."""
+    workspace = Workspace.from_path()
+
+    try:
+        types = discover_plugin(workspace, module_path)
+    except WorkspacePluginError:
+        raise WorkspaceCLIError(
+            f"""<e>Could not import plugin <b>{module_path}</b>.</e>
+
+The plugin must be available on your <a>PYTHONPATH</a>.
+"""
+        )
+    workspace.plugins = workspace.plugins or []
+    if module_path in workspace.plugins:
+        raise WorkspaceCLIError(f"<e>Plugin <b>{module_path}</b> already installed.</e>")
+    workspace.plugins.append(module_path)
+    workspace.flush()
+    theme.echo(f"Added plugin <s>{module_path}</s>.")
+
+    new_types = "\n".join([f"  - <a>{name}</a>" for name in types])
+    if new_types:
+        theme.echo(
+            f"""
+<h>The following new project types are now available:</h>
+{new_types}
+"""
+        )
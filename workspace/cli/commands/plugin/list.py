@@ -0,0 +1,11 @@
+import click
+
+from workspace.cli import theme
+from workspace.core.models import Workspace
+
+
+@click.command("list")
+def list_():
+    workspace = Workspace.from_path()
+    for plugin in workspace.plugins or []:
+        theme.echo(plugin)
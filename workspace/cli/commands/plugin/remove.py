@@ -0,0 +1,19 @@
+import click
+
+from workspace.cli import theme
+from workspace.cli.exceptions import WorkspaceCLIError
+from workspace.core.models import Workspace
+
+
+@click.command()
+@click.argument("module_path", type=str)
+def remove(module_path: str):
+    """Remove a plugin by its Python module path."""
+    workspace = Workspace.from_path()
+
+    workspace.plugins = workspace.plugins or []
+    if module_path not in workspace.plugins:
+        raise WorkspaceCLIError(f"<e>Plugin <b>{module_path}</b> not installed.</e>")
+    workspace.plugins.remove(module_path)
+    workspace.flush()
+    theme.echo(f"Removed plugin <s>{module_path}</s>.")
@@ -1,5 +1,6 @@
 import shutil
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from typing import Tuple
 
 import click
@@ -29,12 +30,14 @@ def remove(specifiers: Tuple[str, ...], delete: bool = False):
         theme.echo("<w>No projects selected.</w>")
         sys.exit(0)
 
-    for name in target_set:
-        resolved_path = workspace.projects[name].resolved_path
-        del workspace.projects[name]
+    with workspace.transaction():
+        removed = [workspace.remove_project(name) for name in target_set]
         workspace.flush()
-        if delete:
-            shutil.rmtree(resolved_path)
+
+    if delete:
+        with ThreadPoolExecutor() as executor:
+            # Consume the results to raise any errors.
+            list(executor.map(shutil.rmtree, [project.resolved_path for project in removed]))
 
     names = "\n".join(f"  - <b>{name}</b>" for name in target_set)
     if delete:
@@ -40,13 +40,5 @@ def reverse(paths: Tuple[Path, ...], output: str = "lines"):
 
 
 def _reverse_path(workspace: Workspace, path: Path) -> Optional[str]:
-    relatives = {}
-    path = path.resolve()
-    for project in workspace.projects.values():
-        try:
-            relatives[project.name] = path.relative_to(project.resolved_path)
-        except ValueError:
-            continue
-    if not relatives:
-        return None
-    return sorted(relatives.items(), key=lambda item: len(item[1].parents))[0][0]
+    project = workspace.get_project_containing(path)
+    return project.name if project else None
@@ -1,11 +1,14 @@
 import sys
+from pathlib import Path
 from typing import Tuple
 
 import click
 
 from workspace.cli import callbacks, runner, theme
-from workspace.cli.utils import resolve_specifiers
+from workspace.cli.utils import get_dependency_graph, resolve_specifiers, runner_options
+from workspace.core.history import DurationHistory, RunOutcomes
 from workspace.core.models import Workspace
+from workspace.core.run_cache import RunCache
 
 
 @click.command()
@@ -21,17 +24,53 @@ from workspace.core.models import Workspace
     required=True,
     help="The command to execute.",
 )
+@runner_options
 @click.option(
-    "--parallel/--no-parallel",
-    "-p/ ",
+    "--cache/--no-cache",
     type=bool,
     default=False,
-    help="Run the command in parallel.",
+    help="Replay the recorded result of the command in projects whose inputs are unchanged.",
 )
-def run(specifiers: Tuple[str], command: str, parallel: bool = False):
+@click.option(
+    "--resume/--no-resume",
+    type=bool,
+    default=False,
+    help="Only run the projects which failed, were cancelled or did not start in the last run of the command.",
+)
+def run(
+    specifiers: Tuple[str],
+    command: str,
+    parallel: bool = False,
+    topological: bool = False,
+    jobs: int = None,
+    log_dir: Path = None,
+    stream: bool = False,
+    fail_fast: bool = False,
+    timeout: float = None,
+    total_timeout: float = None,
+    cache: bool = False,
+    trace_path: Path = None,
+    usage: bool = False,
+    usage_report: Path = None,
+    usage_baseline: Path = None,
+    usage_tolerance: float = 20,
+    plan: bool = False,
+    shard: Tuple[int, int] = None,
+    shard_report: bool = False,
+    shard_timings: Path = None,
+    resume: bool = False,
+):
     """Run a command in each project.
 
     If no specifiers are provided, the command will be run in all projects.
+
+    With --cache, the result of the command in each project is recorded, keyed on the
+    command, the Python version of the project, and the inputs and lockfiles of the project
+    and of each project it depends on. While these are unchanged, the command is not run again.
+
+    With --resume, only the projects which did not succeed in the last run of the same command
+    are run, out of those selected in that run. If specifiers are provided, only the matching
+    projects among them are run.
     """
     workspace = Workspace.from_path()
 
@@ -39,9 +78,60 @@ def run(specifiers: Tuple[str], command: str, parallel: bool = False):
     if specifiers:
         target_set = resolve_specifiers(workspace, specifiers)
 
+    outcomes = RunOutcomes(workspace.path)
+    if resume:
+        previous = outcomes.get(command)
+        if not previous:
+            theme.echo("<w>There is no previous run of this command to resume.</w>")
+            sys.exit(0)
+        unfinished = {name for name, status in previous.items() if status != "succeeded" and name in workspace.projects}
+        target_set = unfinished & target_set if specifiers else unfinished
+        if not target_set:
+            theme.echo("<s>Every selected project succeeded in the previous run of this command.</s>")
+            sys.exit(0)
+
     if not target_set:
         theme.echo("<w>No projects selected.</w>")
         sys.exit(0)
 
-    project_commands = [(workspace.projects[target], command) for target in target_set]
-    sys.exit(runner.run(project_commands, parallel=parallel))
+    project_commands = [(workspace.projects[target], command) for target in sorted(target_set)]
+    history = DurationHistory(workspace.path)
+    if shard:
+        project_commands = runner.select_shard(project_commands, shard, shard_timings, report=shard_report)
+        if shard_report:
+            sys.exit(0)
+        target_set = {project.name for project, _ in project_commands}
+        if not target_set:
+            theme.echo("<w>No projects selected in this shard.</w>")
+            sys.exit(0)
+    graph = get_dependency_graph(workspace, roots=target_set, include_dev=True) if topological or cache else None
+    dependencies = graph.contract(target_set) if graph and topological else None
+    run_cache = RunCache(workspace, graph) if graph and cache else None
+    if plan:
+        runner.show_plan(
+            project_commands, parallel=parallel or stream, history=history, dependencies=dependencies, jobs=jobs
+        )
+        sys.exit(0)
+    if not resume:
+        outcomes.start(command, target_set)
+    sys.exit(
+        runner.run(
+            project_commands,
+            parallel=parallel or stream,
+            dependencies=dependencies,
+            jobs=jobs,
+            log_dir=log_dir,
+            stream=stream,
+            fail_fast=fail_fast,
+            timeout=timeout,
+            total_timeout=total_timeout,
+            run_cache=run_cache,
+            trace_path=trace_path,
+            usage=usage,
+            usage_report=usage_report,
+            usage_baseline=usage_baseline,
+            usage_tolerance=usage_tolerance,
+            history=history,
+            outcomes=outcomes,
+        )
+    )
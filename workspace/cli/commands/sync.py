@@ -1,10 +1,12 @@
 import sys
+from pathlib import Path
 from typing import Tuple
 
 import click
 
 from workspace.cli import callbacks, runner, theme
-from workspace.cli.utils import resolve_specifiers
+from workspace.cli.utils import get_dependency_graph, resolve_specifiers, runner_options
+from workspace.core.history import DurationHistory
 from workspace.core.models import Workspace
 
 
@@ -21,14 +23,28 @@ from workspace.core.models import Workspace
     help="Include development dependencies.",
     default=False,
 )
-@click.option(
-    "--parallel/--no-parallel",
-    "-p/ ",
-    type=bool,
-    default=False,
-    help="Run the command in parallel.",
-)
-def sync(specifiers: Tuple[str, ...], dev: bool = False, parallel: bool = False):
+@runner_options
+def sync(
+    specifiers: Tuple[str, ...],
+    dev: bool = False,
+    parallel: bool = False,
+    topological: bool = False,
+    jobs: int = None,
+    log_dir: Path = None,
+    stream: bool = False,
+    fail_fast: bool = False,
+    timeout: float = None,
+    total_timeout: float = None,
+    trace_path: Path = None,
+    usage: bool = False,
+    usage_report: Path = None,
+    usage_baseline: Path = None,
+    usage_tolerance: float = 20,
+    plan: bool = False,
+    shard: Tuple[int, int] = None,
+    shard_report: bool = False,
+    shard_timings: Path = None,
+):
     """Sync the environments of the specified projects."""
     workspace = Workspace.from_path()
 
@@ -40,7 +56,42 @@ def sync(specifiers: Tuple[str, ...], dev: bool = False, parallel: bool = False)
         theme.echo("<w>No projects selected.</w>")
         sys.exit(0)
 
-    projects = (workspace.projects[target] for target in target_set)
+    projects = (workspace.projects[target] for target in sorted(target_set))
     project_commands = [(project, project.adapter.sync_command(include_dev=dev)) for project in projects]
+    history = DurationHistory(workspace.path)
+    if shard:
+        project_commands = runner.select_shard(project_commands, shard, shard_timings, report=shard_report)
+        if shard_report:
+            sys.exit(0)
+        target_set = {project.name for project, _ in project_commands}
+        if not target_set:
+            theme.echo("<w>No projects selected in this shard.</w>")
+            sys.exit(0)
 
-    sys.exit(runner.run(project_commands, parallel=parallel))
+    dependencies = None
+    if topological:
+        dependencies = get_dependency_graph(workspace, roots=target_set, include_dev=dev).contract(target_set)
+    if plan:
+        runner.show_plan(
+            project_commands, parallel=parallel or stream, history=history, dependencies=dependencies, jobs=jobs
+        )
+        sys.exit(0)
+    sys.exit(
+        runner.run(
+            project_commands,
+            parallel=parallel or stream,
+            dependencies=dependencies,
+            jobs=jobs,
+            log_dir=log_dir,
+            stream=stream,
+            fail_fast=fail_fast,
+            timeout=timeout,
+            total_timeout=total_timeout,
+            trace_path=trace_path,
+            usage=usage,
+            usage_report=usage_report,
+            usage_baseline=usage_baseline,
+            usage_tolerance=usage_tolerance,
+            history=history,
+        )
+    )
@@ -1,14 +1,15 @@
 import click
 
-from workspace.cli.commands.template.list import list_
-from workspace.cli.commands.template.path import path
+from workspace.cli.lazy import LazyGroup
 
 
-@click.group()
+@click.group(
+    cls=LazyGroup,
+    lazy_subcommands={
+        "list": ("workspace.cli.commands.template.list:list_", ""),
+        "path": ("workspace.cli.commands.template.path:path", ""),
+    },
+)
 def template():
     """Commands for managing project templates."""
     pass
-
-
-template.add_command(list_)
-template.add_command(path)
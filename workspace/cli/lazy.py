@@ -0,0 +1,70 @@
+import importlib
+from typing import Dict, List, Optional, Tuple
+
+import click
+from click.shell_completion import CompletionItem
+
+
+class LazyGroup(click.Group):
+    """A click group which only imports its subcommands when they are used.
+
+    Subcommands are provided as a mapping of command name to the import path of the command
+    and its short help, e.g. `{"list": ("workspace.cli.commands.list:list_", "List projects.")}`.
+    The short help is shown in `--help` and shell completion, so that listing subcommands
+    does not import them.
+    """
+
+    def __init__(self, *args, lazy_subcommands: Dict[str, Tuple[str, str]] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lazy_subcommands = lazy_subcommands or {}
+
+    def list_commands(self, ctx: click.Context) -> List[str]:
+        return sorted({*super().list_commands(ctx), *self.lazy_subcommands})
+
+    def get_command(self, ctx: click.Context, cmd_name: str) -> Optional[click.Command]:
+        if cmd_name not in self.commands and cmd_name in self.lazy_subcommands:
+            self.add_command(self._import_command(cmd_name), cmd_name)
+        return super().get_command(ctx, cmd_name)
+
+    def format_commands(self, ctx: click.Context, formatter: click.HelpFormatter) -> None:
+        commands = self._visible_commands(ctx)
+        if not commands:
+            return
+        limit = formatter.width - 6 - max(len(name) for name, _ in commands)
+        with formatter.section("Commands"):
+            formatter.write_dl([(name, self._short_help(name, command, limit)) for name, command in commands])
+
+    def shell_complete(self, ctx: click.Context, incomplete: str) -> List[CompletionItem]:
+        results = [
+            CompletionItem(name, help=self._short_help(name, command))
+            for name, command in self._visible_commands(ctx)
+            if name.startswith(incomplete)
+        ]
+        # Complete the options of the group itself, without listing its subcommands again.
+        results.extend(click.Command.shell_complete(self, ctx, incomplete))
+        return results
+
+    def _visible_commands(self, ctx: click.Context) -> List[Tuple[str, Optional[click.Command]]]:
+        """Names of the subcommands which are not hidden, with each command if it has been imported."""
+        commands: List[Tuple[str, Optional[click.Command]]] = []
+        for name in self.list_commands(ctx):
+            if name not in self.commands and name in self.lazy_subcommands:
+                commands.append((name, None))
+                continue
+            command = self.get_command(ctx, name)
+            if command is not None and not command.hidden:
+                commands.append((name, command))
+        return commands
+
+    def _short_help(self, name: str, command: Optional[click.Command], limit: int = 45) -> str:
+        if command is None:
+            # A placeholder, so that the short help is shortened just as for imported commands.
+            command = click.Command(name, help=self.lazy_subcommands[name][1])
+        return command.get_short_help_str(limit)
+
+    def _import_command(self, cmd_name: str) -> click.Command:
+        module_path, attribute = self.lazy_subcommands[cmd_name][0].split(":")
+        command = getattr(importlib.import_module(module_path), attribute)
+        if not isinstance(command, click.Command):
+            raise ValueError(f"Lazy subcommand {cmd_name!r} is not a click command: {command!r}")  # pragma: no cover
+        return command
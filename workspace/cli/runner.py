@@ -1,32 +1,469 @@
+from __future__ import annotations
+
+import copy
+import hashlib
+import heapq
+import json
+import os
+import resource
+import selectors
+import signal
+import subprocess
+import sys
+import tempfile
+import textwrap
+import threading
 import time
+from contextlib import contextmanager
 from itertools import cycle
-from typing import Dict, Iterable, List, NamedTuple, Tuple
+from pathlib import Path
+from subprocess import PIPE
+from typing import IO, Dict, Iterable, Iterator, List, Mapping, NamedTuple, Optional, Set, Tuple
 
 import click
 
 from workspace.cli import theme
+from workspace.cli.exceptions import WorkspaceCLIError
+from workspace.core.environments import resolve_environments
+from workspace.core.graph import Graph
+from workspace.core.history import DurationHistory, RunOutcomes
 from workspace.core.models import Project
+from workspace.core.run_cache import CachedResult, RunCache
+from workspace.core.settings import get_settings
+
+_READ_SIZE = 65536
+# Captured output is spilled to disk beyond this many bytes.
+_SPOOL_SIZE = 1024 * 1024
+# Bounds on the output displayed for failed projects.
+_TAIL_LINES = 100
+_TAIL_BYTES = 64 * 1024
+# Streamed lines longer than this are written before they end, to bound memory use.
+_MAX_LINE_BYTES = 64 * 1024
+# Seconds a cancelled command has to exit after SIGTERM, before it is sent SIGKILL.
+_TERMINATE_GRACE = 5.0
+# Exit code of commands which time out, matching the `timeout` utility.
+_TIMEOUT_EXIT_CODE = 124
+# Increases in resource usage smaller than these are never reported as regressions.
+_MIN_RSS_REGRESSION = 16 * 1024 * 1024
+_MIN_CPU_REGRESSION = 0.5
+
+
+def run(
+    project_commands: List[Tuple[Project, str]],
+    *,
+    parallel: bool,
+    dependencies: Mapping[str, Set[str]] = None,
+    jobs: int = None,
+    log_dir: Path = None,
+    stream: bool = False,
+    fail_fast: bool = False,
+    timeout: float = None,
+    total_timeout: float = None,
+    run_cache: RunCache = None,
+    trace_path: Path = None,
+    usage: bool = False,
+    usage_report: Path = None,
+    usage_baseline: Path = None,
+    usage_tolerance: float = 20,
+    history: DurationHistory = None,
+    outcomes: RunOutcomes = None,
+) -> int:
+    """Run each command in each project, in series or parallel.
+
+    If dependencies between the projects are provided, each project only starts once all of
+    its dependencies have succeeded. Projects depending on one which failed are skipped.
+
+    In parallel, at most `jobs` commands run at once. This defaults to `WORKSPACE_JOBS`, or
+    the number of CPUs. If `log_dir` is given, the full output of each project run in parallel
+    is written to a log file in that directory. If `stream` is set, the output of each project
+    run in parallel is written line by line as it arrives, prefixed with the project name.
+
+    If `fail_fast` is set, outstanding projects are cancelled as soon as one fails. A command
+    is cancelled once it has run for `timeout` seconds, and every command is cancelled once
+    the whole run has taken `total_timeout` seconds. Commands which time out fail with exit
+    code 124.
+
+    Cancelled commands are sent SIGTERM, then SIGKILL if they are still running after a grace
+    period. Commands run in parallel, or in series with a timeout, run in their own process
+    group, so any processes they start are cancelled with them. If workspace itself receives
+    SIGTERM or SIGHUP, running commands are cancelled as for an interrupt, then `Terminated`
+    is raised.
+
+    If `run_cache` is given, commands whose result has been recorded are not run, and their
+    recorded output and exit code are replayed instead. Results of other commands are recorded,
+    unless they time out or are cancelled.
+
+    If `trace_path` is given, a timeline of the run is written there, even if the run is
+    interrupted. See `Trace` for its format.
+
+    The peak memory, CPU time and context switches of each command are measured. If `usage`
+    is set, these are shown once all projects have finished. If `usage_report` is given, they
+    are written there as JSON, in the format of the `Trace` summary. Given the report of an
+    earlier run as `usage_baseline`, projects using more than `usage_tolerance` percent more
+    peak memory or CPU time than before are reported as regressions.
+
+    If `history` is given, the duration of each successful command is recorded there. In
+    parallel, projects on the critical path according to earlier durations are started first,
+    and the expected time left is shown.
+
+    If `outcomes` is given, the status of each project is recorded there once the run ends,
+    even if it is interrupted.
+    """
+    jobs = (jobs or get_settings().jobs or os.cpu_count() or 1) if parallel else 1
+    durations = expected_durations(project_commands, history) if history and parallel else None
+    scheduler = Scheduler([project.name for project, _ in project_commands], dependencies, durations)
+    deadline = time.monotonic() + total_timeout if total_timeout else None
+    measured = trace_path or usage or usage_report or usage_baseline or history or outcomes
+    trace = Trace(project_commands, scheduler, jobs) if measured else None
+    if get_settings().direct_run or run_cache:
+        resolve_environments([project for project, _ in project_commands])
+    exit_code: Optional[int] = None
+    try:
+        with _raise_on_termination():
+            if parallel:
+                exit_code = _run_in_parallel(
+                    project_commands,
+                    scheduler,
+                    jobs=jobs,
+                    log_dir=log_dir,
+                    stream=stream,
+                    fail_fast=fail_fast,
+                    timeout=timeout,
+                    deadline=deadline,
+                    run_cache=run_cache,
+                    trace=trace,
+                )
+            else:
+                exit_code = _run_in_series(
+                    project_commands,
+                    scheduler,
+                    fail_fast=fail_fast,
+                    timeout=timeout,
+                    deadline=deadline,
+                    run_cache=run_cache,
+                    trace=trace,
+                )
+    finally:
+        if trace and trace_path:
+            trace.write(trace_path, exit_code)
+        if trace and outcomes:
+            for name, command in trace.commands.items():
+                outcomes.record(command, name, trace.status(name))
+            outcomes.save()
+    if run_cache:
+        run_cache.save()
+    if scheduler.skipped:
+        theme.echo(
+            "<w>Some projects were skipped, as their dependencies failed</w>: "
+            + ", ".join([f"<b>{name}</b>" for name in sorted(scheduler.skipped)])
+        )
+    if scheduler.cancelled:
+        theme.echo(
+            "<w>Some projects were cancelled</w>: "
+            + ", ".join([f"<b>{name}</b>" for name in sorted(scheduler.cancelled)])
+        )
+    if trace and (usage or usage_report or usage_baseline):
+        summary = trace.summary(exit_code)
+        if usage:
+            _echo_usage(summary)
+        if usage_baseline:
+            summary["regressions"] = _usage_regressions(summary, usage_baseline, usage_tolerance)
+        if usage_report:
+            usage_report.parent.mkdir(parents=True, exist_ok=True)
+            usage_report.write_text(json.dumps(summary, indent=2))
+    if trace and history:
+        for name, (finished, result) in trace.results.items():
+            if result.success and not result.cached:
+                history.record(name, trace.commands[name], finished - trace.starts[name])
+        history.save()
+    return exit_code
+
+
+class Terminated(SystemExit):
+    """Raised when workspace receives SIGTERM or SIGHUP during a run.
+
+    Exits with the conventional code for the signal, once running commands are cancelled.
+    """
+
+    def __init__(self, signum: int):
+        super().__init__(128 + signum)
+        self.signum = signum
+
+
+@contextmanager
+def _raise_on_termination() -> Iterator[None]:
+    """Raise `Terminated` on SIGTERM or SIGHUP, so that running commands are cancelled.
+
+    Commands run in their own process group, so would otherwise outlive workspace when it is
+    terminated, such as when a CI job is cancelled. Further signals are ignored while the
+    commands are cancelled, which is bounded by the grace period.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        yield  # Signal handlers can only be installed from the main thread.
+        return
+    signums = [signal.SIGTERM, signal.SIGHUP]
+
+    def handler(signum: int, frame: object) -> None:
+        for other in signums:
+            signal.signal(other, signal.SIG_IGN)
+        raise Terminated(signum)
+
+    previous = {signum: signal.signal(signum, handler) for signum in signums}
+    try:
+        yield
+    finally:
+        for signum, previous_handler in previous.items():
+            signal.signal(signum, previous_handler)
+
+
+def show_plan(
+    project_commands: List[Tuple[Project, str]],
+    *,
+    parallel: bool,
+    history: DurationHistory,
+    dependencies: Mapping[str, Set[str]] = None,
+    jobs: int = None,
+) -> None:
+    """Show when each project is expected to run, and for how long, based on earlier durations.
+
+    Projects which have not run before are marked as such.
+    """
+    jobs = (jobs or get_settings().jobs or os.cpu_count() or 1) if parallel else 1
+    durations = expected_durations(project_commands, history)
+    scheduler = Scheduler(
+        [project.name for project, _ in project_commands], dependencies, durations if parallel else None
+    )
+    planned = plan(scheduler, durations, jobs)
+    known = {project.name for project, command in project_commands if history.get(project.name, command) is not None}
+    rows = [("<h>Slot</h>", "<h>Start</h>", "<h>Duration</h>", "<h>Project</h>")]
+    for job in sorted(planned, key=lambda job: (job.start, job.slot)):
+        duration = _format_duration(job.end - job.start)
+        if job.name not in known:
+            duration += " <w>(no history)</w>"
+        rows.append((str(job.slot + 1), _format_duration(job.start), duration, f"<b>{job.name}</b>"))
+    makespan = max([job.end for job in planned], default=0)
+    theme.echo(
+        f"<h>Plan</h>: <b>{len(planned)}</b> projects in <b>{jobs}</b> "
+        + ("slots" if jobs > 1 else "slot")
+        + f", expected to take <b>{_format_duration(makespan)}</b>\n"
+        + textwrap.indent(theme.table(rows), " " * 4),
+        err=False,
+    )
+
+
+def expected_durations(
+    project_commands: List[Tuple[Project, str]],
+    history: DurationHistory = None,
+    timings: Mapping[str, float] = None,
+) -> Dict[str, float]:
+    """Expected duration of each project, or none if no project has run before.
+
+    Durations are taken from `timings` by project name if given, otherwise from `history`.
+    Projects which have not run before are assumed to take the average time of those which have.
+    """
+    durations: Dict[str, float] = {}
+    for project, command in project_commands:
+        if timings is not None:
+            duration = timings.get(project.name)
+        else:
+            duration = history.get(project.name, command) if history else None
+        if duration is not None:
+            durations[project.name] = duration
+    if not durations:
+        return {}
+    average = sum(durations.values()) / len(durations)
+    return {project.name: durations.get(project.name, average) for project, _ in project_commands}
+
+
+def shard(
+    project_commands: List[Tuple[Project, str]], count: int, durations: Mapping[str, float]
+) -> List[List[Tuple[Project, str]]]:
+    """Partition projects into `count` shards, balancing the expected duration of each.
+
+    Projects are assigned longest first to the shard with the least expected duration so far.
+    Without durations, each project is assigned by a stable hash of its name instead. Either
+    way, the same projects and durations always give the same shards, wherever they are split.
+    """
+    shards: List[List[Tuple[Project, str]]] = [[] for _ in range(count)]
+    if not durations:
+        for project, command in project_commands:
+            index = int(hashlib.sha256(project.name.encode("utf-8")).hexdigest(), 16) % count
+            shards[index].append((project, command))
+        return shards
+    loads = [0.0] * count
+    for project, command in sorted(project_commands, key=lambda item: (-durations[item[0].name], item[0].name)):
+        index = min(range(count), key=lambda index: (loads[index], index))
+        shards[index].append((project, command))
+        loads[index] += durations[project.name]
+    return [sorted(projects, key=lambda item: item[0].name) for projects in shards]
+
+
+def select_shard(
+    project_commands: List[Tuple[Project, str]],
+    selection: Tuple[int, int],
+    timings_path: Path = None,
+    report: bool = False,
+) -> List[Tuple[Project, str]]:
+    """Select the projects in the Kth of N shards, given `selection` as (K, N).
+
+    Shards are balanced by the durations in the summary at `timings_path` if given. Otherwise,
+    projects are assigned by a hash of their name, rather than by local history, since every
+    machine must split the projects identically. If `report` is set, every shard is shown.
+    """
+    index, count = selection
+    durations = expected_durations(project_commands, timings=load_timings(timings_path)) if timings_path else {}
+    shards = shard(project_commands, count, durations)
+    if report:
+        show_shards(shards, durations, current=index)
+    return shards[index - 1]
+
+
+def load_timings(path: Path) -> Dict[str, float]:
+    """Read the wall time of each successful project from a run summary.
+
+    The summary is that written by `--usage-report`, or included in a `--trace` file.
+    """
+    try:
+        data = json.loads(path.read_text())
+        projects = data.get("summary", data)["projects"]
+        return {
+            name: float(project["wall_time"])
+            for name, project in projects.items()
+            if project.get("status") == "succeeded" and not project.get("cached")
+        }
+    except (OSError, ValueError, KeyError, TypeError, AttributeError) as exc:
+        raise WorkspaceCLIError(f"<e>Could not read timings from <b>{path}</b>: {theme.escape(str(exc))}</e>")
 
 
-def run(project_commands: List[Tuple[Project, str]], *, parallel: bool) -> int:
-    """Run each command in each project, in series or parallel."""
-    if parallel:
-        return _run_in_parallel(project_commands)
-    return _run_in_series(project_commands)
+def show_shards(shards: List[List[Tuple[Project, str]]], durations: Mapping[str, float], current: int = None) -> None:
+    """Show the projects assigned to each shard, and the expected duration of each.
 
+    The shard numbered `current`, counting from one, is highlighted.
+    """
+    if durations:
+        theme.echo("<h>Shards</h>, balanced by the expected duration of each project:", err=False)
+    else:
+        theme.echo("<h>Shards</h>, assigned by project name, as no timings were given:", err=False)
+    rows = []
+    for number, projects in enumerate(shards, start=1):
+        names = ", ".join([project.name for project, _ in projects]) or "<w>(none)</w>"
+        load = _format_duration(sum(durations[project.name] for project, _ in projects)) if durations else "?"
+        label = f"{number}/{len(shards)}"
+        rows.append((f"<s>{label}</s>" if number == current else label, load, names))
+    theme.echo(textwrap.indent(theme.table(rows), " " * 4), err=False)
+
+
+def _format_duration(seconds: float) -> str:
+    if seconds < 60:
+        return f"{seconds:.1f}s"
+    minutes, seconds = divmod(round(seconds), 60)
+    if minutes < 60:
+        return f"{minutes}m {seconds}s"
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h {minutes}m"
+
+
+def _echo_usage(summary: dict) -> None:
+    """Show the resources used by each project, from the summary of a run."""
+    rows = [("<h>Project</h>", "<h>Wall</h>", "<h>User</h>", "<h>System</h>", "<h>Peak memory</h>", "<h>Switches</h>")]
+    for name, entry in summary["projects"].items():
+        used = entry.get("usage")
+        if entry.get("cached"):
+            rows.append((name, "cached", "", "", "", ""))
+        elif used:
+            rows.append(
+                (
+                    name,
+                    f"{entry['wall_time']:.1f}s",
+                    f"{used['user_time']:.1f}s",
+                    f"{used['system_time']:.1f}s",
+                    _format_bytes(used["max_rss"]),
+                    f"{used['voluntary_switches']}/{used['involuntary_switches']}",
+                )
+            )
+    if len(rows) > 1:
+        theme.echo("<h>Resource usage</h>:\n" + textwrap.indent(theme.table(rows, ("bold", *[None] * 5)), " " * 4))
+
+
+def _usage_regressions(summary: dict, baseline_path: Path, tolerance: float) -> List[dict]:
+    """Find projects which used more memory or CPU time than in a baseline report, warning about each."""
+    try:
+        baseline = json.loads(baseline_path.read_text())["projects"]
+    except (OSError, ValueError, KeyError, TypeError):
+        theme.echo(f"<w>Could not read the usage baseline at <b>{baseline_path}</b></w>")
+        return []
+    regressions = []
+    for name, entry in summary["projects"].items():
+        used = entry.get("usage")
+        previous = (baseline.get(name) or {}).get("usage")
+        if not used or not previous:
+            continue
+        for metric, value, before, minimum, format_value in [
+            ("max_rss", used["max_rss"], previous["max_rss"], _MIN_RSS_REGRESSION, _format_bytes),
+            (
+                "cpu_time",
+                used["user_time"] + used["system_time"],
+                previous["user_time"] + previous["system_time"],
+                _MIN_CPU_REGRESSION,
+                lambda seconds: f"{seconds:.1f}s",
+            ),
+        ]:
+            if value - before < minimum or value <= before * (1 + tolerance / 100):
+                continue
+            regressions.append({"project": name, "metric": metric, "baseline": before, "value": value})
+            label = "peak memory" if metric == "max_rss" else "CPU time"
+            increase = f"{(value / before - 1) * 100:.0f}%" if before else "∞"
+            theme.echo(
+                f"<w><b>{name}</b> used {format_value(value)} {label}, up {increase} from {format_value(before)}</w>"
+            )
+    return regressions
 
-def _run_in_series(project_commands: List[Tuple[Project, str]]) -> int:
+
+def _format_bytes(size: float) -> str:
+    for unit in ("B", "KiB", "MiB"):
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
+
+
+def _run_in_series(
+    project_commands: List[Tuple[Project, str]],
+    scheduler: Scheduler,
+    fail_fast: bool = False,
+    timeout: float = None,
+    deadline: Optional[float] = None,
+    run_cache: RunCache = None,
+    trace: Trace = None,
+) -> int:
     """Run each command in each project in series.
 
-    Command output is not captured.
+    Command output is only captured when results are cached. Otherwise, and without a
+    timeout, commands run in the foreground, so they may interact with the terminal.
     """
+    commands = {project.name: (project, command) for project, command in project_commands}
     exit_codes: Dict[str, int] = {}
-    for project, command in project_commands:
-        theme.echo(f"\nRunning <a><b>{command}</b></a>  (<b>{project.name}</b>)\n")
-        result = project.adapter.run(command)
-        exit_codes[project.name] = result.returncode
+    while not scheduler.finished:
+        if deadline is not None and time.monotonic() >= deadline:
+            scheduler.cancel()
+            break
+        for name in scheduler.take_ready(limit=1):
+            project, command = commands[name]
+            if trace:
+                trace.start(name)
+            if run_cache:
+                result = _run_cached(project, command, run_cache, _time_left(timeout, deadline))
+            else:
+                theme.echo(f"\nRunning <a><b>{command}</b></a>  (<b>{project.name}</b>)\n")
+                result = _run_command(project, command, _time_left(timeout, deadline))
+            if trace:
+                trace.finish(name, result)
+            exit_codes[project.name] = exit_code = result.exit_code
+            scheduler.complete(name, success=result.success)
+            if exit_code and fail_fast:
+                scheduler.cancel()
 
-    failed = {name for name, code in exit_codes.items() if code}
+    failed = [name for name, code in exit_codes.items() if code]
 
     theme.echo("")
     if failed:
@@ -34,86 +471,893 @@ def _run_in_series(project_commands: List[Tuple[Project, str]]) -> int:
     return _get_exit_code(exit_codes.values())
 
 
-def _run_in_parallel(project_commands: List[Tuple[Project, str]]) -> int:
-    """Run each command in each project in parallel.
+def _run_cached(project: Project, command: str, run_cache: RunCache, timeout: float = None) -> Result:
+    """Replay the recorded result of a command in a project, or run it and record its result.
+
+    Output is written to stdout, so the returned result holds none.
+    """
+    key = run_cache.key(project, command)
+    cached = run_cache.get(key)
+    if cached:
+        theme.echo(f"\nReplaying <a><b>{command}</b></a>  (<b>{project.name}</b>, cached)\n")
+        run_cache.restore(project, cached)
+        sys.stdout.buffer.write(cached.output)
+        sys.stdout.buffer.flush()
+        return Result(cached.exit_code, "", cached=True)
+    theme.echo(f"\nRunning <a><b>{command}</b></a>  (<b>{project.name}</b>)\n")
+    output = Output()
+    result = _run_command(project, command, timeout, output)
+    if not result.timed_out:
+        run_cache.put(project, key, result.exit_code, output.file)
+    output.close()
+    return result
+
+
+def _run_command(project: Project, command: str, timeout: float = None, output: Output = None) -> Result:
+    """Run a command in a project, returning its exit code, resource usage and whether it timed out.
 
-    Command output is captured, and only displayed for projects which failed after all
-    projects have finished.
+    Output is written to stdout, so the returned result holds none.
+
+    Given a timeout, the command runs in its own process group, so that it is cancelled along
+    with any processes it starts. Given an output, the combined stdout and stderr of the
+    command are captured there, as well as written to stdout.
     """
-    commands = {command for _, command in project_commands}
-    if len(commands) == 1:
-        command_repr = commands.pop()
+    args, kwargs = project.adapter.run_args(command)
+    if output is not None:
+        kwargs.update(stdout=PIPE, stderr=subprocess.STDOUT)
+    popen = subprocess.Popen(args, start_new_session=timeout is not None, **kwargs)
+    copier = None
+    if output is not None:
+        copier = threading.Thread(target=_copy_output, args=(popen.stdout, output), daemon=True)
+        copier.start()
+    timed_out = False
+    try:
+        usage = _wait(popen, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        theme.echo(f"\n<e>Timed out after <b>{timeout:.1f}s</b></e>")
+        usage = _terminate(popen)
+        timed_out = True
+    except BaseException:
+        if timeout is None:
+            popen.kill()
+            popen.wait()
+        else:
+            _terminate(popen)
+        raise
+    if copier:
+        copier.join()
+    exit_code = _TIMEOUT_EXIT_CODE if timed_out else popen.returncode
+    return Result(exit_code, "", timed_out=timed_out, usage=usage)
+
+
+def _copy_output(file: IO[bytes], output: Output) -> None:
+    """Capture output from a pipe, writing it to stdout as it arrives."""
+    stdout = sys.stdout.buffer
+    with file:
+        for data in iter(lambda: os.read(file.fileno(), _READ_SIZE), b""):
+            output.write(data)
+            stdout.write(data)
+            stdout.flush()
+
+
+def _time_left(timeout: Optional[float], deadline: Optional[float]) -> Optional[float]:
+    """Seconds a command may run for, given its own timeout and the deadline of the run."""
+    limits = [] if timeout is None else [timeout]
+    if deadline is not None:
+        limits.append(deadline - time.monotonic())
+    return max(min(limits), 0) if limits else None
+
+
+def _run_in_parallel(
+    project_commands: List[Tuple[Project, str]],
+    scheduler: Scheduler,
+    jobs: int,
+    log_dir: Path = None,
+    stream: bool = False,
+    fail_fast: bool = False,
+    timeout: float = None,
+    deadline: Optional[float] = None,
+    run_cache: RunCache = None,
+    trace: Trace = None,
+) -> int:
+    """Run each command in each project in parallel, with at most `jobs` running at once.
+
+    Command output is captured, and only the end of the output of projects which failed is
+    displayed, after all projects have finished. If `stream` is set, output is instead
+    written as it arrives, one whole line at a time.
+
+    Rather than polling, this blocks until a child writes output or exits, a timeout or
+    grace period expires, or the status line is next due to be redrawn. If this is
+    interrupted, every running command is cancelled before returning.
+    """
+    commands = {project.name: (project, command) for project, command in project_commands}
+    command_set = {command for _, command in project_commands}
+    if len(command_set) == 1:
+        command_repr = command_set.pop()
     else:
         command_repr = "[various commands]"
     theme.echo(f"\nRunning <a><b>{command_repr}</b></a>\n")
-    running = {project.name: project.adapter.popen(command) for project, command in project_commands}
+    if log_dir:
+        log_dir.mkdir(parents=True, exist_ok=True)
+    max_name_length = max([len(name) for name in commands])
+    status = StatusLine()
+    line_stream = LineStream(list(commands), status) if stream else None
+    running: Dict[str, Job] = {}
     complete: Dict[str, Result] = {}
-    spinner = Spinner()
-    timer = Timer()
-    max_name_length = max([len(name) for name in running])
-    while running:
-        for name, popen in running.copy().items():
-            exit_code = popen.poll()
-            theme.echo(
-                f"{next(spinner)} <a>Running ({next(timer)})</a>: " + ", ".join([f"<b>{name}</b>" for name in running]),
-                nl=False,
-                rewrite=True,
-            )
-            if exit_code is None:
-                continue
-            stdout, stderr = popen.communicate()
-            del running[name]
-            complete[name] = Result(exit_code=exit_code, stdout=stdout, stderr=stderr)
-            if exit_code != 0:
-                theme.echo(f"<e>✘ {name.ljust(max_name_length)} ({next(timer)})</e>", rewrite=True)
-            else:
-                theme.echo(f"<s>✔ {name.ljust(max_name_length)} ({next(timer)})</s>", rewrite=True)
+    keys: Dict[str, str] = {}
+    progress: Optional[Tuple[int, int]] = None
+    end_time: Optional[float] = None
+
+    def cancel(timed_out: bool = False) -> None:
+        for job in running.values():
+            job.cancel(timed_out=timed_out)
+        for cancelled in scheduler.cancel():
+            status.echo(f"<w>- {cancelled.ljust(max_name_length)} (cancelled)</w>")
 
+    def finish(name: str, result: Result) -> None:
+        complete[name] = result
+        if trace:
+            trace.finish(name, result)
+        elapsed = "cached" if result.cached else f"{time.monotonic() - status.start:.1f}s"
+        if result.cancelled:
+            status.echo(f"<w>- {name.ljust(max_name_length)} (cancelled)</w>")
+        elif result.timed_out:
+            status.echo(f"<e>✘ {name.ljust(max_name_length)} ({elapsed}, timed out)</e>")
+        elif result.success:
+            status.echo(f"<s>✔ {name.ljust(max_name_length)} ({elapsed})</s>")
+        else:
+            status.echo(f"<e>✘ {name.ljust(max_name_length)} ({elapsed})</e>")
+        for skipped in scheduler.complete(name, success=result.success):
+            status.echo(f"<w>- {skipped.ljust(max_name_length)} (skipped)</w>")
+        if fail_fast and not result.success and not result.cancelled:
+            cancel()
+
+    def replay(name: str, cached: CachedResult) -> Result:
+        output = Output(log_dir / f"{name}.log" if log_dir else None)
+        output.write(cached.output)
+        if line_stream:
+            line_stream.write(name, "stdout", cached.output)
+            line_stream.flush(name, "stdout")
+        tail, truncated = output.tail()
+        output.close()
+        return Result(cached.exit_code, tail, truncated=truncated, log_path=output.path, cached=True)
+
+    with selectors.DefaultSelector() as selector:
+        try:
+            while not scheduler.finished:
+                # Replaying a cached result may allow more projects to start straight away.
+                ready = scheduler.take_ready(limit=jobs - len(running))
+                while ready:
+                    for name in ready:
+                        project, command = commands[name]
+                        if trace:
+                            trace.start(name)
+                        if run_cache:
+                            keys[name] = run_cache.key(project, command)
+                            cached = run_cache.get(keys[name])
+                            if cached:
+                                run_cache.restore(project, cached)
+                                finish(name, replay(name, cached))
+                                continue
+                        output = Output(log_dir / f"{name}.log" if log_dir else None)
+                        running[name] = Job.start(project, command, selector, output, line_stream)
+                    ready = scheduler.take_ready(limit=jobs - len(running))
+                if scheduler.finished:
+                    break
+                now = time.monotonic()
+                if deadline is not None and now >= deadline:
+                    cancel(timed_out=True)
+                    deadline = None
+                for job in running.values():
+                    job.enforce_timeout(now, timeout)
+                if scheduler.durations and status.interactive and progress != (len(complete), len(running)):
+                    # The expected end of the run only changes when projects start or finish.
+                    progress = (len(complete), len(running))
+                    end_time = now + _expected_time_left(scheduler, jobs, running, now)
+                status.update(running, pending=len(scheduler.pending), end_time=end_time)
+                wake_times = [job.wake_time(timeout) for job in running.values()] + [deadline]
+                for key, _ in selector.select(timeout=_select_timeout(status.timeout(), wake_times)):
+                    job, stream_name = key.data
+                    job.read(stream_name, selector)
+                for name, job in list(running.items()):
+                    if not job.finished:
+                        continue
+                    del running[name]
+                    if run_cache and not job.cancelled:
+                        run_cache.put(commands[name][0], keys[name], job.popen.returncode, job.output.file)
+                    finish(name, job.result())
+        except BaseException:
+            status.clear()
+            # Jobs may have finished since they were last collected, leaving nothing to cancel.
+            unfinished = [job for job in running.values() if not job.finished]
+            for job in unfinished:
+                job.cancel()
+            for job in unfinished:
+                job.wait()
+            raise
+    status.clear()
+
+    complete = {name: result for name, result in complete.items() if not result.cancelled}
     theme.echo("")
+    if stream:
+        failed = [name for name, result in complete.items() if not result.success]
+        if failed:
+            theme.echo("<e>Some projects failed</e>: " + ", ".join([f"<b>{name}</b>" for name in failed]))
+        return _get_exit_code({result.exit_code for result in complete.values()})
     for name, result in complete.items():
-        if not result.success:
-            theme.echo(f"<e><b>{name}</b> failed with exit code <b>{exit_code}</b></e>:")
-            click.echo(result.output)  # Don't try to format subprocess output
+        if result.success:
+            continue
+        if result.timed_out:
+            theme.echo(f"<e><b>{name}</b> timed out</e>:")
+        else:
+            theme.echo(f"<e><b>{name}</b> failed with exit code <b>{result.exit_code}</b></e>:")
+        if result.truncated:
+            message = f"<w>... showing the last {len(result.output.splitlines())} lines of output"
+            if result.log_path:
+                message += ", see %s for the full output"
+                theme.echo(message + "</w>", str(result.log_path))
+            else:
+                theme.echo(message + "</w>")
+        click.echo(result.output)  # Don't try to format subprocess output
 
     return _get_exit_code({result.exit_code for result in complete.values()})
 
 
+class Job:
+    """A command running in a project, whose output is read as it is written.
+
+    The job is registered with a selector for each of its output streams and, where the
+    platform supports it, a file descriptor which becomes readable when the process exits.
+    Output is captured, and also written to `line_stream` if given.
+
+    Each job runs in its own process group, so that cancelling it also cancels any processes
+    started by its command.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        popen: subprocess.Popen,
+        selector: selectors.BaseSelector,
+        output: Output,
+        line_stream: LineStream = None,
+    ):
+        self.name = name
+        self.popen = popen
+        self.output = output
+        self.line_stream = line_stream
+        self.open_streams: Set[str] = set()
+        self.exited = False
+        self.started = time.monotonic()
+        self.timed_out = False
+        self.usage: Optional[Usage] = None
+        self._kill_time: Optional[float] = None
+        self._killed = False
+        self._pidfd: Optional[int] = None
+        for stream in ("stdout", "stderr"):
+            file = getattr(popen, stream)
+            os.set_blocking(file.fileno(), False)
+            selector.register(file, selectors.EVENT_READ, (self, stream))
+            self.open_streams.add(stream)
+        # os.pidfd_open is only available on Linux, from Python 3.9.
+        pidfd_open = getattr(os, "pidfd_open", None)
+        if pidfd_open:
+            try:
+                self._pidfd = pidfd_open(popen.pid)
+            except OSError:  # pragma: no cover
+                pass  # pragma: no cover
+        if self._pidfd is not None:
+            selector.register(self._pidfd, selectors.EVENT_READ, (self, None))
+
+    @classmethod
+    def start(
+        cls,
+        project: Project,
+        command: str,
+        selector: selectors.BaseSelector,
+        output: Output,
+        line_stream: LineStream = None,
+    ) -> Job:
+        args, kwargs = project.adapter.run_args(command)
+        popen = subprocess.Popen(
+            args,
+            stdin=subprocess.DEVNULL,
+            stdout=PIPE,
+            stderr=PIPE,
+            start_new_session=True,
+            **kwargs,
+        )
+        return cls(project.name, popen, selector, output, line_stream)
+
+    @property
+    def finished(self) -> bool:
+        return self.exited and not self.open_streams
+
+    @property
+    def cancelled(self) -> bool:
+        return self._kill_time is not None
+
+    def cancel(self, timed_out: bool = False) -> None:
+        """Send SIGTERM to the job, to be followed by SIGKILL after a grace period."""
+        if self.cancelled or self.finished:
+            return
+        self.timed_out = timed_out
+        self._kill_time = time.monotonic() + _TERMINATE_GRACE
+        _signal_group(self.popen, signal.SIGTERM)
+
+    def enforce_timeout(self, now: float, timeout: Optional[float]) -> None:
+        """Cancel the job if it has run for too long, and kill it if its grace period is over."""
+        if timeout and not self.cancelled and now >= self.started + timeout:
+            self.cancel(timed_out=True)
+        if self._kill_time is not None and not self._killed and now >= self._kill_time:
+            _signal_group(self.popen, signal.SIGKILL)
+            self._killed = True
+
+    def wake_time(self, timeout: Optional[float]) -> Optional[float]:
+        """When `enforce_timeout` next needs to be called, if ever."""
+        if self._killed:
+            return None
+        if self._kill_time is not None:
+            return self._kill_time
+        return self.started + timeout if timeout else None
+
+    def wait(self) -> None:
+        """Wait for a job to exit, killing it once the grace period of any cancellation is over.
+
+        A job which has not been cancelled is killed straight away.
+        """
+        if self.finished:
+            return
+        if self._kill_time is not None:
+            try:
+                self.usage = _wait(self.popen, timeout=max(self._kill_time - time.monotonic(), 0))
+            except subprocess.TimeoutExpired:
+                pass
+        _signal_group(self.popen, signal.SIGKILL)
+        if self.popen.returncode is None:
+            self.usage = _wait(self.popen)
+
+    def read(self, stream: Optional[str], selector: selectors.BaseSelector) -> None:
+        """Handle a ready event for one of the job's file descriptors."""
+        if stream is None:
+            assert self._pidfd is not None
+            selector.unregister(self._pidfd)
+            os.close(self._pidfd)
+            self._pidfd = None
+            self.usage = _wait(self.popen)
+            self.exited = True
+            return
+        file = getattr(self.popen, stream)
+        try:
+            data = os.read(file.fileno(), _READ_SIZE)
+        except BlockingIOError:  # pragma: no cover
+            return  # pragma: no cover
+        if data:
+            self.output.write(data)
+            if self.line_stream:
+                self.line_stream.write(self.name, stream, data)
+            return
+        if self.line_stream:
+            self.line_stream.flush(self.name, stream)
+        selector.unregister(file)
+        file.close()
+        self.open_streams.discard(stream)
+        if not self.open_streams and self._pidfd is None:
+            # Without a file descriptor for the process, wait once its output is closed.
+            self.usage = _wait(self.popen)
+            self.exited = True
+
+    def result(self) -> Result:
+        """Get the result of the finished job, releasing its captured output.
+
+        If the job was cancelled, any processes left behind in its process group are killed.
+        """
+        if self.cancelled:
+            _signal_group(self.popen, signal.SIGKILL)
+        tail, truncated = self.output.tail()
+        self.output.close()
+        return Result(
+            exit_code=_TIMEOUT_EXIT_CODE if self.timed_out else self.popen.returncode,
+            output=tail,
+            truncated=truncated,
+            log_path=self.output.path,
+            timed_out=self.timed_out,
+            cancelled=self.cancelled and not self.timed_out,
+            usage=self.usage,
+        )
+
+
+class Output:
+    """Output captured from a subprocess.
+
+    Output is held in memory until it grows beyond `max_size` bytes, then spilled to a
+    temporary file. If a path is given, the output is written directly to that file instead.
+    """
+
+    def __init__(self, path: Path = None, max_size: int = _SPOOL_SIZE):
+        self.path = path
+        self.file: IO[bytes] = open(path, "wb+") if path else tempfile.SpooledTemporaryFile(max_size=max_size)
+        self.size = 0
+
+    def write(self, data: bytes) -> None:
+        self.file.write(data)
+        self.size += len(data)
+
+    def tail(self, max_lines: int = _TAIL_LINES, max_bytes: int = _TAIL_BYTES) -> Tuple[str, bool]:
+        """Get the end of the output, and whether any earlier output was omitted."""
+        self.file.seek(max(self.size - max_bytes, 0))
+        lines = self.file.read().decode(errors="replace").splitlines()
+        truncated = self.size > max_bytes
+        if truncated and lines:
+            lines = lines[1:]  # The first line is likely partial.
+        if len(lines) > max_lines:
+            lines = lines[-max_lines:]
+            truncated = True
+        return "\n".join(lines), truncated
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class LineStream:
+    """Writes output from many projects to stdout, prefixing each line with its project.
+
+    Prefixes are aligned, and colored on a terminal. Output is only written in whole lines,
+    so lines from different projects are never interleaved. Each chunk of output is written
+    at once, rather than line by line.
+    """
+
+    def __init__(self, names: List[str], status: StatusLine, color: bool = None):
+        self.status = status
+        self.file = sys.stdout.buffer
+        color = sys.stdout.isatty() if color is None else color
+        width = max([len(name) for name in names])
+        self.prefixes: Dict[str, bytes] = {}
+        for name, number in zip(names, cycle(theme.PALETTE)):
+            prefix = f"{name.ljust(width)} |"
+            self.prefixes[name] = ((theme.paint(prefix, number) if color else prefix) + " ").encode()
+        self.partial: Dict[Tuple[str, str], bytes] = {}
+
+    def write(self, name: str, stream: str, data: bytes) -> None:
+        """Write the complete lines in some output, holding back any partial line."""
+        key = (name, stream)
+        data = self.partial.pop(key, b"") + data
+        end = data.rfind(b"\n") + 1
+        if len(data) - end > _MAX_LINE_BYTES:
+            end = len(data)
+        if end < len(data):
+            self.partial[key] = data[end:]
+        if end:
+            self._write_lines(name, data[:end])
+
+    def flush(self, name: str, stream: str) -> None:
+        """Write any partial line held back, once a stream has closed."""
+        data = self.partial.pop((name, stream), b"")
+        if data:
+            self._write_lines(name, data)
+
+    def _write_lines(self, name: str, data: bytes) -> None:
+        prefix = self.prefixes[name]
+        if data.endswith(b"\n"):
+            data = data[:-1]
+        self.status.clear()
+        self.file.write(prefix + data.replace(b"\n", b"\n" + prefix) + b"\n")
+        self.file.flush()
+
+
+class StatusLine:
+    """A line on stderr showing the projects currently running.
+
+    On a terminal, the line shows a spinner and is redrawn in place, at most `fps` times
+    per second. Otherwise, the line is never redrawn, and progress is only shown through
+    permanent lines.
+    """
+
+    def __init__(self, chars: str = "⠋⠙⠹⠸⠼⠴⠦⠧⠇⠏", fps: float = 10, interactive: bool = None):
+        self.frames = cycle(chars)
+        self.delay = 1 / fps
+        self.interactive = sys.stderr.isatty() if interactive is None else interactive
+        self.start = time.monotonic()
+        self._next_redraw = self.start
+        self._drawn: Optional[str] = None
+
+    def timeout(self) -> Optional[float]:
+        """Seconds until the line should next be redrawn, if ever."""
+        if not self.interactive:
+            return None
+        return max(self._next_redraw - time.monotonic(), 0)
+
+    def update(self, running: Iterable[str], pending: int = 0, end_time: float = None) -> None:
+        """Redraw the line, if a redraw is due, showing the time left until `end_time` if given."""
+        now = time.monotonic()
+        if not self.interactive or now < self._next_redraw:
+            return
+        self._next_redraw = now + self.delay
+        elapsed = f"{now - self.start:.1f}s"
+        if end_time is not None and end_time > now:
+            elapsed += f", about {_format_duration(end_time - now)} left"
+        line = f"{next(self.frames)} <a>Running ({elapsed})</a>: " + ", ".join([f"<b>{name}</b>" for name in running])
+        if pending:
+            line += f" <a>({pending} pending)</a>"
+        theme.echo(line, nl=False, rewrite=True)
+        self._drawn = line
+
+    def echo(self, message: str) -> None:
+        """Write a permanent line above the status line."""
+        theme.echo(message, rewrite=self._drawn is not None)
+        self._drawn = None
+        self._next_redraw = time.monotonic()
+
+    def clear(self) -> None:
+        if self._drawn is not None:
+            theme.echo("", nl=False, rewrite=True)
+            self._drawn = None
+
+
+class Trace:
+    """A timeline of a run, for the Chrome trace viewer or Perfetto.
+
+    The timeline is written in the trace event format, with a track for each of the `jobs`
+    slots in which commands run, showing a span for each project from when its command
+    started until it finished. The time each project spent waiting for a free slot, after
+    its dependencies succeeded, is shown as a separate span on a queue track.
+
+    The file also holds a `summary`, giving the status, exit code, wall time and queue time
+    of each project, in seconds, whether its result was replayed from the cache, and the
+    resources its command used.
+    """
+
+    def __init__(self, project_commands: List[Tuple[Project, str]], scheduler: Scheduler, jobs: int):
+        self.commands = {project.name: command for project, command in project_commands}
+        self.scheduler = scheduler
+        self.jobs = jobs
+        self.start_time = time.monotonic()
+        self.starts: Dict[str, float] = {}
+        self.slots: Dict[str, int] = {}
+        self.results: Dict[str, Tuple[float, Result]] = {}
+        self._free_slots = list(range(jobs))
+
+    def start(self, name: str) -> None:
+        """Record that a project has started, in the lowest free slot."""
+        self.starts[name] = time.monotonic()
+        self.slots[name] = heapq.heappop(self._free_slots) if self._free_slots else len(self.slots)
+
+    def finish(self, name: str, result: Result) -> None:
+        """Record the result of a project, freeing its slot."""
+        self.results[name] = (time.monotonic(), result)
+        heapq.heappush(self._free_slots, self.slots[name])
+
+    def summary(self, exit_code: Optional[int]) -> dict:
+        end_time = time.monotonic()
+        projects = {}
+        for name, command in self.commands.items():
+            entry: dict = {"command": command, "status": self.status(name), "exit_code": None}
+            if name in self.starts:
+                finished, result = self.results.get(name, (end_time, None))
+                ready = self.scheduler.ready_times.get(name, self.starts[name])
+                entry.update(
+                    exit_code=result.exit_code if result and not result.cancelled else None,
+                    cached=bool(result and result.cached),
+                    usage=result.usage._asdict() if result and result.usage else None,
+                    slot=self.slots[name],
+                    start_time=round(self.starts[name] - self.start_time, 6),
+                    wall_time=round(finished - self.starts[name], 6),
+                    queue_time=round(self.starts[name] - ready, 6),
+                )
+            projects[name] = entry
+        return {
+            "exit_code": exit_code,
+            "jobs": self.jobs,
+            "wall_time": round(end_time - self.start_time, 6),
+            "projects": projects,
+        }
+
+    def events(self) -> List[dict]:
+        end_time = time.monotonic()
+        events: List[dict] = [
+            {"ph": "M", "name": "process_name", "pid": 1, "tid": 0, "args": {"name": "workspace"}},
+            {"ph": "M", "name": "thread_name", "pid": 1, "tid": 0, "args": {"name": "queue"}},
+        ]
+        for slot in range(max([self.jobs, *[slot + 1 for slot in self.slots.values()]])):
+            events.append(
+                {"ph": "M", "name": "thread_name", "pid": 1, "tid": slot + 1, "args": {"name": f"slot {slot + 1}"}}
+            )
+        for number, (name, started) in enumerate(self.starts.items()):
+            finished, result = self.results.get(name, (end_time, None))
+            ready = self.scheduler.ready_times.get(name, started)
+            if started > ready:
+                queued = {"name": name, "cat": "queue", "pid": 1, "tid": 0, "id": number}
+                events.append({**queued, "ph": "b", "ts": self._timestamp(ready)})
+                events.append({**queued, "ph": "e", "ts": self._timestamp(started)})
+            events.append(
+                {
+                    "ph": "X",
+                    "name": name,
+                    "cat": "command",
+                    "pid": 1,
+                    "tid": self.slots[name] + 1,
+                    "ts": self._timestamp(started),
+                    "dur": self._timestamp(finished) - self._timestamp(started),
+                    "args": {
+                        "command": self.commands[name],
+                        "status": self.status(name),
+                        "exit_code": result.exit_code if result and not result.cancelled else None,
+                        "cached": bool(result and result.cached),
+                    },
+                }
+            )
+        return events
+
+    def write(self, path: Path, exit_code: Optional[int]) -> None:
+        """Write the timeline to a file."""
+        trace = {"traceEvents": self.events(), "displayTimeUnit": "ms", "summary": self.summary(exit_code)}
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(trace, indent=2))
+
+    def status(self, name: str) -> str:
+        """The status of a project, as given in the summary."""
+        if name in self.scheduler.skipped:
+            return "skipped"
+        if name in self.scheduler.cancelled:
+            return "cancelled"
+        if name not in self.starts:
+            return "pending"
+        if name not in self.results:
+            return "interrupted"
+        result = self.results[name][1]
+        if result.cancelled:
+            return "cancelled"
+        if result.timed_out:
+            return "timed out"
+        return "succeeded" if result.success else "failed"
+
+    def _timestamp(self, monotonic: float) -> int:
+        """Microseconds since the start of the run."""
+        return max(int((monotonic - self.start_time) * 1_000_000), 0)
+
+
+class Scheduler:
+    """Decides when each project may start, given the dependencies between them.
+
+    Projects become ready once all of their dependencies have succeeded. When a project fails,
+    every project depending on it, directly or transitively, is skipped. Projects which have
+    not started can also be cancelled.
+
+    Ready projects start in the order given, unless their expected `durations` are known. Then
+    the project at the head of the longest chain of dependees (its critical path) starts
+    first, so that long chains are not left until last. Without dependencies, this is simply
+    the longest project first.
+    """
+
+    def __init__(
+        self,
+        names: Iterable[str],
+        dependencies: Mapping[str, Set[str]] = None,
+        durations: Mapping[str, float] = None,
+    ):
+        self.order = {name: position for position, name in enumerate(names)}
+        self.durations = durations or {}
+        dependencies = dependencies or {}
+        self.waiting: Dict[str, Set[str]] = {
+            name: {dependency for dependency in dependencies.get(name, ()) if dependency in self.order}
+            for name in self.order
+        }
+        self.dependees: Dict[str, Set[str]] = {name: set() for name in self.order}
+        for name, waiting in self.waiting.items():
+            for dependency in waiting:
+                self.dependees[dependency].add(name)
+        # Fail early, rather than waiting forever for projects in a cycle.
+        toposorted = Graph(self.order, self.waiting).toposort()
+        self.priorities: Dict[str, float] = {}
+        """The expected duration of the critical path starting at each project."""
+        for name in reversed(toposorted):
+            following = [self.priorities[dependee] for dependee in self.dependees[name]]
+            self.priorities[name] = self.durations.get(name, 0) + max(following, default=0)
+        self.started: Set[str] = set()
+        self.completed: Set[str] = set()
+        self.skipped: Set[str] = set()
+        self.cancelled: Set[str] = set()
+        now = time.monotonic()
+        self.ready_times: Dict[str, float] = {name: now for name, waiting in self.waiting.items() if not waiting}
+        """When each project became ready to start, once all of its dependencies had succeeded."""
+
+    @property
+    def finished(self) -> bool:
+        return len(self.completed) + len(self.skipped) + len(self.cancelled) == len(self.order)
+
+    @property
+    def pending(self) -> List[str]:
+        """Projects which have not started yet, and have not been skipped or cancelled."""
+        return [name for name in self.order if name not in self.started]
+
+    def take_ready(self, limit: int = None) -> List[str]:
+        """Get up to `limit` projects which are ready to start, marking them as started."""
+        if limit is not None and limit <= 0:
+            return []
+        ready = [name for name in self.pending if not self.waiting[name]]
+        if self.durations:
+            ready.sort(key=lambda name: (-self.priorities[name], self.order[name]))
+        ready = ready[:limit]
+        self.started.update(ready)
+        return ready
+
+    def complete(self, name: str, success: bool) -> List[str]:
+        """Mark a project as complete, returning any projects skipped as a result."""
+        self.completed.add(name)
+        if success:
+            now = time.monotonic()
+            for dependee in self.dependees[name]:
+                self.waiting[dependee].discard(name)
+                if not self.waiting[dependee]:
+                    self.ready_times.setdefault(dependee, now)
+            return []
+        skipped = []
+        stack = [name]
+        while stack:
+            for dependee in self.dependees[stack.pop()]:
+                if dependee not in self.started:
+                    self.skipped.add(dependee)
+                    self.started.add(dependee)
+                    skipped.append(dependee)
+                    stack.append(dependee)
+        return sorted(skipped, key=self.order.__getitem__)
+
+    def cancel(self) -> List[str]:
+        """Cancel every project which has not started, returning those cancelled."""
+        cancelled = self.pending
+        self.cancelled.update(cancelled)
+        self.started.update(cancelled)
+        return cancelled
+
+
+class PlannedJob(NamedTuple):
+    """When a project is expected to run, in seconds from the time it was planned."""
+
+    name: str
+    slot: int
+    start: float
+    end: float
+
+
+def plan(
+    scheduler: Scheduler, durations: Mapping[str, float], jobs: int, running: Mapping[str, float] = None
+) -> List[PlannedJob]:
+    """Simulate the rest of a run, assuming each project takes its expected duration and succeeds.
+
+    Projects already running are given by the seconds they have left. The scheduler is left
+    unchanged.
+    """
+    scheduler = copy.deepcopy(scheduler)
+    running = running or {}
+    free_slots = list(range(len(running), max(jobs, len(running))))
+    finishing = [(seconds, slot, name) for slot, (name, seconds) in enumerate(running.items())]
+    heapq.heapify(finishing)
+    planned = []
+    now = 0.0
+    while True:
+        for name in scheduler.take_ready(limit=len(free_slots)):
+            slot = heapq.heappop(free_slots)
+            end = now + durations.get(name, 0)
+            planned.append(PlannedJob(name, slot, now, end))
+            heapq.heappush(finishing, (end, slot, name))
+        if not finishing:
+            return planned
+        now, slot, name = heapq.heappop(finishing)
+        heapq.heappush(free_slots, slot)
+        scheduler.complete(name, success=True)
+
+
+def _expected_time_left(scheduler: Scheduler, jobs: int, running: Mapping[str, Job], now: float) -> float:
+    """Seconds until the run is expected to finish, given the projects running now."""
+    left = {name: max(scheduler.durations.get(name, 0) - (now - job.started), 0) for name, job in running.items()}
+    planned = plan(scheduler, scheduler.durations, jobs, left)
+    return max([0, *left.values(), *[job.end for job in planned]])
+
+
 def _get_exit_code(exit_codes: Iterable[int]) -> int:
     """Reduce a set of exit codes to the absolute value."""
-    return sorted(exit_codes, key=lambda code: abs(code), reverse=True)[0]
+    return max(exit_codes, key=abs, default=0)
 
 
-def Spinner(chars: str = "⠋⠙⠹⠸⠼⠴⠦⠧⠇⠏", fps: float = 10):
-    """A spinner for showing progress."""
-    frames = cycle(chars)
-    current_frame = next(frames)
-    last_update = time.monotonic()
-    delay = 1 / fps
-    while True:
-        now = time.monotonic()
-        if now - last_update > delay:
-            last_update = now
-            current_frame = next(frames)
-        yield current_frame
+def _select_timeout(timeout: Optional[float], wake_times: Iterable[Optional[float]]) -> Optional[float]:
+    """Shorten a timeout to end no later than the earliest of some times, if any."""
+    times = [wake_time for wake_time in wake_times if wake_time is not None]
+    if not times:
+        return timeout
+    until = max(min(times) - time.monotonic(), 0)
+    return until if timeout is None else min(timeout, until)
+
+
+def _signal_group(popen: subprocess.Popen, signum: int) -> None:
+    """Send a signal to every process in the process group led by a child."""
+    try:
+        os.killpg(popen.pid, signum)
+    except (ProcessLookupError, PermissionError):
+        pass  # The process group has already exited.
+
 
+def _terminate(popen: subprocess.Popen) -> Optional[Usage]:
+    """Terminate the process group led by a child, killing it after a grace period."""
+    _signal_group(popen, signal.SIGTERM)
+    try:
+        return _wait(popen, timeout=_TERMINATE_GRACE)
+    except subprocess.TimeoutExpired:
+        pass
+    _signal_group(popen, signal.SIGKILL)
+    return _wait(popen)
 
-def Timer():
-    """A timer which shows total time elapsed on each iteration."""
-    start = time.monotonic()
+
+def _wait(popen: subprocess.Popen, timeout: float = None) -> Optional[Usage]:
+    """Wait for a child to exit, returning the resources used by it and its descendants.
+
+    Like `Popen.wait`, this raises `subprocess.TimeoutExpired` if the child is still running
+    after `timeout` seconds, polling with increasing delays until then. Usage is None if the
+    child has already been waited for.
+    """
+    if popen.returncode is not None:
+        return None
+    end_time = None if timeout is None else time.monotonic() + timeout
+    delay = 0.0005
     while True:
-        yield f"{time.monotonic() - start:.1f}s"
+        try:
+            pid, status, rusage = os.wait4(popen.pid, 0 if timeout is None else os.WNOHANG)
+        except ChildProcessError:
+            popen.wait()
+            return None
+        if pid:
+            popen.returncode = -os.WTERMSIG(status) if os.WIFSIGNALED(status) else os.WEXITSTATUS(status)
+            return Usage.from_rusage(rusage)
+        assert timeout is not None and end_time is not None
+        remaining = end_time - time.monotonic()
+        if remaining <= 0:
+            raise subprocess.TimeoutExpired(popen.args, timeout)
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 2, 0.05)
+
+
+class Usage(NamedTuple):
+    """Resources used by a command, including every descendant process it waited for."""
+
+    max_rss: int
+    """Peak resident set size of the largest process, in bytes."""
+    user_time: float
+    system_time: float
+    voluntary_switches: int
+    involuntary_switches: int
+
+    @classmethod
+    def from_rusage(cls, rusage: resource.struct_rusage) -> Usage:
+        # Linux reports the peak resident set size in kilobytes, but macOS in bytes.
+        scale = 1 if sys.platform == "darwin" else 1024
+        return cls(
+            max_rss=rusage.ru_maxrss * scale,
+            user_time=rusage.ru_utime,
+            system_time=rusage.ru_stime,
+            voluntary_switches=rusage.ru_nvcsw,
+            involuntary_switches=rusage.ru_nivcsw,
+        )
+
+    @property
+    def cpu_time(self) -> float:
+        return self.user_time + self.system_time
 
 
 class Result(NamedTuple):
     """Result of a subprocess."""
 
     exit_code: int
-    stdout: str
-    stderr: str
-
-    @property
-    def output(self) -> str:
-        return "\n".join([self.stdout, self.stderr])
+    output: str
+    """The end of the combined stdout and stderr of the subprocess."""
+    truncated: bool = False
+    """Whether earlier output was omitted from `output`."""
+    log_path: Optional[Path] = None
+    timed_out: bool = False
+    cancelled: bool = False
+    """Whether the command was cancelled, because another failed or the run was interrupted."""
+    cached: bool = False
+    """Whether the result was replayed from the cache, rather than the command being run."""
+    usage: Optional[Usage] = None
+    """Resources used by the command, if it ran to completion."""
 
     @property
     def success(self) -> bool:
@@ -17,11 +17,20 @@ class Colors:
     red = 167
 
 
+# Colors which can be cycled through to distinguish sources of output.
+PALETTE = (Colors.turquoise, Colors.purple, Colors.yellow, Colors.green)
+
+
 def _color_code(number: int):
     assert number < 256
     return f"\x1b[38;5;{number}m"
 
 
+def paint(message: str, number: int) -> str:
+    """Color a message, with a color number from the 256 color palette."""
+    return _color_code(number) + message + _RESET
+
+
 TAGS = {
     "header": _color_code(Colors.turquoise),
     "success": _color_code(Colors.green),
@@ -1,11 +1,17 @@
 import re
 from fnmatch import fnmatch
 from pathlib import Path
-from typing import Iterable, Optional, Set
+from typing import Any, Callable, Iterable, Optional, Set, TypeVar
 
+import click
+
+from workspace.cli import callbacks, theme
 from workspace.core.adapter import get_adapters
+from workspace.core.graph import DependencyGraph, Graph
 from workspace.core.models import Project, Workspace
 
+F = TypeVar("F", bound=Callable[..., Any])
+
 
 def resolve_specifiers(workspace: Workspace, specifiers: Iterable[str]) -> Set[str]:
     """Extract project names from given specifiers.
@@ -31,6 +37,19 @@ def resolve_specifiers(workspace: Workspace, specifiers: Iterable[str]) -> Set[s
     return result
 
 
+def get_dependency_graph(workspace: Workspace, roots: Iterable[str] = None, include_dev: bool = False) -> Graph:
+    """Get the graph of direct dependencies between projects, warning about any cycles.
+
+    If roots are given, only projects reachable from them are included.
+    """
+    dependency_graph = DependencyGraph(workspace)
+    graph = dependency_graph.graph(roots, include_dev=include_dev)
+    dependency_graph.save()
+    for cycle in graph.cycles():
+        theme.echo("<w>Projects have cyclic dependencies: %s</w>", " -> ".join(cycle + cycle[:1]))
+    return graph
+
+
 def detect_type(workspace: Workspace, path: Path) -> Optional[str]:
     """Detect the type of a project at the given path."""
     for type_name in get_adapters():
@@ -46,3 +65,123 @@ def detect_type(workspace: Workspace, path: Path) -> Optional[str]:
         except:
             continue
     return None
+
+
+# Options shared by the commands which run a command in each project, such as `run` and `sync`.
+_RUNNER_OPTIONS = [
+    click.option(
+        "--parallel/--no-parallel",
+        "-p/ ",
+        type=bool,
+        default=False,
+        help="Run the command in parallel.",
+    ),
+    click.option(
+        "--topological/--no-topological",
+        "-t/ ",
+        type=bool,
+        default=False,
+        help="Only start each project once its dependencies have succeeded.",
+    ),
+    click.option(
+        "--jobs",
+        "-j",
+        type=click.IntRange(min=1),
+        default=None,
+        help="Maximum number of projects to run at once in parallel. Defaults to the number of CPUs.",
+    ),
+    click.option(
+        "--log-dir",
+        type=click.Path(file_okay=False, path_type=Path),
+        default=None,
+        help="Write the full output of each project to a log file in this directory, when running in parallel.",
+    ),
+    click.option(
+        "--stream/--no-stream",
+        type=bool,
+        default=False,
+        help="Run in parallel, writing output line by line as it arrives, prefixed with the project name.",
+    ),
+    click.option(
+        "--fail-fast/--no-fail-fast",
+        type=bool,
+        default=False,
+        help="Cancel outstanding projects as soon as one fails.",
+    ),
+    click.option(
+        "--timeout",
+        type=click.FloatRange(min=0, min_open=True),
+        default=None,
+        help="Cancel the command in a project if it runs for longer than this many seconds.",
+    ),
+    click.option(
+        "--total-timeout",
+        type=click.FloatRange(min=0, min_open=True),
+        default=None,
+        help="Cancel all outstanding projects if the run takes longer than this many seconds.",
+    ),
+    click.option(
+        "--trace",
+        "trace_path",
+        type=click.Path(dir_okay=False, path_type=Path),
+        default=None,
+        help="Write a timeline of the run to this file, in Chrome trace event format.",
+    ),
+    click.option(
+        "--usage/--no-usage",
+        type=bool,
+        default=False,
+        help="Show the peak memory, CPU time and context switches of each project once all have finished.",
+    ),
+    click.option(
+        "--usage-report",
+        type=click.Path(dir_okay=False, path_type=Path),
+        default=None,
+        help="Write the resources used by each project to this file, as JSON.",
+    ),
+    click.option(
+        "--usage-baseline",
+        type=click.Path(dir_okay=False, path_type=Path),
+        default=None,
+        help="Warn about projects using more memory or CPU time than in this earlier usage report.",
+    ),
+    click.option(
+        "--usage-tolerance",
+        type=click.FloatRange(min=0),
+        default=20,
+        help="Percentage increase in memory or CPU time over the baseline to tolerate. Defaults to 20.",
+    ),
+    click.option(
+        "--plan/--no-plan",
+        type=bool,
+        default=False,
+        help="Show the expected order and duration of each project, based on earlier runs, without running anything.",
+    ),
+    click.option(
+        "--shard",
+        type=str,
+        default=None,
+        callback=callbacks.parse_shard,
+        metavar="K/N",
+        help="Only run the projects in the Kth of N shards.",
+    ),
+    click.option(
+        "--shard-report/--no-shard-report",
+        type=bool,
+        default=False,
+        help="Show the projects in each shard, and their expected duration, without running anything.",
+    ),
+    click.option(
+        "--shard-timings",
+        type=click.Path(exists=True, dir_okay=False, path_type=Path),
+        default=None,
+        help="Balance shards using the durations in this --usage-report or --trace file, rather than by project name.",
+    ),
+]
+
+
+def runner_options(function: F) -> F:
+    """Add the options which control how commands are run in each project."""
+    for option in reversed(_RUNNER_OPTIONS):
+        function = option(function)
+    return function
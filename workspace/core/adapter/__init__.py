@@ -1,48 +1,117 @@
+import importlib
+import importlib.util
 from types import MappingProxyType
-from typing import Type
+from typing import Any, Dict, List, Type
 
-from workspace.core.adapter.base import Adapter
-from workspace.core.exceptions import WorkspaceProjectImproperlyConfigured
+from workspace.core.adapter.base import Adapter, PathDependencies
+from workspace.core.exceptions import WorkspacePluginError, WorkspaceProjectImproperlyConfigured
 
-try:
-    from workspace.core.adapter.pipenv import PipenvAdapter
+__all__ = [
+    "Adapter",
+    "PathDependencies",
+    "get_adapter",
+]
 
-    assert PipenvAdapter
-except ImportError:  # pragma: no cover
-    pass  # pragma: no cover
 
-try:
-    from workspace.core.adapter.poetry import PoetryAdapter
+ENTRY_POINT_GROUP = "workspace_cli.adapters"
 
-    assert PoetryAdapter
-except ImportError:  # pragma: no cover
-    pass  # pragma: no cover
+# Adapter types which are known to exist, but whose modules have not necessarily been imported.
+_LAZY_ADAPTERS: Dict[str, str] = {}
+_entry_points_discovered = False
 
+# Built-in adapters, mapped to their module and the optional dependency they require.
+_BUILTIN_ADAPTERS = {
+    "pipenv": ("workspace.core.adapter.pipenv", "pipenv"),
+    "poetry": ("workspace.core.adapter.poetry", "poetry.core"),
+}
 
-__all__ = [
-    "Adapter",
-    "get_adapter",
-]
+
+def register_lazy_adapter(name: str, module_path: str) -> None:
+    """Register the module providing an adapter type, without importing it.
+
+    The module is imported the first time an adapter of that type is requested.
+    """
+    _LAZY_ADAPTERS.setdefault(name, module_path)
 
 
 def get_adapter(name: str) -> Type[Adapter]:
-    adapters = get_adapters()
+    adapters = _loaded_adapters()
+    if name in adapters:
+        return adapters[name]
+    if name not in _LAZY_ADAPTERS:
+        _discover_entry_points()
+    if name in _LAZY_ADAPTERS:
+        _import_adapter_module(_LAZY_ADAPTERS[name])
+        adapters = _loaded_adapters()
     try:
         return adapters[name]
     except KeyError:
         raise WorkspaceProjectImproperlyConfigured(
-            f"No adapter of type {name!r} registered. Available types are {list(adapters)}."
+            f"No adapter of type {name!r} registered. Available types are {get_adapter_names()}."
         )
 
 
 def get_adapters() -> MappingProxyType:
-    return MappingProxyType(
-        {
-            subclass.name: subclass
-            for subclass in _all_subclasses(Adapter)
-            if hasattr(subclass, "name") and subclass.name
-        }
-    )
+    """Get all available adapters, importing any which have not been loaded yet."""
+    _discover_entry_points()
+    for module_path in set(_LAZY_ADAPTERS.values()):
+        _import_adapter_module(module_path)
+    return MappingProxyType(_loaded_adapters())
+
+
+def get_adapter_names() -> List[str]:
+    """Get the names of all available adapter types, without importing them."""
+    _discover_entry_points()
+    return sorted(set(_loaded_adapters()) | set(_LAZY_ADAPTERS))
+
+
+def _loaded_adapters() -> Dict[str, Type[Adapter]]:
+    return {
+        subclass.name: subclass
+        for subclass in _all_subclasses(Adapter)
+        if hasattr(subclass, "name") and subclass.name
+    }
+
+
+def _import_adapter_module(module_path: str) -> None:
+    try:
+        importlib.import_module(module_path)
+    except ModuleNotFoundError:
+        raise WorkspacePluginError(f"Could not find configured plugin {module_path!r}.")
+
+
+def _discover_entry_points() -> None:
+    """Lazily register adapters advertised by installed packages.
+
+    Packages provide adapters via entry points of the form `type-name = "module.path:AdapterClass"`.
+    """
+    global _entry_points_discovered
+    if _entry_points_discovered:
+        return
+    _entry_points_discovered = True
+    from importlib.metadata import entry_points
+
+    all_entry_points: Any = entry_points()
+    if hasattr(all_entry_points, "select"):
+        group = all_entry_points.select(group=ENTRY_POINT_GROUP)
+    else:  # pragma: no cover
+        group = all_entry_points.get(ENTRY_POINT_GROUP, [])
+    for entry_point in group:
+        register_lazy_adapter(entry_point.name, entry_point.value.split(":")[0].strip())
+
+
+def _register_builtin_adapters() -> None:
+    """Register built-in adapters whose optional dependencies are installed, without importing them."""
+    for name, (module_path, requirement) in _BUILTIN_ADAPTERS.items():
+        try:
+            available = importlib.util.find_spec(requirement) is not None
+        except ImportError:  # pragma: no cover
+            available = False  # pragma: no cover
+        if available:
+            register_lazy_adapter(name, module_path)
+
+
+_register_builtin_adapters()
 
 
 def _all_subclasses(cls: Type):
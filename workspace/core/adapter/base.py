@@ -2,7 +2,10 @@ from __future__ import annotations
 
 import shlex
 import subprocess
-from typing import TYPE_CHECKING, ClassVar, List, Optional, Set, Tuple
+from typing import TYPE_CHECKING, ClassVar, List, NamedTuple, Optional, Set, Tuple, Union
+
+from workspace.core.environments import environment_run_args, get_environment
+from workspace.core.settings import get_settings
 
 if TYPE_CHECKING:
     from pathlib import Path  # pragma: no cover
@@ -10,6 +13,13 @@ if TYPE_CHECKING:
     from workspace.core.models import Project  # pragma: no cover
 
 
+class PathDependencies(NamedTuple):
+    """Resolved paths of the local path dependencies declared by a project."""
+
+    default: Set[Path]
+    dev: Set[Path]
+
+
 class Adapter:
     name: ClassVar[Optional[str]]
     command_prefix: ClassVar[List[str]]
@@ -45,24 +55,77 @@ class Adapter:
 
     def popen(self, command: str, capture_output: bool = True) -> subprocess.Popen:
         """Open a subprocess and return it."""
-        command, kwargs = self.run_args(command)
+        args, kwargs = self.run_args(command)
         if capture_output:
             kwargs.update(stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-        return subprocess.Popen(command, **kwargs)
+        return subprocess.Popen(args, **kwargs)
 
-    def run_args(self, command: str) -> Tuple[str, dict]:
+    def run_args(self, command: str) -> Tuple[Union[str, List[str]], dict]:
         """Get modified command and kwargs that should be used when running inside the project.
 
-        These arguments are passed directly to subprocess.Popen.
+        These arguments are passed directly to subprocess.Popen. If `WORKSPACE_DIRECT_RUN` is
+        enabled, and the environment of the project can be found, the command runs directly in
+        that environment. Otherwise, it runs with the `command_prefix` of the adapter.
         """
+        if get_settings().direct_run:
+            environment = get_environment(self._project)
+            if environment is not None:
+                return environment_run_args(command, environment, cwd=self._project.resolved_path)
+        return self.prefixed_run_args(command)
+
+    def prefixed_run_args(self, command: str) -> Tuple[str, dict]:
+        """Get the command and kwargs to run a command with the `command_prefix` of the adapter."""
         # We don't do shlex.join(prefix + shlex.split(command)) because this will escape e.g. |
         command = " ".join([shlex.join(self.command_prefix), command])
         return command, dict(cwd=self._project.resolved_path, shell=True)
 
+    def resolve_environment(self) -> Optional[Path]:
+        """Return the path of the virtual environment of the project, if it can be found.
+
+        Implementing this allows commands to run directly in the environment, rather than
+        with the `command_prefix`, when `WORKSPACE_DIRECT_RUN` is enabled. The result is cached
+        until one of the `lock_paths` changes.
+        """
+        return None
+
     def dependencies(self, include_dev: bool = True) -> Set[str]:
-        """Return the names of projects this project depends on."""
+        """Return the names of projects this project depends on.
+
+        By default, this is derived from `path_dependencies`.
+        """
+        default, dev = self.path_dependencies()
+        paths = default | dev if include_dev else default
+        results = set()
+        for path in paths:
+            project = self._project.root.get_project_by_path(path)
+            if project:
+                results.add(project.name)
+        return results
+
+    def path_dependencies(self) -> PathDependencies:
+        """Return the resolved paths of local path dependencies declared by the project.
+
+        Implementing this, along with `manifest_paths`, allows the dependencies of the project
+        to be cached.
+        """
         raise NotImplementedError  # pragma: no cover
 
+    def manifest_paths(self) -> List[Path]:
+        """Return the files which declare the project's dependencies.
+
+        Dependencies are cached until one of these files changes. If none are returned, the
+        dependencies of the project are never cached.
+        """
+        return []
+
+    def lock_paths(self) -> List[Path]:
+        """Return the files which pin the versions of the project's dependencies, if any.
+
+        The results of commands cached by `workspace run --cache` are invalidated when one of
+        these files changes.
+        """
+        return []
+
     def validate(self):
         """Validate the project.
 
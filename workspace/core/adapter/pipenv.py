@@ -1,18 +1,15 @@
 from __future__ import annotations
 
 import os
+import subprocess
 import sys
 from pathlib import Path
-from typing import Set, Tuple
+from typing import List, Optional, Tuple
 
-import pipenv
-from pipfile import Pipfile
-
-from workspace.core.adapter.base import Adapter
+from workspace.core.adapter.base import Adapter, PathDependencies
+from workspace.core.adapter.scan import find_path_dependencies, get_table, load_toml
 from workspace.core.exceptions import WorkspaceBaseError, WorkspaceProjectImproperlyConfigured
 
-assert pipenv  # please the linter - pipenv must be imported to access vendored pipfile.
-
 
 class PipenvAdapter(Adapter, name="pipenv", command_prefix=("pipenv", "run")):
     @property
@@ -21,23 +18,27 @@ class PipenvAdapter(Adapter, name="pipenv", command_prefix=("pipenv", "run")):
 
     @property
     def pipfile(self):
-        # pipfile is vendored by pipenv, so both imports are necessary.
+        # pipfile is vendored by pipenv, so both imports are necessary. They are deferred
+        # until needed, as importing pipenv is slow.
+        import pipenv
+        from pipfile import Pipfile
+
+        assert pipenv  # please the linter - pipenv must be imported to access vendored pipfile.
         return Pipfile.load(self.pipfile_path)
 
-    def dependencies(self, include_dev: bool = True) -> Set[str]:
-        pipfile = self.pipfile
-        sections = ["default"]
-        if include_dev:
-            sections.append("develop")
-        results = set()
-        for section in sections:
-            for name, value in pipfile.data[section].items():
-                if isinstance(value, dict) and "path" in value:
-                    path = (self._project.resolved_path / Path(value["path"])).resolve()
-                    project = self._project.root.get_project_by_path(path)
-                    if project:
-                        results.add(project.name)
-        return results
+    def manifest_paths(self) -> List[Path]:
+        return [self.pipfile_path]
+
+    def lock_paths(self) -> List[Path]:
+        return [self._project.resolved_path / "Pipfile.lock"]
+
+    def path_dependencies(self) -> PathDependencies:
+        """Scan the Pipfile for path dependencies, without loading it through pipenv."""
+        pipfile = load_toml(self.pipfile_path, self._project.name)
+        return PathDependencies(
+            default=find_path_dependencies(self._project.resolved_path, [get_table(pipfile, "packages")]),
+            dev=find_path_dependencies(self._project.resolved_path, [get_table(pipfile, "dev-packages")]),
+        )
 
     def validate(self):
         if not (self.pipfile_path.exists() and self.pipfile_path.is_file()):
@@ -56,13 +57,13 @@ class PipenvAdapter(Adapter, name="pipenv", command_prefix=("pipenv", "run")):
             command = command + " --dev"
         return command
 
-    def run_args(self, command: str) -> Tuple[str, dict]:
+    def prefixed_run_args(self, command: str) -> Tuple[str, dict]:
         """Override args for running commands.
 
         Set PIPENV_IGNORE_VIRTUALENVS to prevent pipenv using the wrong venv in the case that workspace-cli is
         installed with a venv.
         """
-        command, kwargs = super().run_args(command)
+        command, kwargs = super().prefixed_run_args(command)
 
         env = os.environ.copy()
         env["PIPENV_IGNORE_VIRTUALENVS"] = "1"
@@ -70,6 +71,31 @@ class PipenvAdapter(Adapter, name="pipenv", command_prefix=("pipenv", "run")):
 
         return command, kwargs
 
+    def resolve_environment(self) -> Optional[Path]:
+        """Ask pipenv for the path of the project's virtual environment.
+
+        Projects with a `.env` file have none, since `pipenv run` loads the variables it sets.
+        """
+        if (self._project.resolved_path / ".env").exists():
+            return None
+        env = os.environ.copy()
+        env["PIPENV_IGNORE_VIRTUALENVS"] = "1"
+        try:
+            result = subprocess.run(
+                ["pipenv", "--venv"],
+                cwd=self._project.resolved_path,
+                env=env,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                text=True,
+            )
+        except OSError:
+            return None
+        path = result.stdout.strip()
+        if result.returncode != 0 or not path:
+            return None
+        return Path(path)
+
     @classmethod
     def new(cls, path: Path):
         try:
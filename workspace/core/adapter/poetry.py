@@ -1,17 +1,18 @@
 from __future__ import annotations
 
 import os
+import subprocess
 import sys
 from pathlib import Path
-from typing import Optional, Set, Tuple
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
 
-from poetry.core.factory import Factory
-from poetry.core.pyproject.exceptions import PyProjectException
-from poetry.core.pyproject.toml import PyProjectTOML
-
-from workspace.core.adapter.base import Adapter
+from workspace.core.adapter.base import Adapter, PathDependencies
+from workspace.core.adapter.scan import find_path_dependencies, get_table, load_toml
 from workspace.core.exceptions import WorkspaceBaseError, WorkspaceProjectImproperlyConfigured
 
+if TYPE_CHECKING:
+    from poetry.core.pyproject.toml import PyProjectTOML  # pragma: no cover
+
 
 class PoetryAdapter(Adapter, name="poetry", command_prefix=("poetry", "run")):
     @property
@@ -20,27 +21,42 @@ class PoetryAdapter(Adapter, name="poetry", command_prefix=("poetry", "run")):
 
     @property
     def pyproject(self) -> PyProjectTOML:
+        # Deferred until needed, as importing poetry-core is slow.
+        from poetry.core.pyproject.toml import PyProjectTOML
+
         return PyProjectTOML(path=self.pyproject_path)
 
-    def dependencies(self, include_dev: bool = True) -> Set[str]:
-        self.validate()
-        pyproject = self.pyproject.file.read()
-        dependencies = pyproject["tool"]["poetry"]["dependencies"]
-
-        results = set()
-        sections = ["dependencies"]
-        if include_dev:
-            sections.append("dev-dependencies")
-        for section in sections:
-            for key, value in dependencies.items():
-                if isinstance(value, dict) and "path" in value:
-                    path = (self._project.resolved_path / Path(value["path"])).resolve()
-                    project = self._project.root.get_project_by_path(path)
-                    if project:
-                        results.add(project.name)
-        return results
+    def manifest_paths(self) -> List[Path]:
+        return [self.pyproject_path]
+
+    def lock_paths(self) -> List[Path]:
+        return [self._project.resolved_path / "poetry.lock"]
+
+    def path_dependencies(self) -> PathDependencies:
+        """Scan pyproject.toml for path dependencies, without validating it.
+
+        Dependencies in `dev-dependencies` or any dependency group other than `main` are
+        considered development dependencies.
+        """
+        poetry = get_table(load_toml(self.pyproject_path, self._project.name), "tool", "poetry")
+        if not poetry:
+            raise WorkspaceProjectImproperlyConfigured(
+                f"No [tool.poetry] section found in pyproject.toml for project {self._project.name!r}."
+            )
+        groups = get_table(poetry, "group")
+        default_tables = [get_table(poetry, "dependencies"), get_table(groups, "main", "dependencies")]
+        dev_tables = [get_table(poetry, "dev-dependencies")] + [
+            get_table(groups, name, "dependencies") for name in groups if name != "main"
+        ]
+        return PathDependencies(
+            default=find_path_dependencies(self._project.resolved_path, default_tables),
+            dev=find_path_dependencies(self._project.resolved_path, dev_tables),
+        )
 
     def validate(self):
+        from poetry.core.factory import Factory
+        from poetry.core.pyproject.exceptions import PyProjectException
+
         if not (self.pyproject_path.exists() and self.pyproject_path.is_file()):
             raise WorkspaceProjectImproperlyConfigured(f"No pyproject.toml found in project {self._project.name!r}.")
         error_message: Optional[str] = None
@@ -67,24 +83,37 @@ class PoetryAdapter(Adapter, name="poetry", command_prefix=("poetry", "run")):
             command = command + " --no-dev"
         return command
 
-    def run_args(self, command: str) -> Tuple[str, dict]:
+    def prefixed_run_args(self, command: str) -> Tuple[str, dict]:
         """Get modified command and kwargs that should be used when running inside the project.
 
         Deactivate any active virtual environments when running commands in the project environment, otherwise poetry
         will use that instead of managing its own.
         """
-        command, kwargs = super().run_args(command)
-
-        env = os.environ.copy()
-        venv_path = env.get("VIRTUAL_ENV", None)
-        if not venv_path:
-            return command, kwargs
+        command, kwargs = super().prefixed_run_args(command)
 
-        del env["VIRTUAL_ENV"]
-        env["PATH"] = ":".join([path for path in env.get("PATH", "").split(":") if path != f"{venv_path}/bin"])
-        kwargs["env"] = env
+        env = _deactivated_env()
+        if env is not None:
+            kwargs["env"] = env
         return command, kwargs
 
+    def resolve_environment(self) -> Optional[Path]:
+        """Ask poetry for the path of the project's virtual environment, ignoring any active one."""
+        try:
+            result = subprocess.run(
+                ["poetry", "env", "info", "--path"],
+                cwd=self._project.resolved_path,
+                env=_deactivated_env(),
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                text=True,
+            )
+        except OSError:
+            return None
+        path = result.stdout.strip()
+        if result.returncode != 0 or not path:
+            return None
+        return Path(path)
+
     @classmethod
     def new(cls, path: Path):
         try:
@@ -106,3 +135,15 @@ class PoetryAdapter(Adapter, name="poetry", command_prefix=("poetry", "run")):
   {str(exc)}
 """
             )
+
+
+def _deactivated_env() -> Optional[Dict[str, str]]:
+    """Get a copy of the environment with any active virtual environment deactivated, if there is one."""
+    env = os.environ.copy()
+    venv_path = env.get("VIRTUAL_ENV", None)
+    if not venv_path:
+        return None
+
+    del env["VIRTUAL_ENV"]
+    env["PATH"] = ":".join([path for path in env.get("PATH", "").split(":") if path != f"{venv_path}/bin"])
+    return env
@@ -0,0 +1,75 @@
+"""Lightweight scanning of project manifests for local path dependencies.
+
+Scanning parses only the TOML syntax of a manifest, without validating it against the
+schema of the tool that owns it, using the fastest TOML parser available.
+"""
+from __future__ import annotations
+
+import importlib
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Iterable, Mapping, Optional, Set
+
+from workspace.core.exceptions import WorkspaceBaseError, WorkspaceProjectImproperlyConfigured
+
+# TOML parsers, in order of preference, mapped to their function for parsing a string.
+# tomli is a dependency on Python < 3.11, where tomllib is unavailable. The others are
+# fallbacks for environments installed without it.
+_PARSERS = (
+    ("tomllib", "loads"),
+    ("tomli", "loads"),
+    ("toml", "loads"),
+    ("tomlkit", "parse"),
+)
+
+
+def load_toml(path: Path, project_name: str) -> Mapping[str, Any]:
+    """Parse a TOML manifest belonging to the named project."""
+    try:
+        content = path.read_text(encoding="utf-8")
+    except FileNotFoundError:
+        raise WorkspaceProjectImproperlyConfigured(f"No {path.name} found in project {project_name!r}.")
+    try:
+        return _get_parser()(content)
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise WorkspaceProjectImproperlyConfigured(f"Error parsing {path.name} for project {project_name!r}: {exc}")
+
+
+def get_table(data: Mapping[str, Any], *keys: str) -> Mapping[str, Any]:
+    """Get a nested table, returning an empty table if any key is missing."""
+    for key in keys:
+        value = data.get(key)
+        if not isinstance(value, Mapping):
+            return {}
+        data = value
+    return data
+
+
+def find_path_dependencies(base: Path, tables: Iterable[Mapping[str, Any]]) -> Set[Path]:
+    """Get the resolved paths of path dependencies declared in the given dependency tables.
+
+    A dependency may be declared as a table with a `path` key, or as a list of such tables.
+    """
+    paths = set()
+    for table in tables:
+        for value in table.values():
+            for constraint in value if isinstance(value, list) else [value]:
+                if isinstance(constraint, Mapping) and "path" in constraint:
+                    paths.add((base / Path(constraint["path"])).resolve())
+    return paths
+
+
+@lru_cache(maxsize=None)
+def _get_parser() -> Callable[[str], Mapping[str, Any]]:
+    for module_name, function_name in _PARSERS:
+        module = _import_optional(module_name)
+        if module is not None:
+            return getattr(module, function_name)
+    raise WorkspaceBaseError("No TOML parser is available - run 'pip install tomli'.")  # pragma: no cover
+
+
+def _import_optional(module_name: str) -> Optional[Any]:
+    try:
+        return importlib.import_module(module_name)
+    except ImportError:
+        return None
@@ -0,0 +1,149 @@
+"""Stores for the recorded results and outputs of commands, which may be shared between machines.
+
+The store is chosen by `WORKSPACE_ARTIFACT_STORE`, which is either a directory or the URL
+of an HTTP server. By default, a directory in the cache is used.
+
+An HTTP store holds each artifact at `<url>/<name>`. It responds to `GET` with the content
+of an artifact, or 404 if there is none, to `HEAD` likewise without the content, and to
+`PUT` by storing the request body. Artifact names are lowercase hex digests, optionally
+prefixed by a namespace and a slash.
+
+Further stores are registered by subclassing `ArtifactStore` in a workspace plugin. The
+schemes of such stores are recorded in the plugin manifest, so that the plugin is imported
+when a store for one of them is needed.
+
+As with the rest of the cache, failures to read or write artifacts are never fatal.
+"""
+from __future__ import annotations
+
+import importlib
+import urllib.request
+from pathlib import Path
+from typing import ClassVar, Dict, Optional, Tuple, Type
+
+from workspace.core import cache
+from workspace.core.exceptions import WorkspaceBaseError, WorkspacePluginError
+from workspace.core.settings import get_settings
+
+_STORES: Dict[str, Type[ArtifactStore]] = {}
+# Modules providing stores which have not been imported yet, by the schemes they handle.
+_LAZY_STORES: Dict[str, str] = {}
+
+
+class ArtifactStore:
+    """Base class for artifact stores.
+
+    Subclasses are registered for the URL schemes they handle, for example
+    `class S3Store(ArtifactStore, schemes=("s3",))`.
+    """
+
+    schemes: ClassVar[Tuple[str, ...]]
+
+    def __init_subclass__(cls, *, schemes: Tuple[str, ...] = ()):
+        cls.schemes = schemes
+        for scheme in schemes:
+            _STORES[scheme] = cls
+
+    def __init__(self, location: str):
+        self.location = location
+
+    def get(self, name: str) -> Optional[bytes]:
+        """Get the content of an artifact, or None if it is missing or cannot be read."""
+        raise NotImplementedError  # pragma: no cover
+
+    def has(self, name: str) -> bool:
+        """Whether an artifact is present."""
+        raise NotImplementedError  # pragma: no cover
+
+    def put(self, name: str, data: bytes) -> None:
+        """Store an artifact, ignoring any failure to do so."""
+        raise NotImplementedError  # pragma: no cover
+
+
+class LocalStore(ArtifactStore, schemes=("file",)):
+    """Stores artifacts as files in a directory."""
+
+    def __init__(self, location: str):
+        super().__init__(location)
+        self.path = Path(location[len("file://") :] if location.startswith("file://") else location)
+
+    def get(self, name: str) -> Optional[bytes]:
+        try:
+            return (self.path / name).read_bytes()
+        except OSError:
+            return None
+
+    def has(self, name: str) -> bool:
+        return (self.path / name).is_file()
+
+    def put(self, name: str, data: bytes) -> None:
+        try:
+            cache.atomic_write(self.path / name, data)
+        except OSError:
+            pass
+
+
+class HttpStore(ArtifactStore, schemes=("http", "https")):
+    """Stores artifacts on an HTTP server."""
+
+    timeout: ClassVar[float] = 30
+
+    def get(self, name: str) -> Optional[bytes]:
+        try:
+            with urllib.request.urlopen(self._url(name), timeout=self.timeout) as response:
+                return response.read()
+        except OSError:  # Including HTTP errors, such as 404.
+            return None
+
+    def has(self, name: str) -> bool:
+        request = urllib.request.Request(self._url(name), method="HEAD")
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout):
+                return True
+        except OSError:  # Including HTTP errors, such as 404.
+            return False
+
+    def put(self, name: str, data: bytes) -> None:
+        request = urllib.request.Request(
+            self._url(name),
+            data=data,
+            method="PUT",
+            headers={"Content-Type": "application/octet-stream"},
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout):
+                pass
+        except OSError:
+            pass
+
+    def _url(self, name: str) -> str:
+        return f"{self.location.rstrip('/')}/{name}"
+
+
+def register_lazy_store(scheme: str, module_path: str) -> None:
+    """Register the module providing the store for a scheme, without importing it.
+
+    The module is imported the first time a store for that scheme is requested.
+    """
+    _LAZY_STORES.setdefault(scheme, module_path)
+
+
+def get_store(location: str = None) -> ArtifactStore:
+    """Get the store at a location, defaulting to `WORKSPACE_ARTIFACT_STORE`.
+
+    Locations without a scheme are treated as local directories.
+    """
+    location = location or get_settings().artifact_store or str(cache.cache_root() / "artifacts")
+    scheme, separator, _ = location.partition("://")
+    if not separator:
+        return LocalStore(location)
+    if scheme not in _STORES and scheme in _LAZY_STORES:
+        try:
+            importlib.import_module(_LAZY_STORES[scheme])
+        except ModuleNotFoundError:
+            raise WorkspacePluginError(f"Could not find configured plugin {_LAZY_STORES[scheme]!r}.")
+    try:
+        store_class = _STORES[scheme]
+    except KeyError:
+        raise WorkspaceBaseError(f"No artifact store is available for {scheme!r} URLs.")
+    return store_class(location)
@@ -0,0 +1,80 @@
+"""Storage for data derived from a workspace, kept outside of the workspace itself.
+
+Everything stored here can be rebuilt from the workspace, so failures to read or write
+the cache are never fatal.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import pickle
+import stat
+import tempfile
+from pathlib import Path
+from typing import Any, Optional
+
+from workspace.core.settings import get_settings
+
+
+def cache_root() -> Path:
+    """The directory containing all cached data."""
+    settings = get_settings()
+    if settings.cache_dir:
+        return Path(settings.cache_dir)
+    return Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "workspace-cli"
+
+
+def workspace_cache_dir(workspace_path: Path) -> Path:
+    """The directory containing cached data for the workspace rooted at the given path."""
+    key = hashlib.sha256(str(workspace_path).encode("utf-8")).hexdigest()[:16]
+    return cache_root() / key
+
+
+def digest(data: bytes) -> str:
+    """Content hash used to detect changes to cached files."""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def read(path: Path) -> Optional[Any]:
+    """Read a cached value, returning None if it is missing or unreadable."""
+    try:
+        with open(path, "rb") as file:
+            return pickle.load(file)
+    except Exception:
+        return None
+
+
+def write(path: Path, value: Any) -> None:
+    """Write a cached value, ignoring any failure to do so."""
+    try:
+        atomic_write(path, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except OSError:
+        pass
+
+
+def atomic_write(path: Path, data: bytes) -> None:
+    """Write to a temporary file and rename it over path, so readers never see partial writes.
+
+    The permissions of an existing file are preserved.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        mode = stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        mode = 0o666 & ~_get_umask()
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(data)
+        os.chmod(temp_path, mode)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+
+
+def _get_umask() -> int:
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
@@ -0,0 +1,158 @@
+"""Virtual environments of projects, resolved once and cached until their lockfiles change.
+
+Knowing the environment of a project allows commands to run directly within it, rather than
+through the tool which manages it, such as `poetry run`, which is slow to start.
+"""
+from __future__ import annotations
+
+import os
+import re
+import shlex
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+from workspace.core import cache
+
+if TYPE_CHECKING:
+    from workspace.core.models import Project  # pragma: no cover
+
+_CACHE_FILENAME = "environments.pickle"
+_CACHE_VERSION = 1
+# Resolving environments mostly waits on subprocesses, so is done on threads.
+_RESOLVE_WORKERS = 8
+
+# Commands consisting only of these characters can be split into arguments without a shell.
+# The first word must not contain `=`, which would make it a variable assignment.
+_SHELL_FREE_COMMAND = re.compile(r"[\w@%+:,./-]+(?:[ \t]+[\w@%+=:,./-]+)*")
+
+
+class Environments:
+    """The virtual environments of the projects in a workspace.
+
+    Each environment is resolved through the project's adapter, then cached, keyed on the
+    project path and the content of its lockfiles. It is resolved again once the key changes,
+    or the environment no longer exists. Projects whose environment cannot be found are not
+    resolved again until the next process.
+    """
+
+    def __init__(self, path: Path):
+        self._path = path
+        cached = cache.read(path)
+        self._environments: Dict[str, Tuple[str, Path]] = {}
+        if isinstance(cached, dict) and cached.get("version") == _CACHE_VERSION:
+            self._environments = cached["environments"]
+        self._unresolved: Set[Tuple[str, str]] = set()
+        self._changed = False
+
+    def get(self, project: Project) -> Optional[Path]:
+        """Get the environment of a project, resolving it if the cached one is stale."""
+        key = _environment_key(project)
+        entry = self._environments.get(project.name)
+        if entry is not None and entry[0] == key and is_environment(entry[1]):
+            return entry[1]
+        if (project.name, key) in self._unresolved:
+            return None
+        environment = project.adapter.resolve_environment()
+        if environment is None or not is_environment(environment):
+            self._unresolved.add((project.name, key))
+            return None
+        self._environments[project.name] = (key, environment)
+        self._changed = True
+        return environment
+
+    def resolve(self, projects: Iterable[Project]) -> None:
+        """Resolve the environments of many projects at once, saving them together."""
+        projects = list(projects)
+        if projects:
+            with ThreadPoolExecutor(max_workers=min(len(projects), _RESOLVE_WORKERS)) as executor:
+                list(executor.map(self.get, projects))
+        self.save()
+
+    def save(self) -> None:
+        """Save resolved environments, if any have changed."""
+        if self._changed:
+            cache.write(self._path, {"version": _CACHE_VERSION, "environments": self._environments})
+            self._changed = False
+
+
+def get_environments(project: Project) -> Environments:
+    """Get the environments of the workspace containing a project, loaded once per process."""
+    return _load_environments(cache.workspace_cache_dir(project.root.path) / _CACHE_FILENAME)
+
+
+def get_environment(project: Project) -> Optional[Path]:
+    """Get the virtual environment of a project, if it can be found."""
+    environments = get_environments(project)
+    environment = environments.get(project)
+    environments.save()
+    return environment
+
+
+def resolve_environments(projects: Iterable[Project]) -> None:
+    """Resolve the environments of projects ahead of running commands in them.
+
+    Resolving an environment runs a subprocess, such as `poetry env info`, so this avoids
+    doing so while other commands are running.
+    """
+    by_workspace: Dict[Path, List[Project]] = {}
+    for project in projects:
+        by_workspace.setdefault(project.root.path, []).append(project)
+    for workspace_projects in by_workspace.values():
+        get_environments(workspace_projects[0]).resolve(workspace_projects)
+
+
+@lru_cache(maxsize=None)
+def _load_environments(path: Path) -> Environments:
+    return Environments(path)
+
+
+def is_environment(path: Path) -> bool:
+    return (path / "bin" / "python").exists()
+
+
+def python_version(environment: Path) -> Optional[str]:
+    """Get the version of Python in an environment, as recorded in its `pyvenv.cfg`."""
+    try:
+        lines = (environment / "pyvenv.cfg").read_text().splitlines()
+    except OSError:
+        return None
+    config = {}
+    for line in lines:
+        key, _, value = line.partition("=")
+        config[key.strip()] = value.strip()
+    # `virtualenv` records the full version as `version_info`, and `venv` as `version`.
+    return config.get("version_info") or config.get("version") or None
+
+
+def environment_run_args(command: str, environment: Path, cwd: Path) -> Tuple[Union[str, List[str]], dict]:
+    """Get the command and kwargs for subprocess.Popen to run a command directly in an environment.
+
+    The environment is activated by setting `VIRTUAL_ENV` and `PATH`, replacing any which is
+    already active. Commands are only run through a shell if they need one.
+    """
+    env = os.environ.copy()
+    active = env.pop("VIRTUAL_ENV", None)
+    env.pop("PYTHONHOME", None)
+    paths = [path for path in env.get("PATH", "").split(os.pathsep) if not active or path != f"{active}/bin"]
+    env["PATH"] = os.pathsep.join([str(environment / "bin"), *paths])
+    env["VIRTUAL_ENV"] = str(environment)
+    if _SHELL_FREE_COMMAND.fullmatch(command.strip()):
+        args = shlex.split(command)
+        # Shell builtins, such as `cd`, are not executables, so still need a shell.
+        executable = shutil.which(args[0], path=env["PATH"])
+        if executable:
+            return [executable, *args[1:]], dict(cwd=cwd, env=env)
+    return command, dict(cwd=cwd, shell=True, env=env)
+
+
+def _environment_key(project: Project) -> str:
+    parts = [str(project.resolved_path)]
+    for lock_path in project.adapter.lock_paths():
+        try:
+            parts.append(cache.digest(lock_path.read_bytes()))
+        except OSError:
+            parts.append("")
+    return cache.digest("\0".join(parts).encode())
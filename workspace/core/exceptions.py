@@ -17,6 +17,14 @@ class WorkspaceValidationError(WorkspaceError):
     """The workspace file could not be parsed."""
 
 
+class WorkspaceConflictError(WorkspaceError):
+    """The workspace file was modified by another process since it was loaded."""
+
+
+class WorkspaceSettingsError(WorkspaceBaseError):
+    """A setting given by an environment variable is invalid."""
+
+
 class WorkspacePluginError(WorkspaceBaseError):
     """An error relating to an installed plugin."""
 
@@ -31,3 +39,7 @@ class WorkspaceProjectImproperlyConfigured(WorkspaceProjectError):
 
 class WorkspaceTemplateError(WorkspaceBaseError):
     """An error relating to templates."""
+
+
+class WorkspaceCycleError(WorkspaceError):
+    """The dependencies between projects contain a cycle."""
@@ -0,0 +1,477 @@
+"""The dependency graph between projects in a workspace."""
+from __future__ import annotations
+
+import heapq
+import importlib
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
+
+from workspace.core import cache
+from workspace.core.adapter import PathDependencies
+from workspace.core.exceptions import WorkspaceBaseError, WorkspaceCycleError, WorkspaceProjectError
+from workspace.core.settings import get_settings
+
+if TYPE_CHECKING:
+    from workspace.core.models import Project, Workspace  # pragma: no cover
+
+_CACHE_FILENAME = "graph.pickle"
+_CACHE_VERSION = 2
+
+# Below this many manifests to parse, starting worker processes costs more than it saves.
+_PARALLEL_THRESHOLD = 8
+
+
+class DependencyGraph:
+    """Direct dependencies between the projects in a workspace.
+
+    The path dependencies of each project are cached on disk, keyed on the path, size,
+    modification time and content of the project's manifests. Only projects whose manifests
+    have changed since they were cached are parsed again.
+    """
+
+    def __init__(self, workspace: Workspace):
+        self.workspace = workspace
+        self._cache_path = cache.workspace_cache_dir(workspace.path) / _CACHE_FILENAME
+        cached = cache.read(self._cache_path)
+        self._entries: Dict[str, _Entry] = {}
+        if isinstance(cached, dict) and cached.get("version") == _CACHE_VERSION:
+            self._entries = cached["entries"]
+        self._edges: Dict[str, Tuple[Set[str], Set[str]]] = {}
+        self._changed = False
+
+    def load(self, names: Iterable[str] = None) -> None:
+        """Parse the manifests of the named projects which have changed since they were cached.
+
+        When there are enough of them, manifests are parsed concurrently on a pool of worker
+        processes, the size of which is set by `WORKSPACE_PARSE_WORKERS`. The first error
+        encountered, in order of project name, is raised.
+        """
+        stale: Dict[str, Tuple[_Fingerprint, ...]] = {}
+        for name in sorted(self.workspace.projects if names is None else set(names)):
+            project = self.workspace.projects[name]
+            manifests = project.adapter.manifest_paths()
+            if manifests and self._get_cached_path_dependencies(project, manifests) is None:
+                stale[name] = _fingerprint_all(manifests)
+        workers = get_settings().parse_workers or os.cpu_count() or 1
+        if workers < 2 or len(stale) < _PARALLEL_THRESHOLD:
+            return
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(stale)),
+            initializer=_init_worker,
+            initargs=(self.workspace, _adapter_modules(self.workspace, stale)),
+        ) as executor:
+            results = list(executor.map(_parse_path_dependencies, stale, chunksize=_chunksize(len(stale), workers)))
+        for (name, fingerprints), result in zip(stale.items(), results):
+            if isinstance(result, WorkspaceBaseError):
+                raise result
+            self._store(self.workspace.projects[name], fingerprints, result)
+
+    def dependencies(self, name: str, include_dev: bool = False) -> Set[str]:
+        """Get the names of projects which the named project directly depends on."""
+        default, dev = self._get_edges(name)
+        return default | dev if include_dev else set(default)
+
+    def graph(self, roots: Iterable[str] = None, include_dev: bool = False) -> Graph:
+        """Build the graph of direct dependencies between projects in the workspace.
+
+        If roots are given, the graph only contains the projects reachable from them. These are
+        found breadth-first, so only the manifests of reachable projects are parsed.
+        """
+        if roots is None:
+            self.load()
+            reachable = set(self.workspace.projects)
+        else:
+            reachable = set(roots)
+            frontier = sorted(reachable)
+            while frontier:
+                self.load(frontier)
+                found = set()
+                for name in frontier:
+                    found |= self.dependencies(name, include_dev=include_dev)
+                frontier = sorted(found - reachable)
+                reachable.update(frontier)
+        nodes = [name for name in self.workspace.projects if name in reachable]
+        return Graph(nodes, {name: self.dependencies(name, include_dev=include_dev) for name in nodes})
+
+    def save(self) -> None:
+        """Persist the cached dependencies, discarding projects no longer in the workspace."""
+        removed = set(self._entries) - set(self.workspace.projects)
+        if not (self._changed or removed):
+            return
+        for name in removed:
+            del self._entries[name]
+        cache.write(self._cache_path, {"version": _CACHE_VERSION, "entries": self._entries})
+        self._changed = False
+
+    def _get_edges(self, name: str) -> Tuple[Set[str], Set[str]]:
+        """Get the names of the default and development-only dependencies of a project."""
+        if name not in self._edges:
+            project = self.workspace.projects[name]
+            adapter = project.adapter
+            manifests = adapter.manifest_paths()
+            if not manifests:
+                default = adapter.dependencies(include_dev=False)
+                self._edges[name] = (default, adapter.dependencies(include_dev=True) - default)
+            else:
+                path_dependencies = self._get_path_dependencies(project, manifests)
+                default = self._get_names(project, path_dependencies.default)
+                self._edges[name] = (default, self._get_names(project, path_dependencies.dev) - default)
+        return self._edges[name]
+
+    def _get_path_dependencies(self, project: Project, manifests: List[Path]) -> PathDependencies:
+        cached = self._get_cached_path_dependencies(project, manifests)
+        if cached is not None:
+            return cached
+        # Fingerprint before parsing, so that changes made while parsing are detected next time.
+        fingerprints = _fingerprint_all(manifests)
+        path_dependencies = project.adapter.path_dependencies()
+        self._store(project, fingerprints, path_dependencies)
+        return path_dependencies
+
+    def _store(
+        self, project: Project, fingerprints: Tuple[_Fingerprint, ...], path_dependencies: PathDependencies
+    ) -> None:
+        self._entries[project.name] = _Entry(
+            path=project.path,
+            type=project.type,
+            manifests=fingerprints,
+            dependencies=path_dependencies,
+        )
+        self._changed = True
+
+    def _get_cached_path_dependencies(self, project: Project, manifests: List[Path]) -> Optional[PathDependencies]:
+        entry = self._entries.get(project.name)
+        if (
+            entry is None
+            or (entry.path, entry.type) != (project.path, project.type)
+            or [fingerprint.path for fingerprint in entry.manifests] != [str(path) for path in manifests]
+        ):
+            return None
+        fingerprints = []
+        for fingerprint in entry.manifests:
+            try:
+                stat = os.stat(fingerprint.path)
+            except OSError:
+                return None
+            if (stat.st_size, stat.st_mtime_ns) == (fingerprint.size, fingerprint.mtime_ns):
+                fingerprints.append(fingerprint)
+                continue
+            # The file has been touched, but its content may not have changed.
+            current = _fingerprint(fingerprint.path)
+            if current is None or current.digest != fingerprint.digest:
+                return None
+            fingerprints.append(current)
+        if tuple(fingerprints) != entry.manifests:
+            self._entries[project.name] = entry._replace(manifests=tuple(fingerprints))
+            self._changed = True
+        return entry.dependencies
+
+    def _get_names(self, project: Project, paths: Set[Path]) -> Set[str]:
+        names = set()
+        for path in paths:
+            dependency = self.workspace.get_project_by_resolved_path(path)
+            if dependency and dependency.name != project.name:
+                names.add(dependency.name)
+        return names
+
+
+class Closure(NamedTuple):
+    """Nodes transitively reachable from a set of root nodes."""
+
+    nodes: Set[str]
+    """Every node reachable from at least one of the roots."""
+    sizes: Dict[str, int]
+    """The number of nodes reachable from each of the roots, and from each node in `nodes`."""
+
+
+class Graph:
+    """A directed graph, stored as compressed sparse rows over integer node indices.
+
+    The successors of the node at index `i` are `targets[offsets[i]:offsets[i + 1]]`. Sets of
+    nodes are represented as bitsets, using arbitrary precision integers. All traversals are
+    iterative, so are not limited by the depth of the graph, and terminate on cycles.
+    """
+
+    def __init__(self, nodes: Iterable[str], edges: Mapping[str, Iterable[str]]):
+        self.nodes: List[str] = list(nodes)
+        self.index: Dict[str, int] = {node: index for index, node in enumerate(self.nodes)}
+        self.offsets = array("l", [0])
+        self.targets = array("l")
+        for node in self.nodes:
+            self.targets.extend(sorted({self.index[target] for target in edges.get(node, ())}))
+            self.offsets.append(len(self.targets))
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def successors(self, node: str) -> List[str]:
+        index = self.index[node]
+        return [self.nodes[target] for target in self.targets[self.offsets[index] : self.offsets[index + 1]]]
+
+    def reversed(self) -> Graph:
+        """Get the graph with the direction of every edge reversed."""
+        graph = Graph.__new__(Graph)
+        graph.nodes = self.nodes
+        graph.index = self.index
+        counts = [0] * (len(self.nodes) + 1)
+        for target in self.targets:
+            counts[target + 1] += 1
+        for index in range(len(self.nodes)):
+            counts[index + 1] += counts[index]
+        graph.offsets = array("l", counts)
+        positions = counts[:-1]
+        targets = [0] * len(self.targets)
+        for source in range(len(self.nodes)):
+            for target in self.targets[self.offsets[source] : self.offsets[source + 1]]:
+                targets[positions[target]] = source
+                positions[target] += 1
+        graph.targets = array("l", targets)
+        return graph
+
+    def closure(self, roots: Iterable[str]) -> Closure:
+        """Get the nodes transitively reachable from the given roots.
+
+        A node is only reachable from itself if it is part of a cycle.
+        """
+        root_indices = sorted({self.index[root] for root in roots})
+        components = self._components(root_indices)
+        component_of = {node: number for number, component in enumerate(components) for node in component}
+        # Count the edges into each node from other components, so that the bitset of a node
+        # can be discarded once every node which depends on it has been processed.
+        pending = dict.fromkeys(component_of, 0)
+        for node, number in component_of.items():
+            for target in self._successors(node):
+                if component_of[target] != number:
+                    pending[target] += 1
+
+        keep = set(root_indices)
+        # The bitset of each processed node, including the node itself.
+        reach: Dict[int, int] = {}
+        sizes: Dict[int, int] = {}
+        bits = 0
+        for number, component in enumerate(components):
+            component_bits = 0
+            for node in component:
+                for target in self._successors(node):
+                    component_bits |= reach[target] if target in reach else 1 << target
+                    if component_of[target] != number:
+                        pending[target] -= 1
+                        if not pending[target] and target not in keep:
+                            del reach[target]
+            size = _bit_count(component_bits)
+            for node in component:
+                reach[node] = component_bits | 1 << node
+                sizes[node] = size
+                if node in keep:
+                    bits |= component_bits
+        indices = self._indices(bits)
+        return Closure(
+            nodes={self.nodes[index] for index in indices},
+            sizes={self.nodes[index]: sizes[index] for index in sorted(keep.union(indices))},
+        )
+
+    def reverse_closure(self, roots: Iterable[str]) -> Closure:
+        """Get the nodes from which any of the given roots are transitively reachable."""
+        return self.reversed().closure(roots)
+
+    def contract(self, nodes: Iterable[str]) -> Dict[str, Set[str]]:
+        """Get the successors of each of the given nodes, skipping over other nodes.
+
+        The result maps each given node to those given nodes which are reachable from it
+        via paths passing through no other given nodes.
+        """
+        indices = {self.index[node] for node in nodes}
+        result = {}
+        for index in sorted(indices):
+            found = set()
+            seen = {index}
+            stack = list(self._successors(index))
+            while stack:
+                target = stack.pop()
+                if target in seen:
+                    continue
+                seen.add(target)
+                if target in indices:
+                    found.add(self.nodes[target])
+                else:
+                    stack.extend(self._successors(target))
+            result[self.nodes[index]] = found
+        return result
+
+    def cycles(self) -> List[List[str]]:
+        """Get each set of nodes which form a cycle, in order of their first node."""
+        cycles = []
+        for component in self._components(range(len(self.nodes))):
+            if len(component) > 1 or component[0] in self._successors(component[0]):
+                cycles.append(sorted(component))
+        return [[self.nodes[index] for index in cycle] for cycle in sorted(cycles)]
+
+    def toposort(self) -> List[str]:
+        """Order the nodes such that every node comes after all of its successors.
+
+        Ties are broken by the original order of the nodes. Raises WorkspaceCycleError if the
+        graph contains a cycle.
+        """
+        remaining = [self.offsets[index + 1] - self.offsets[index] for index in range(len(self.nodes))]
+        predecessors = self.reversed()
+        ready = [index for index, count in enumerate(remaining) if not count]
+        heapq.heapify(ready)
+        order = []
+        while ready:
+            index = heapq.heappop(ready)
+            order.append(self.nodes[index])
+            for source in predecessors._successors(index):
+                remaining[source] -= 1
+                if not remaining[source]:
+                    heapq.heappush(ready, source)
+        if len(order) < len(self.nodes):
+            cycles = "; ".join(" -> ".join(cycle + cycle[:1]) for cycle in self.cycles())
+            raise WorkspaceCycleError(f"Dependencies between projects contain cycles: {cycles}")
+        return order
+
+    def _successors(self, index: int) -> Sequence[int]:
+        return self.targets[self.offsets[index] : self.offsets[index + 1]]
+
+    def _components(self, roots: Iterable[int]) -> List[List[int]]:
+        """Find the strongly connected components reachable from the given nodes.
+
+        Uses an iterative form of Tarjan's algorithm. Components are returned in reverse
+        topological order, so every component comes after those reachable from it.
+        """
+        offsets, targets = self.offsets, self.targets
+        order = [-1] * len(self.nodes)
+        low = [0] * len(self.nodes)
+        on_stack = bytearray(len(self.nodes))
+        stack: List[int] = []
+        components: List[List[int]] = []
+        counter = 0
+        for root in roots:
+            if order[root] != -1:
+                continue
+            order[root] = low[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack[root] = 1
+            work = [(root, offsets[root])]
+            while work:
+                node, position = work[-1]
+                end = offsets[node + 1]
+                while position < end:
+                    target = targets[position]
+                    position += 1
+                    if order[target] == -1:
+                        work[-1] = (node, position)
+                        order[target] = low[target] = counter
+                        counter += 1
+                        stack.append(target)
+                        on_stack[target] = 1
+                        work.append((target, offsets[target]))
+                        break
+                    if on_stack[target] and order[target] < low[node]:
+                        low[node] = order[target]
+                else:
+                    work.pop()
+                    if work and low[node] < low[work[-1][0]]:
+                        low[work[-1][0]] = low[node]
+                    if low[node] == order[node]:
+                        component = []
+                        while True:
+                            member = stack.pop()
+                            on_stack[member] = 0
+                            component.append(member)
+                            if member == node:
+                                break
+                        components.append(component)
+        return components
+
+    @staticmethod
+    def _indices(bits: int) -> List[int]:
+        return [index for index, bit in enumerate(reversed(bin(bits)[2:])) if bit == "1"]
+
+
+# int.bit_count is only available from Python 3.10, and is much faster on large bitsets.
+_bit_count: Callable[[int], int] = getattr(int, "bit_count", lambda bits: bin(bits).count("1"))
+
+
+class _Fingerprint(NamedTuple):
+    path: str
+    size: int
+    mtime_ns: int
+    digest: str
+
+
+class _Entry(NamedTuple):
+    """Cached path dependencies of a project, along with the manifests they were parsed from."""
+
+    path: str
+    type: str
+    manifests: Tuple[_Fingerprint, ...]
+    dependencies: PathDependencies
+
+
+def _fingerprint(path: str) -> Optional[_Fingerprint]:
+    try:
+        stat = os.stat(path)
+        with open(path, "rb") as file:
+            content = file.read()
+    except OSError:
+        return None
+    return _Fingerprint(path=path, size=stat.st_size, mtime_ns=stat.st_mtime_ns, digest=cache.digest(content))
+
+
+def _fingerprint_all(manifests: List[Path]) -> Tuple[_Fingerprint, ...]:
+    """Fingerprint manifests, treating missing manifests as empty so that their creation is detected."""
+    return tuple(
+        _fingerprint(str(path)) or _Fingerprint(path=str(path), size=-1, mtime_ns=-1, digest="") for path in manifests
+    )
+
+
+def _adapter_modules(workspace: Workspace, names: Iterable[str]) -> List[str]:
+    return sorted({type(workspace.projects[name].adapter).__module__ for name in names})
+
+
+def _chunksize(count: int, workers: int) -> int:
+    return max(1, count // (workers * 4))
+
+
+# State of each worker process, set by _init_worker.
+_worker_workspace: Optional[Workspace] = None
+
+
+def _init_worker(workspace: Workspace, adapter_modules: List[str]) -> None:
+    """Prepare a worker process, ensuring the adapters of the workspace are registered."""
+    global _worker_workspace
+    for module_path in adapter_modules:
+        importlib.import_module(module_path)
+    _worker_workspace = workspace
+
+
+def _parse_path_dependencies(name: str) -> Union[PathDependencies, WorkspaceBaseError]:
+    """Parse the manifests of a project in a worker process.
+
+    Errors are returned rather than raised, and converted to workspace errors naming the
+    project, since arbitrary exceptions raised by parsers may not survive pickling.
+    """
+    assert _worker_workspace is not None
+    try:
+        return _worker_workspace.projects[name].adapter.path_dependencies()
+    except WorkspaceBaseError as exc:
+        return exc
+    except Exception as exc:
+        return WorkspaceProjectError(f"Failed to parse dependencies of project {name!r}: {exc}")
@@ -0,0 +1,93 @@
+"""Durations and outcomes of commands previously run in projects.
+
+Durations are used to plan parallel runs, and outcomes to resume runs which did not succeed.
+"""
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+from workspace.core import cache
+
+_HISTORY_FILENAME = "durations.pickle"
+_OUTCOMES_FILENAME = "outcomes.pickle"
+_HISTORY_VERSION = 1
+# Weight of the latest duration in the expected duration of a command.
+_SMOOTHING = 0.5
+
+
+class DurationHistory:
+    """Expected durations of commands in the projects of a workspace, learned from earlier runs.
+
+    The expected duration of a command is a moving average of its durations, weighted towards
+    the most recent, so that it follows lasting changes without overreacting to one slow run.
+    """
+
+    def __init__(self, workspace_path: Path):
+        self._path = cache.workspace_cache_dir(workspace_path) / _HISTORY_FILENAME
+        self._durations = self._read()
+        self._recorded: Dict[Tuple[str, str], float] = {}
+
+    def get(self, name: str, command: str) -> Optional[float]:
+        """The expected duration of a command in a project, in seconds, if it has run before."""
+        return self._durations.get((name, command))
+
+    def record(self, name: str, command: str, seconds: float) -> None:
+        """Record the duration of a command which ran to completion."""
+        previous = self._durations.get((name, command))
+        expected = seconds if previous is None else _SMOOTHING * seconds + (1 - _SMOOTHING) * previous
+        self._durations[(name, command)] = self._recorded[(name, command)] = expected
+
+    def save(self) -> None:
+        """Save recorded durations, keeping those saved by other runs in the meantime."""
+        if not self._recorded:
+            return
+        durations = {**self._read(), **self._recorded}
+        cache.write(self._path, {"version": _HISTORY_VERSION, "durations": durations})
+        self._recorded = {}
+
+    def _read(self) -> Dict[Tuple[str, str], float]:
+        cached = cache.read(self._path)
+        if isinstance(cached, dict) and cached.get("version") == _HISTORY_VERSION:
+            return cached["durations"]
+        return {}
+
+
+class RunOutcomes:
+    """The status of each project in the latest run of each command in a workspace.
+
+    Statuses are those given in the summary of a `Trace`, such as `succeeded` or `failed`.
+    Projects which were selected but never started are `pending`.
+    """
+
+    def __init__(self, workspace_path: Path):
+        self._path = cache.workspace_cache_dir(workspace_path) / _OUTCOMES_FILENAME
+        self._outcomes = self._read()
+        self._recorded: Dict[str, Dict[str, str]] = {}
+
+    def get(self, command: str) -> Dict[str, str]:
+        """The status of each project selected in the latest run of a command."""
+        return dict(self._outcomes.get(command, {}))
+
+    def start(self, command: str, names: Iterable[str]) -> None:
+        """Replace the outcome of a command with a new run of the given projects."""
+        self._outcomes[command] = self._recorded[command] = {name: "pending" for name in names}
+
+    def record(self, command: str, name: str, status: str) -> None:
+        """Record the status of a project in the latest run of a command."""
+        self._outcomes.setdefault(command, {})[name] = status
+        self._recorded[command] = self._outcomes[command]
+
+    def save(self) -> None:
+        """Save the outcomes of recorded commands, keeping those saved by other runs."""
+        if not self._recorded:
+            return
+        outcomes = {**self._read(), **self._recorded}
+        cache.write(self._path, {"version": _HISTORY_VERSION, "outcomes": outcomes})
+        self._recorded = {}
+
+    def _read(self) -> Dict[str, Dict[str, str]]:
+        cached = cache.read(self._path)
+        if isinstance(cached, dict) and cached.get("version") == _HISTORY_VERSION:
+            return cached["outcomes"]
+        return {}
@@ -1,15 +1,16 @@
 from __future__ import annotations
 
-import importlib
 import json
+import os
+from contextlib import contextmanager
 from dataclasses import dataclass, field
+from functools import cached_property
 from pathlib import Path
-from typing import Dict, List, Optional, Union
+from typing import Dict, Iterator, List, Optional, Union
 
-import jsonschema
-
-from workspace.core import exceptions
+from workspace.core import cache, exceptions
 from workspace.core.adapter import Adapter, get_adapter
+from workspace.core.plugins import load_plugins
 from workspace.core.settings import get_settings
 from workspace.core.templates import Templates
 
@@ -22,13 +23,27 @@ _PROJECT_CONFIG_SCHEMA = {
             "type": "object",
             "additionalProperties": {
                 "type": "object",
-                "properties": {"path": {"type": "string"}, "type": {"type": "string"}},
+                "properties": {
+                    "path": {"type": "string"},
+                    "type": {"type": "string"},
+                    "inputs": {
+                        "type": "object",
+                        "additionalProperties": False,
+                        "properties": {
+                            "include": {"type": "array", "items": {"type": "string"}},
+                            "exclude": {"type": "array", "items": {"type": "string"}},
+                        },
+                    },
+                    "outputs": {"type": "array", "items": {"type": "string"}},
+                },
             },
         },
         "plugins": {"type": "array", "items": {"type": "string"}},
         "template_path": {"type": "array", "items": {"type": "string"}},
     },
 }
+# Parsed workspace files are only re-used if they were validated against the same schema.
+_SCHEMA_DIGEST = cache.digest(json.dumps(_PROJECT_CONFIG_SCHEMA, sort_keys=True).encode())
 
 
 @dataclass
@@ -37,37 +52,42 @@ class Workspace:
     projects: Dict[str, Project]
     plugins: Optional[List[str]] = None
     template_path: Optional[List[str]] = None
+    # Project names by resolved path, built on first lookup.
+    _path_index: Optional[Dict[Path, str]] = field(default=None, init=False, repr=False, compare=False)
+    # Digest of the workspace file when it was loaded or last written, to detect concurrent changes.
+    _digest: Optional[str] = field(default=None, init=False, repr=False, compare=False)
+    _transaction_depth: int = field(default=0, init=False, repr=False, compare=False)
+    _pending_flush: bool = field(default=False, init=False, repr=False, compare=False)
 
     @classmethod
     def from_path(cls, path: Union[Path, str] = None) -> Workspace:
+        settings = get_settings()
+        if path is None and settings.root:
+            # Explicitly configured root - skip searching the directory tree.
+            path = Path(settings.root).resolve()
+            filepath = path / settings.filename if path.is_dir() else path
+            if not filepath.is_file():
+                raise exceptions.WorkspaceNotFoundError(f"No workspace file found at configured root '{filepath}'.")
+            return cls.load(filepath)
         path = path or Path.cwd()
         path = Path(path) if isinstance(path, str) else path
         path = path.resolve()
         if path.is_file():
             return cls.load(path)
         for directory in [path, *path.parents]:
-            filepath = directory / get_settings().filename
+            filepath = directory / settings.filename
             if filepath.exists() and filepath.is_file():
                 return cls.load(filepath)
         raise exceptions.WorkspaceNotFoundError(
-            f"No workspace file {get_settings().filename!r} found in '{path}' or its parents."
+            f"No workspace file {settings.filename!r} found in '{path}' or its parents."
         )
 
     @classmethod
     def load(cls, path: Path) -> Workspace:
-        text = path.read_text()
-        try:
-            body = json.loads(text)
-        except json.JSONDecodeError:
-            raise exceptions.WorkspaceValidationError(f"Workspace file at '{path}' is not valid JSON.")
-
-        try:
-            jsonschema.validate(
-                schema=_PROJECT_CONFIG_SCHEMA,
-                instance=body,
-            )
-        except jsonschema.ValidationError as exc:
-            raise exceptions.WorkspaceValidationError(f"Invalid workspace file at '{path}': {exc.message}")
+        mtime_ns = path.stat().st_mtime_ns
+        content = path.read_bytes()
+        content_digest = cache.digest(content)
+        body = _load_cached_body(path, content, content_digest, mtime_ns)
 
         kwargs = {"path": path.parent, "projects": {}}
         if "plugins" in body:
@@ -76,6 +96,7 @@ class Workspace:
             kwargs["template_path"] = body["template_path"]
 
         workspace = cls(**kwargs)  # type: ignore[arg-type]
+        workspace._digest = content_digest
         for name, project in body.get("projects", {}).items():
             workspace.set_project(name, **project)
         workspace._load_plugins()
@@ -86,40 +107,169 @@ class Workspace:
         return Templates(self)
 
     def get_project_by_path(self, path: Path) -> Optional[Project]:
+        return self.get_project_by_resolved_path(path.resolve())
+
+    def get_project_by_resolved_path(self, path: Path) -> Optional[Project]:
+        """Get a project by its path, which must already be resolved."""
+        if self._path_index is None:
+            self._path_index = {project.resolved_path: name for name, project in self.projects.items()}
+        name = self._path_index.get(path)
+        project = self.projects.get(name) if name else None
+        # Guard against projects being removed without going through `remove_project`.
+        if project is None or project.resolved_path != path:
+            return None
+        return project
+
+    def get_project_containing(self, path: Path) -> Optional[Project]:
+        """Get the innermost project whose directory contains the given path."""
         path = path.resolve()
-        for project in self.projects.values():
-            if project.resolved_path == path:
+        for directory in [path, *path.parents]:
+            project = self.get_project_by_resolved_path(directory)
+            if project:
                 return project
         return None
 
-    def set_project(self, name: str, path: str, type: str) -> Project:
-        project = Project(name=name, root=self, path=path, type=type)
+    def set_project(
+        self,
+        name: str,
+        path: str,
+        type: str,
+        inputs: Dict[str, List[str]] = None,
+        outputs: List[str] = None,
+    ) -> Project:
+        if name in self.projects:
+            self.remove_project(name)
+        project = Project(name=name, root=self, path=path, type=type, inputs=inputs, outputs=outputs)
         self.projects[name] = project
+        if self._path_index is not None:
+            self._path_index[project.resolved_path] = name
+        return project
+
+    def remove_project(self, name: str) -> Project:
+        project = self.projects.pop(name)
+        if self._path_index is not None and self._path_index.get(project.resolved_path) == name:
+            del self._path_index[project.resolved_path]
         return project
 
+    @contextmanager
+    def transaction(self) -> Iterator[Workspace]:
+        """Batch changes to the workspace into a single write.
+
+        Calls to `flush` inside the transaction are deferred until the outermost transaction
+        exits. If an exception is raised, nothing is written.
+        """
+        self._transaction_depth += 1
+        try:
+            yield self
+        except BaseException:
+            self._pending_flush = False
+            raise
+        finally:
+            self._transaction_depth -= 1
+        if not self._transaction_depth and self._pending_flush:
+            self._pending_flush = False
+            self.flush()
+
     def flush(self) -> None:
-        output: dict = {
-            "projects": {
-                project.name: {
-                    "path": project.path,
-                    "type": project.type,
-                }
-                for project in self.projects.values()
-            }
-        }
+        """Write the workspace file.
+
+        The write is atomic, and fails with `WorkspaceConflictError` if the file was changed by
+        another process since this workspace was loaded.
+        """
+        if self._transaction_depth:
+            self._pending_flush = True
+            return
+        output: dict = {"projects": {}}
+        for project in self.projects.values():
+            output["projects"][project.name] = {"path": project.path, "type": project.type}
+            if project.inputs is not None:
+                output["projects"][project.name]["inputs"] = project.inputs
+            if project.outputs is not None:
+                output["projects"][project.name]["outputs"] = project.outputs
         if self.plugins is not None:
             output["plugins"] = self.plugins
         if self.template_path is not None:
             output["template_path"] = self.template_path
-        with open(self.path / get_settings().filename, "w", encoding="utf-8") as file:
-            file.write(json.dumps(output, sort_keys=True, indent=2))
+        content = json.dumps(output, sort_keys=True, indent=2).encode("utf-8")
+        filepath = self.path / get_settings().filename
+        with _exclusive_lock(self.path):
+            if self._digest is not None:
+                try:
+                    current_digest: Optional[str] = cache.digest(filepath.read_bytes())
+                except FileNotFoundError:
+                    current_digest = None
+                if current_digest != self._digest:
+                    raise exceptions.WorkspaceConflictError(
+                        f"Workspace file at '{filepath}' was modified by another process. Please try again."
+                    )
+            cache.atomic_write(filepath, content)
+            mtime_ns = filepath.stat().st_mtime_ns
+        self._digest = cache.digest(content)
+        _store_cached_body(filepath, self._digest, mtime_ns, output)
 
     def _load_plugins(self) -> None:
-        for plugin in self.plugins or []:
-            try:
-                importlib.import_module(plugin)
-            except ModuleNotFoundError:
-                raise exceptions.WorkspacePluginError(f"Could not find configured plugin {plugin!r}.")
+        load_plugins(self)
+
+
+def _load_cached_body(path: Path, content: bytes, content_digest: str, mtime_ns: int) -> dict:
+    """Get the validated body of a workspace file, re-using a previous parse if the file is unchanged."""
+    cached = cache.read(_body_cache_path(path))
+    if (
+        isinstance(cached, dict)
+        and cached.get("digest") == content_digest
+        and cached.get("mtime_ns") == mtime_ns
+        and cached.get("schema") == _SCHEMA_DIGEST
+    ):
+        return cached["body"]
+    body = _parse_body(path, content)
+    _store_cached_body(path, content_digest, mtime_ns, body)
+    return body
+
+
+def _store_cached_body(path: Path, content_digest: str, mtime_ns: int, body: dict) -> None:
+    cache.write(
+        _body_cache_path(path),
+        {"digest": content_digest, "mtime_ns": mtime_ns, "schema": _SCHEMA_DIGEST, "body": body},
+    )
+
+
+def _body_cache_path(path: Path) -> Path:
+    return cache.workspace_cache_dir(path.parent) / "workspace.pickle"
+
+
+@contextmanager
+def _exclusive_lock(directory: Path) -> Iterator[None]:
+    """Hold an advisory lock on the workspace directory, to serialise writes between processes."""
+    try:
+        import fcntl
+    except ImportError:  # pragma: no cover
+        yield  # pragma: no cover
+        return  # pragma: no cover
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)
+
+
+def _parse_body(path: Path, content: bytes) -> dict:
+    """Decode and validate the body of a workspace file."""
+    import jsonschema
+
+    try:
+        body = json.loads(content)
+    except json.JSONDecodeError:
+        raise exceptions.WorkspaceValidationError(f"Workspace file at '{path}' is not valid JSON.")
+
+    try:
+        jsonschema.validate(
+            schema=_PROJECT_CONFIG_SCHEMA,
+            instance=body,
+        )
+    except jsonschema.ValidationError as exc:
+        raise exceptions.WorkspaceValidationError(f"Invalid workspace file at '{path}': {exc.message}")
+    return body
 
 
 @dataclass
@@ -130,9 +280,13 @@ class Project:
     root: Workspace = field(repr=False)
     path: str
     type: str
+    inputs: Optional[Dict[str, List[str]]] = None
+    """Globs including and excluding the files used to key cached results of commands."""
+    outputs: Optional[List[str]] = None
+    """Globs selecting the files produced by commands, restored along with cached results."""
     # options (type-specific)
 
-    @property
+    @cached_property
     def resolved_path(self) -> Path:
         return (self.root.path / Path(self.path)).resolve()
 
@@ -0,0 +1,115 @@
+"""Registration of the adapter types and artifact stores provided by workspace plugins.
+
+The adapter types and store schemes provided by each plugin are recorded in a manifest in
+the workspace cache, so that plugin modules are only imported when one of them is actually
+used.
+"""
+from __future__ import annotations
+
+import importlib
+import importlib.util
+import os
+from typing import TYPE_CHECKING, Dict, List, Optional, Set, Tuple
+
+from workspace.core import cache
+from workspace.core.adapter import Adapter, register_lazy_adapter
+from workspace.core.exceptions import WorkspacePluginError
+
+if TYPE_CHECKING:
+    from pathlib import Path  # pragma: no cover
+
+    from workspace.core.models import Workspace  # pragma: no cover
+
+_MANIFEST_FILENAME = "plugins.pickle"
+
+# Identifies a version of a plugin module, without importing it: its origin, and the
+# modification time of each of its source files, including every file of a package.
+_Stamp = Tuple[Optional[str], Tuple[Tuple[str, int], ...]]
+
+
+def load_plugins(workspace: Workspace) -> None:
+    """Register the adapter types and artifact stores provided by the workspace's plugins.
+
+    Plugin modules are only imported if they are missing from the manifest, or have
+    changed since the manifest was written.
+    """
+    if not workspace.plugins:
+        return
+    manifest_path = _manifest_path(workspace.path)
+    manifest = cache.read(manifest_path)
+    if not isinstance(manifest, dict):
+        manifest = {}
+    changed = False
+    for plugin in workspace.plugins:
+        stamp = _module_stamp(plugin)
+        entry = manifest.get(plugin)
+        if not entry or entry["stamp"] != stamp or "schemes" not in entry:
+            entry = {"stamp": stamp, **_import_plugin(plugin)}
+            manifest[plugin] = entry
+            changed = True
+        for type_name in entry["types"]:
+            register_lazy_adapter(type_name, plugin)
+        if entry["schemes"]:
+            from workspace.core.artifacts import register_lazy_store
+
+            for scheme in entry["schemes"]:
+                register_lazy_store(scheme, plugin)
+    if changed:
+        cache.write(manifest_path, manifest)
+
+
+def discover_plugin(workspace: Workspace, module_path: str) -> List[str]:
+    """Import a plugin, record the types it provides in the manifest and return them."""
+    provided = _import_plugin(module_path)
+    manifest_path = _manifest_path(workspace.path)
+    manifest: Dict[str, dict] = cache.read(manifest_path) or {}
+    manifest[module_path] = {"stamp": _module_stamp(module_path), **provided}
+    cache.write(manifest_path, manifest)
+    return provided["types"]
+
+
+def _manifest_path(workspace_path: Path) -> Path:
+    return cache.workspace_cache_dir(workspace_path) / _MANIFEST_FILENAME
+
+
+def _module_stamp(module_path: str) -> _Stamp:
+    try:
+        spec = importlib.util.find_spec(module_path)
+    except (ImportError, ValueError):
+        spec = None
+    if spec is None:
+        raise WorkspacePluginError(f"Could not find configured plugin {module_path!r}.")
+    paths = {spec.origin} if spec.origin and os.path.isfile(spec.origin) else set()
+    for location in spec.submodule_search_locations or []:
+        for directory, dirnames, filenames in os.walk(location):
+            dirnames[:] = [name for name in dirnames if name != "__pycache__"]
+            paths.update(os.path.join(directory, name) for name in filenames if name.endswith(".py"))
+    mtimes = []
+    for path in sorted(paths):
+        try:
+            mtimes.append((path, os.stat(path).st_mtime_ns))
+        except OSError:
+            continue
+    return spec.origin, tuple(mtimes)
+
+
+def _import_plugin(module_path: str) -> Dict[str, List[str]]:
+    """Import a plugin module, returning the adapter types and store schemes it defines or imports."""
+    from workspace.core.artifacts import ArtifactStore
+
+    try:
+        module = importlib.import_module(module_path)
+    except ModuleNotFoundError:
+        raise WorkspacePluginError(f"Could not find configured plugin {module_path!r}.")
+    types: Set[str] = set()
+    schemes: Set[str] = set()
+    for value in vars(module).values():
+        if not isinstance(value, type):
+            continue
+        if issubclass(value, Adapter) and value is not Adapter:
+            name = getattr(value, "name", None)
+            if name:
+                types.add(name)
+        if issubclass(value, ArtifactStore):
+            schemes.update(getattr(value, "schemes", ()))
+    return {"types": sorted(types), "schemes": sorted(schemes)}
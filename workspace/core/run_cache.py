@@ -0,0 +1,302 @@
+"""Results of commands run in projects, cached on the content of everything they depend on.
+
+The key of a result combines the command, the version of Python in the project's
+environment, and the content of the project's input files, manifests and lockfiles, along
+with those of every project it depends on, directly or transitively. If the environment of
+the project cannot be found, the version of Python running workspace-cli is used instead.
+
+Results are held in an artifact store, as a JSON record named `results/<key>`. The output
+of the command, and the files it produced, are held as separate artifacts named
+`blobs/<digest>`, addressed by their content, so that identical files are stored once.
+"""
+from __future__ import annotations
+
+import json
+import os
+import platform
+import re
+import subprocess
+from pathlib import Path
+from typing import IO, TYPE_CHECKING, Dict, Iterable, List, NamedTuple, Optional, Pattern, Set, Tuple
+
+from workspace.core import cache
+from workspace.core.artifacts import ArtifactStore, get_store
+from workspace.core.environments import get_environments, python_version
+
+if TYPE_CHECKING:
+    from workspace.core.graph import Graph  # pragma: no cover
+    from workspace.core.models import Project, Workspace  # pragma: no cover
+
+_CACHE_DIRNAME = "runs"
+_DIGESTS_FILENAME = "inputs.pickle"
+_CACHE_VERSION = 2
+
+# Directories skipped when listing files, except as listed by git.
+_IGNORED_DIRECTORIES = {"__pycache__", "node_modules"}
+
+
+class CachedResult(NamedTuple):
+    """The recorded result of a command."""
+
+    exit_code: int
+    output: bytes
+    """The combined stdout and stderr of the command."""
+    files: Dict[str, Tuple[bytes, int]] = {}
+    """The content and mode of each output file, by path relative to the project."""
+
+
+class RunCache:
+    """Results of commands run in the projects of a workspace.
+
+    The input files of a project are those selected by the `include` and `exclude` globs of
+    its `inputs`, relative to the project directory. By default, every file in the project is
+    an input, except those ignored by git.
+
+    The files selected by the `outputs` globs of a project are recorded along with the result
+    of a successful command, and restored when the result is replayed. These are never
+    considered inputs.
+
+    Digests of input files are themselves cached, keyed on the size and modification time of
+    each file, so that unchanged files are not read again.
+    """
+
+    def __init__(self, workspace: Workspace, graph: Graph, store: ArtifactStore = None):
+        self.workspace = workspace
+        self.graph = graph
+        self.store = store or get_store()
+        self._directory = cache.workspace_cache_dir(workspace.path) / _CACHE_DIRNAME
+        self._digests_path = self._directory / _DIGESTS_FILENAME
+        cached = cache.read(self._digests_path)
+        self._digests: Dict[str, Tuple[int, int, str]] = {}
+        if isinstance(cached, dict) and cached.get("version") == _CACHE_VERSION:
+            self._digests = cached["digests"]
+        self._input_digests: Dict[str, str] = {}
+        self._changed = False
+
+    def key(self, project: Project, command: str) -> str:
+        """Get the key of the result of running a command in a project."""
+        dependencies = sorted(self.graph.closure([project.name]).nodes - {project.name})
+        parts = [
+            f"version:{_CACHE_VERSION}",
+            f"python:{self.python_version(project)}",
+            f"command:{command}",
+            f"project:{project.name}:{self.input_digest(project)}",
+        ]
+        for name in dependencies:
+            parts.append(f"dependency:{name}:{self.input_digest(self.workspace.projects[name])}")
+        return cache.digest("\0".join(parts).encode())
+
+    def python_version(self, project: Project) -> str:
+        """Version of Python in the environment of a project, or that running workspace-cli."""
+        environment = get_environments(project).get(project)
+        return (environment and python_version(environment)) or platform.python_version()
+
+    def input_digest(self, project: Project) -> str:
+        """Digest of the input files, manifests and lockfiles of a project.
+
+        This is computed once per project, when first needed.
+        """
+        if project.name not in self._input_digests:
+            root = project.resolved_path
+            paths = set(project_inputs(project))
+            paths.update(project.adapter.manifest_paths() + project.adapter.lock_paths())
+            entries = []
+            for path in sorted(paths):
+                file_digest = self._file_digest(path)
+                if file_digest is not None:
+                    entries.append(f"{_relative_path(path, root)}:{file_digest}")
+            self._input_digests[project.name] = cache.digest("\n".join(entries).encode())
+        return self._input_digests[project.name]
+
+    def get(self, key: str) -> Optional[CachedResult]:
+        """Get a recorded result, if there is one and all of its artifacts are available."""
+        try:
+            record = json.loads(self.store.get(f"results/{key}") or b"null")
+        except ValueError:
+            return None
+        if not isinstance(record, dict) or record.get("version") != _CACHE_VERSION:
+            return None
+        output = self._get_blob(record["output"])
+        if output is None:
+            return None
+        files = {}
+        for path, (file_digest, mode) in record["files"].items():
+            content = self._get_blob(file_digest)
+            if content is None:
+                return None
+            files[path] = (content, mode)
+        return CachedResult(exit_code=record["exit_code"], output=output, files=files)
+
+    def put(self, project: Project, key: str, exit_code: int, output: IO[bytes]) -> None:
+        """Record the result of a command, reading its output from the start of a file.
+
+        If the command succeeded, the output files of the project are recorded with it.
+        """
+        output.seek(0)
+        files = {}
+        if exit_code == 0:
+            for path in project_outputs(project):
+                if not _is_within(path, project.resolved_path):
+                    continue
+                try:
+                    content = path.read_bytes()
+                    mode = path.stat().st_mode & 0o777
+                except OSError:
+                    continue
+                files[_relative_path(path, project.resolved_path)] = (self._put_blob(content), mode)
+        record = {
+            "version": _CACHE_VERSION,
+            "exit_code": exit_code,
+            "output": self._put_blob(output.read()),
+            "files": files,
+        }
+        # Written last, so that a result is only found once its artifacts are in place.
+        self.store.put(f"results/{key}", json.dumps(record).encode())
+
+    def restore(self, project: Project, cached: CachedResult) -> None:
+        """Restore the output files of a recorded result to a project.
+
+        Results may come from a shared store, so files which would be written outside the
+        project are skipped.
+        """
+        for relative, (content, mode) in cached.files.items():
+            path = project.resolved_path / relative
+            if Path(relative).is_absolute() or not _is_within(path, project.resolved_path):
+                continue
+            cache.atomic_write(path, content)
+            os.chmod(path, mode)
+
+    def save(self) -> None:
+        """Save the digests of input files, if any have changed."""
+        if self._changed:
+            cache.write(self._digests_path, {"version": _CACHE_VERSION, "digests": self._digests})
+            self._changed = False
+
+    def _get_blob(self, blob_digest: str) -> Optional[bytes]:
+        content = self.store.get(f"blobs/{blob_digest}")
+        if content is None or cache.digest(content) != blob_digest:
+            return None
+        return content
+
+    def _put_blob(self, content: bytes) -> str:
+        blob_digest = cache.digest(content)
+        if not self.store.has(f"blobs/{blob_digest}"):
+            self.store.put(f"blobs/{blob_digest}", content)
+        return blob_digest
+
+    def _file_digest(self, path: Path) -> Optional[str]:
+        key = str(path)
+        try:
+            stat = os.stat(key)
+        except OSError:
+            return None
+        cached = self._digests.get(key)
+        if cached is not None and cached[:2] == (stat.st_size, stat.st_mtime_ns):
+            return cached[2]
+        try:
+            with open(key, "rb") as file:
+                file_digest = cache.digest(file.read())
+        except OSError:
+            return None
+        self._digests[key] = (stat.st_size, stat.st_mtime_ns, file_digest)
+        self._changed = True
+        return file_digest
+
+
+def project_inputs(project: Project) -> List[Path]:
+    """Get the input files of a project, selected by the globs of its `inputs`."""
+    inputs = project.inputs or {}
+    include = compile_globs(inputs.get("include") or ["**"])
+    exclude = compile_globs([*(inputs.get("exclude") or []), *(project.outputs or [])])
+    root = project.resolved_path
+    return [
+        root / relative
+        for relative in _list_files(root)
+        if include.fullmatch(relative) and not exclude.fullmatch(relative)
+    ]
+
+
+def project_outputs(project: Project) -> List[Path]:
+    """Get the output files of a project, selected by the globs of its `outputs`.
+
+    Unlike inputs, outputs may be ignored by git. Only the directory named before the first
+    wildcard of each glob is searched, skipping hidden directories and caches within it.
+    """
+    root = project.resolved_path
+    globs = project.outputs or []
+    regex = compile_globs(globs)
+    files: Set[Path] = set()
+    for glob in globs:
+        static = []
+        for part in glob.strip("/").split("/"):
+            if "*" in part or "?" in part:
+                break
+            static.append(part)
+        base = root.joinpath(*static)
+        candidates = [base.relative_to(root).as_posix()] if base.is_file() else _walk(base, root)
+        files.update(root / relative for relative in candidates if regex.fullmatch(relative))
+    return sorted(files)
+
+
+def compile_globs(patterns: Iterable[str]) -> Pattern[str]:
+    """Compile globs matching paths relative to a project, in posix form.
+
+    `**` matches any number of directories, `*` and `?` match within a single directory, and
+    a pattern matching a directory also matches everything inside it.
+    """
+    expressions = []
+    for pattern in patterns:
+        expression = ""
+        for token in re.split(r"(\*\*/|\*\*|\*|\?)", pattern.strip("/")):
+            if token == "**/":
+                expression += "(?:.*/)?"
+            elif token == "**":
+                expression += ".*"
+            elif token == "*":
+                expression += "[^/]*"
+            elif token == "?":
+                expression += "[^/]"
+            else:
+                expression += re.escape(token)
+        expressions.append(expression + "(?:/.*)?")
+    return re.compile("|".join(expressions) or "(?!)")
+
+
+def _is_within(path: Path, root: Path) -> bool:
+    """Whether a path is inside a directory, once symlinks and `..` are resolved."""
+    return root.resolve() in path.resolve().parents
+
+
+def _relative_path(path: Path, root: Path) -> str:
+    try:
+        return path.relative_to(root).as_posix()
+    except ValueError:
+        return str(path)
+
+
+def _list_files(root: Path) -> List[str]:
+    """List the files in a directory, relative to it, excluding those ignored by git.
+
+    Outside of a git repository, hidden directories and caches are skipped instead.
+    """
+    try:
+        listing = subprocess.run(
+            ["git", "ls-files", "-z", "--cached", "--others", "--exclude-standard"],
+            cwd=root,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            check=True,
+        ).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return _walk(root, root)
+    return [path for path in os.fsdecode(listing).split("\0") if path]
+
+
+def _walk(base: Path, root: Path) -> List[str]:
+    """List the files within a directory, relative to the root, skipping hidden directories and caches."""
+    files: List[str] = []
+    for directory, dirnames, filenames in os.walk(base):
+        dirnames[:] = [name for name in dirnames if not name.startswith(".") and name not in _IGNORED_DIRECTORIES]
+        prefix = Path(directory).relative_to(root)
+        files.extend((prefix / name).as_posix() for name in filenames)
+    return files
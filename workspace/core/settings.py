@@ -3,11 +3,28 @@ from __future__ import annotations
 import os
 from dataclasses import dataclass
 from functools import lru_cache
+from typing import Optional, Union
+
+from workspace.core.exceptions import WorkspaceSettingsError
 
 
 @dataclass
 class Settings:
     filename: str = "workspace.json"
+    root: Optional[str] = None
+    cache_dir: Optional[str] = None
+    parse_workers: Optional[int] = None
+    jobs: Optional[int] = None
+    artifact_store: Optional[str] = None
+    direct_run: bool = False
+
+    def __post_init__(self):
+        if self.parse_workers is not None:
+            self.parse_workers = _positive_int("parse_workers", self.parse_workers)
+        if self.jobs is not None:
+            self.jobs = _positive_int("jobs", self.jobs)
+        if isinstance(self.direct_run, str):
+            self.direct_run = self.direct_run.lower() in ("1", "true", "yes")
 
     @classmethod
     def from_env(cls):
@@ -20,6 +37,16 @@ class Settings:
         return cls(**params)
 
 
+def _positive_int(name: str, value: Union[int, str]) -> int:
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise WorkspaceSettingsError(f"WORKSPACE_{name.upper()} must be a positive integer, not {value!r}.")
+    return number
+
+
 @lru_cache(maxsize=None)
 def get_settings() -> Settings:
     return Settings.from_env()